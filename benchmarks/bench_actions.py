@@ -0,0 +1,38 @@
+"""Benchmarks DefaultActionSet.transform_action and update_available_actions, per minigame.
+
+    python benchmarks/bench_actions.py
+"""
+import itertools
+import numpy as np
+from sc2ai.envs import make_sc2env, registered_maps
+from synthetic import raw_observation
+from timing import time_per_call
+
+
+def run(number=None):
+    """Returns a list of (name, map, seconds per call) tuples."""
+    rng = np.random.RandomState(0)
+    results = []
+    for map_name in registered_maps():
+        env = make_sc2env(map=map_name)
+        action_set = env.action_set
+        observation = raw_observation(rng)
+        action_set.update_available_actions(observation.available_actions)
+        transformed = env._observation_set.transform_observation(observation)
+        # Cycles through sampled actions, so every action type of the set is decoded.
+        actions = itertools.cycle([env.action_gym_space.sample() for _ in range(64)])
+
+        def transform_action():
+            action_set.transform_action(transformed, next(actions))
+
+        for name, fn in (("transform_action", transform_action),
+                         ("update_available_actions",
+                          lambda: action_set.update_available_actions(observation.available_actions))):
+            seconds = time_per_call(fn, number)
+            results.append((name, map_name, seconds))
+    return results
+
+
+if __name__ == '__main__':
+    for name, map_name, seconds in run():
+        print("{:<24s} {:<28s} {:>10.1f} us".format(name, map_name, seconds * 1e6))
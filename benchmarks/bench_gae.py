@@ -0,0 +1,62 @@
+"""Benchmarks the vectorized GAE kernels against per-path finish_path computation.
+
+    python benchmarks/bench_gae.py
+"""
+import numpy as np
+import torch
+from sc2ai.spinup.algorithms.ppo import core
+from timing import time_per_call
+
+STEPS = 10000
+EPISODE_LENGTHS = (8, 64, 1000)
+NUM_ENVS = 16
+
+
+def make_buffer(steps, episode_length, rng, num_envs=None):
+    shape = (steps,) if num_envs is None else (steps, num_envs)
+    rewards, values, bootstrap_values = rng.randn(*shape), rng.randn(*shape), rng.randn(*shape)
+    ends = rng.rand(*shape) < 1.0 / episode_length
+    terminals = ends & (rng.rand(*shape) < 0.5)
+    truncations = ends & ~terminals
+    return rewards, values, terminals, truncations, bootstrap_values
+
+
+def finish_path_gae(rewards, values, terminals, truncations, bootstrap_values, gamma=0.99, lam=0.95):
+    """The previous per-path computation of PPOBuffer.finish_path."""
+    advantages, returns = np.zeros(len(rewards)), np.zeros(len(rewards))
+    start = 0
+    for end in np.flatnonzero(terminals | truncations).tolist() + [len(rewards) - 1]:
+        if end < start:
+            continue
+        last_val = 0 if terminals[end] else bootstrap_values[end]
+        path_slice = slice(start, end + 1)
+        rews = np.append(rewards[path_slice], last_val)
+        vals = np.append(values[path_slice], last_val)
+        deltas = rews[:-1] + gamma * vals[1:] - vals[:-1]
+        advantages[path_slice] = core.discount_cumsum(deltas, gamma * lam)
+        returns[path_slice] = core.discount_cumsum(rews, gamma)[:-1]
+        start = end + 1
+    return advantages, returns
+
+
+def run(number=None):
+    """Returns a list of (name, episode length, number of envs, seconds per call) tuples."""
+    rng = np.random.RandomState(0)
+    results = []
+    for episode_length in EPISODE_LENGTHS:
+        single = make_buffer(STEPS, episode_length, rng)
+        batched = make_buffer(STEPS // NUM_ENVS, episode_length, rng, NUM_ENVS)
+        batched_tensors = [torch.as_tensor(array) for array in batched]
+        for name, fn, arrays, num_envs in (("finish_path", finish_path_gae, single, 1),
+                                           ("gae_numpy", core.gae_numpy, single, 1),
+                                           ("gae_numpy", core.gae_numpy, batched, NUM_ENVS),
+                                           ("gae_torch", core.gae_torch, batched_tensors, NUM_ENVS)):
+            seconds = time_per_call(lambda: fn(*arrays), number)
+            results.append((name, episode_length, num_envs, seconds))
+    return results
+
+
+if __name__ == '__main__':
+    for name, episode_length, num_envs, seconds in run():
+        print("{:<12s} T={} episode length {:>5d} envs {:>3d} {:>10.2f} ms".format(
+            name, STEPS, episode_length, num_envs, seconds * 1e3))
@@ -0,0 +1,65 @@
+"""Measures the import time of the sc2ai entry points with ``python -X importtime``.
+
+Every module is imported in a fresh interpreter, as every MPI rank started by ``mpi_fork`` does.
+
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py sc2ai.envs sc2ai.run
+"""
+import re
+import subprocess
+import sys
+
+MODULES = ("sc2ai.envs", "sc2ai.envs.minigames", "sc2ai.run", "sc2ai.spinup.utils.mpi_tools")
+
+_IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def measure(module, python=sys.executable):
+    """Imports a module in a fresh interpreter.
+
+    Args:
+        module (str): the dotted module name.
+        python (str): the interpreter to run.
+
+    Returns:
+        A tuple of the cumulative import time of the module in seconds, or None if the import
+        failed, and a dict mapping every top-level package imported along the way to the time
+        spent importing its modules in seconds.
+    """
+    result = subprocess.run([python, "-X", "importtime", "-c", "import " + module],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        return None, {}
+    total = 0.0
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        name = match.group(3)
+        if name == module:
+            total = int(match.group(2)) * 1e-6
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(match.group(1)) * 1e-6
+    return total, packages
+
+
+def run(modules=MODULES, repeat=5):
+    """Returns a list of (module, median seconds, heaviest top-level packages) tuples."""
+    results = []
+    for module in modules:
+        timings = sorted((timing for timing in (measure(module) for _ in range(repeat)) if timing[0] is not None),
+                         key=lambda timing: timing[0])
+        total, packages = timings[len(timings) // 2] if timings else (None, {})
+        heaviest = sorted(packages.items(), key=lambda item: -item[1])[:5]
+        results.append((module, total, heaviest))
+    return results
+
+
+if __name__ == '__main__':
+    for module, seconds, heaviest in run(sys.argv[1:] or MODULES):
+        if seconds is None:
+            print("{:<32s} import failed".format(module))
+            continue
+        print("{:<32s} {:>8.1f} ms   {}".format(module, seconds * 1e3, ", ".join(
+            "{} {:.0f} ms".format(package, package_seconds * 1e3) for package, package_seconds in heaviest)))
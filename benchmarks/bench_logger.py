@@ -0,0 +1,50 @@
+"""Benchmarks EpochLogger.store and the end-of-epoch log_tabular and dump_tabular calls of PPO.
+
+    python benchmarks/bench_logger.py
+"""
+import contextlib
+import os
+import tempfile
+import numpy as np
+from sc2ai.spinup.utils.logx import EpochLogger
+from timing import time_per_call
+
+STORED_KEYS = ('LossPi', 'LossV', 'DeltaLossPi', 'DeltaLossV', 'Entropy', 'KL', 'ClipFrac', 'StopIter')
+
+
+def run(number=None, steps=1000, episodes=20):
+    """Returns a list of (name, seconds per call) tuples. ``dump_tabular`` covers the tabular calls of a whole epoch."""
+    rng = np.random.RandomState(0)
+    values = rng.randn(steps, 1).astype(np.float32)
+    with tempfile.TemporaryDirectory() as output_dir, open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        logger = EpochLogger(output_dir=output_dir)
+
+        def store():
+            logger.store(VVals=values[0])
+
+        def epoch():
+            for value in values:
+                logger.store(VVals=value)
+            for _ in range(episodes):
+                logger.store(EpRet=float(rng.randn()), EpLen=100)
+            logger.store(**{key: float(rng.randn()) for key in STORED_KEYS})
+            logger.log_tabular('Epoch', 0)
+            logger.log_tabular('EpRet', with_min_and_max=True)
+            logger.log_tabular('EpLen', average_only=True)
+            logger.log_tabular('VVals', with_min_and_max=True)
+            for key in STORED_KEYS:
+                logger.log_tabular(key, average_only=True)
+            logger.dump_tabular()
+
+        store_seconds = time_per_call(store, number and number * steps)
+        logger.epoch_dict.clear()
+        epoch()
+        epoch_seconds = time_per_call(epoch, number)
+        logger.close()
+    return [("logger_store", store_seconds), ("logger_epoch", epoch_seconds)]
+
+
+if __name__ == '__main__':
+    for name, seconds in run():
+        print("{:<14s} {:>10.2f} us".format(name, seconds * 1e6))
@@ -0,0 +1,41 @@
+"""Benchmarks the policy forward of every environment step at several batch sizes, for
+SC2AtariNetActorCritic and its recurrent counterpart SC2LSTMActorCritic.
+
+    python benchmarks/bench_model.py
+"""
+import torch
+from sc2ai.envs import env_spaces
+from sc2ai.spinup.algorithms.ppo.sc2_nets import SC2AtariNetActorCritic, SC2LSTMActorCritic
+from timing import time_per_call
+
+BATCH_SIZES = (1, 8, 32, 128)
+
+
+def run(map_name='MoveToBeacon', number=None, device=torch.device('cpu')):
+    """Returns a list of (name, batch size, seconds per call) tuples."""
+    torch.manual_seed(0)
+    spaces = env_spaces(map_name)
+    ac = SC2AtariNetActorCritic(spaces.observation_space, action_spec=spaces.action_spec,
+                                action_mask=spaces.action_mask, device=device)
+    shape = spaces.observation_space[SC2AtariNetActorCritic.observation_key].shape
+    results = []
+    for batch_size in BATCH_SIZES:
+        obs = torch.rand((batch_size,) + tuple(shape), device=device)
+        ac.step(obs)
+        seconds = time_per_call(lambda: ac.step(obs), number)
+        results.append(("ac_step", batch_size, seconds))
+
+    lstm = SC2LSTMActorCritic(spaces.observation_space, action_spec=spaces.action_spec,
+                              action_mask=spaces.action_mask, device=device)
+    for batch_size in BATCH_SIZES:
+        obs = torch.rand((batch_size,) + tuple(shape), device=device)
+        state = lstm.initial_state(batch_size)
+        lstm.step(obs, state)
+        seconds = time_per_call(lambda: lstm.step(obs, state), number)
+        results.append(("lstm_step", batch_size, seconds))
+    return results
+
+
+if __name__ == '__main__':
+    for name, batch_size, seconds in run():
+        print("{:<12s} batch {:>4d} {:>10.2f} ms".format(name, batch_size, seconds * 1e3))
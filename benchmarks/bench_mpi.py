@@ -0,0 +1,69 @@
+"""Benchmarks mpi_avg_grads, the gradient all-reduce after every minibatch, across MPI ranks.
+
+Every number of ranks runs in its own ``mpirun`` started by this process, with the gradients of
+an :class:`SC2AtariNetActorCritic`.
+
+    python benchmarks/bench_mpi.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+RANKS = (2, 4)
+
+
+def worker(number):
+    import torch
+    from sc2ai.envs import env_spaces
+    from sc2ai.spinup.algorithms.ppo.sc2_nets import SC2AtariNetActorCritic
+    from sc2ai.spinup.utils.mpi_pytorch import mpi_avg_grads
+    from sc2ai.spinup.utils.mpi_tools import proc_id, num_procs
+    from mpi4py import MPI
+    from timing import time_per_call
+
+    spaces = env_spaces('MoveToBeacon')
+    ac = SC2AtariNetActorCritic(spaces.observation_space, action_spec=spaces.action_spec,
+                                action_mask=spaces.action_mask)
+    for p in ac.parameters():
+        p.grad = torch.rand_like(p)
+    mpi_avg_grads(ac)
+    MPI.COMM_WORLD.Barrier()
+    # Every rank runs the same number of calls, as each of them is a collective.
+    seconds = time_per_call(lambda: mpi_avg_grads(ac), number)
+    # The slowest rank bounds every minibatch.
+    seconds = MPI.COMM_WORLD.allreduce(seconds, op=MPI.MAX)
+    if proc_id() == 0:
+        num_parameters = sum(p.numel() for p in ac.parameters())
+        print(json.dumps(dict(ranks=num_procs(), parameters=num_parameters, seconds=seconds)))
+
+
+def run(ranks=RANKS, number=20):
+    """Returns a list of (name, ranks, seconds per call) tuples, skipping rank counts that cannot be launched."""
+    env = os.environ.copy()
+    env.update(MKL_NUM_THREADS="1", OMP_NUM_THREADS="1", IN_MPI="1")
+    repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [repository, env.get("PYTHONPATH")]))
+    # Lets Open MPI start more ranks than cores, and run in containers as root.
+    env.setdefault("OMPI_MCA_rmaps_base_oversubscribe", "1")
+    env.setdefault("OMPI_ALLOW_RUN_AS_ROOT", "1")
+    env.setdefault("OMPI_ALLOW_RUN_AS_ROOT_CONFIRM", "1")
+    results = []
+    for n in ranks:
+        result = subprocess.run(["mpirun", "-np", str(n), sys.executable, os.path.abspath(__file__), "--worker",
+                                 str(number)], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+        if result.returncode != 0 or not lines:
+            print("mpirun -np {} failed:\n{}".format(n, result.stderr[-2000:]), file=sys.stderr)
+            continue
+        results.append(("mpi_avg_grads", n, json.loads(lines[-1])["seconds"]))
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == "--worker":
+        worker(int(sys.argv[2]))
+    else:
+        for name, n, seconds in run():
+            print("{:<14s} {:>2d} ranks {:>10.2f} ms".format(name, n, seconds * 1e3))
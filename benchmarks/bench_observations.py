@@ -0,0 +1,25 @@
+"""Benchmarks ObservationSet.transform_observation on synthetic observations, per minigame.
+
+    python benchmarks/bench_observations.py
+"""
+import numpy as np
+from sc2ai.envs import make_sc2env, registered_maps
+from synthetic import raw_observation
+from timing import time_per_call
+
+
+def run(number=None):
+    """Returns a list of (name, map, seconds per call) tuples."""
+    rng = np.random.RandomState(0)
+    results = []
+    for map_name in registered_maps():
+        observation_set = make_sc2env(map=map_name)._observation_set
+        observation = raw_observation(rng)
+        seconds = time_per_call(lambda: observation_set.transform_observation(observation), number)
+        results.append(("transform_observation", map_name, seconds))
+    return results
+
+
+if __name__ == '__main__':
+    for name, map_name, seconds in run():
+        print("{:<24s} {:<28s} {:>10.1f} us".format(name, map_name, seconds * 1e6))
@@ -0,0 +1,40 @@
+"""Benchmarks a full PPO epoch on a synthetic environment, timing the update with the profiler.
+
+PPO runs on a minigame environment whose game is replaced by :class:`synthetic.SyntheticBackend`, so
+the update works on a buffer collected through the real environment and policy code.
+
+    python benchmarks/bench_ppo_update.py
+"""
+import contextlib
+import os
+import os.path as osp
+import statistics
+import tempfile
+from sc2ai.profiler import profiler
+from sc2ai.spinup.algorithms.ppo.ppo import ppo
+from sc2ai.spinup.utils.metrics import read_columnar
+from synthetic import make_synthetic_env
+
+UPDATE_TIMERS = ('ppo.compute_advantages', 'ppo.forward', 'ppo.backward', 'ppo.mpi_avg_grads', 'ppo.optimizer_step')
+
+
+def run(map_name='MoveToBeacon', steps_per_epoch=256, batch_size=64, train_iters=2, epochs=6):
+    """Returns a list of (name, steps per epoch, seconds) tuples: the update of an epoch, and the collection of a step.
+
+    The first epoch warms up, the median of the others is reported.
+    """
+    with tempfile.TemporaryDirectory() as output_dir, open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull):
+            ppo(lambda: make_synthetic_env(map_name), steps_per_epoch=steps_per_epoch, epochs=epochs,
+                batch_size=batch_size, train_iters=train_iters, save_freq=epochs, profile=True,
+                logger_kwargs=dict(output_dir=output_dir))
+        profiler.disable()
+        _, columns = read_columnar(osp.join(output_dir, 'progress.bin'))
+    update = statistics.median(sum(columns['Time/' + name][1:] for name in UPDATE_TIMERS))
+    collect = statistics.median(columns['Time/ppo.ac_step'][1:] + columns['Time/ppo.env_step'][1:]) / steps_per_epoch
+    return [("ppo_update", steps_per_epoch, float(update)), ("ppo_collect_step", steps_per_epoch, float(collect))]
+
+
+if __name__ == '__main__':
+    for name, steps, seconds in run():
+        print("{:<18s} {:>6d} steps/epoch {:>10.2f} ms".format(name, steps, seconds * 1e3))
@@ -0,0 +1,62 @@
+"""Benchmarks the unit spatial index against a per-unit Python loop.
+
+    python benchmarks/bench_spatial_index.py
+"""
+import numpy as np
+from pysc2.lib.features import PlayerRelative
+from sc2ai.observation.spatial_index import UnitSpatialIndex
+from timing import time_per_call
+
+UNITS_PER_SIDE = (10, 100, 400)
+MAP_SIZE = 64
+
+
+def make_units(units_per_side, rng):
+    positions = rng.uniform(0, MAP_SIZE, size=(2 * units_per_side, 2))
+    alliance = np.repeat([PlayerRelative.SELF, PlayerRelative.ENEMY], units_per_side)
+    return positions, alliance
+
+
+def loop_nearest_enemies(positions, alliance):
+    allies = positions[alliance == PlayerRelative.SELF]
+    enemies = positions[alliance == PlayerRelative.ENEMY]
+    nearest = []
+    for ally in allies:
+        closest_distance, closest = np.inf, -1
+        for i, enemy in enumerate(enemies):
+            distance = np.linalg.norm(enemy - ally)
+            if distance < closest_distance:
+                closest_distance, closest = distance, i
+        nearest.append(closest)
+    return nearest
+
+
+def index_nearest_enemies(positions, alliance):
+    return UnitSpatialIndex(positions, alliance).nearest_enemies()
+
+
+def index_knn_and_radius(positions, alliance):
+    index = UnitSpatialIndex(positions, alliance)
+    allies = index.positions_of(PlayerRelative.SELF)
+    index.knn(allies, k=4, alliance=PlayerRelative.ENEMY)
+    index.count_within(allies, 6.0, alliance=PlayerRelative.ENEMY)
+    index.count_within(allies, 6.0, alliance=PlayerRelative.SELF)
+
+
+def run(number=None):
+    """Returns a list of (name, units per side, seconds per call) tuples."""
+    rng = np.random.RandomState(0)
+    results = []
+    for units_per_side in UNITS_PER_SIDE:
+        positions, alliance = make_units(units_per_side, rng)
+        for name, fn in (("loop_nearest_enemies", loop_nearest_enemies),
+                         ("index_nearest_enemies", index_nearest_enemies),
+                         ("index_knn_and_radius", index_knn_and_radius)):
+            seconds = time_per_call(lambda: fn(positions, alliance), number)
+            results.append((name, units_per_side, seconds))
+    return results
+
+
+if __name__ == '__main__':
+    for name, units_per_side, seconds in run():
+        print("{:<24s} {:>4d} units/side {:>12.1f} us".format(name, units_per_side, seconds * 1e6))
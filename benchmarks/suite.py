@@ -0,0 +1,152 @@
+"""Runs the hot-path benchmarks, writes their results as JSON and compares them against a stored baseline.
+
+Every benchmark module has a ``run()`` function returning tuples whose last element is seconds per
+call, the median of several timed runs, and whose other elements identify the measurement. Results
+are keyed ``module/field/field``. A result slower than its baseline by more than the tolerance is
+measured again, as a single slow measurement is usually noise from other work on the machine. If it
+is still slow, it is a regression and makes the suite exit with status 1. Baselines are
+machine-specific: record one on the machine that compares.
+
+    python benchmarks/suite.py
+    python benchmarks/suite.py --only model ppo_update --out results.json
+    python benchmarks/suite.py --update-baseline
+"""
+import argparse
+import importlib
+import json
+import os
+import os.path as osp
+import platform
+import sys
+import time
+
+BENCHMARKS = ('observations', 'actions', 'model', 'ppo_update', 'mpi', 'logger', 'gae', 'spatial_index')
+
+BENCHMARK_DIR = osp.dirname(osp.abspath(__file__))
+DEFAULT_BASELINE = osp.join(BENCHMARK_DIR, 'baseline.json')
+
+# Runs from a checkout without installing sc2ai, and imports the benchmark modules by name.
+sys.path[:0] = [osp.dirname(BENCHMARK_DIR), BENCHMARK_DIR]
+
+
+def machine_info():
+    import numpy as np
+    import torch
+    return dict(platform=platform.platform(), processor=platform.processor(), cpu_count=os.cpu_count(),
+                python=platform.python_version(), numpy=np.__version__, torch=torch.__version__,
+                torch_threads=torch.get_num_threads())
+
+
+def run_benchmarks(names=BENCHMARKS):
+    """Runs benchmark modules.
+
+    Returns:
+        A dict of the seconds of every result, and a dict of the error message of every module that failed.
+    """
+    results, errors = {}, {}
+    for name in names:
+        start = time.time()
+        try:
+            module = importlib.import_module('bench_' + name)
+            rows = module.run()
+        except Exception as e:
+            errors[name] = '{}: {}'.format(type(e).__name__, e)
+            print("{:<16s} failed: {}".format(name, errors[name]), file=sys.stderr)
+            continue
+        for row in rows:
+            results['/'.join([name] + [str(field) for field in row[:-1]])] = float(row[-1])
+        print("{:<16s} {:>3d} results in {:.1f} s".format(name, len(rows), time.time() - start), file=sys.stderr)
+    return results, errors
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Compares results against baseline results.
+
+    Returns:
+        A list of ``(key, baseline seconds, seconds, ratio, status)`` tuples, where status is ``regression``,
+        ``improvement``, ``ok``, ``new`` or ``missing``.
+    """
+    rows = []
+    for key in sorted(set(results) | set(baseline)):
+        if key not in baseline:
+            rows.append((key, None, results[key], None, 'new'))
+        elif key not in results:
+            rows.append((key, baseline[key], None, None, 'missing'))
+        else:
+            ratio = results[key] / baseline[key] if baseline[key] > 0 else float('inf')
+            status = 'regression' if ratio > 1 + tolerance else 'improvement' if ratio < 1 / (1 + tolerance) else 'ok'
+            rows.append((key, baseline[key], results[key], ratio, status))
+    return rows
+
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return '-'
+    return '{:.3f} ms'.format(seconds * 1e3) if seconds >= 1e-3 else '{:.2f} us'.format(seconds * 1e6)
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(description="Run the hot-path benchmarks and compare them against a baseline.")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help="The benchmarks to run.")
+    parser.add_argument('--out', type=str, default=None, help="Writes the results to this JSON file.")
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE, help="The baseline JSON file.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="The relative slowdown above which a result is a regression.")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="How many times benchmarks with regressions are run again, keeping their fastest results.")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Stores the results in the baseline file, keeping baseline results that were not run.")
+    return parser
+
+
+def main(args):
+    report = dict(machine=machine_info(), time=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    results, errors = run_benchmarks(args.only)
+    report.update(results=results, errors=errors)
+
+    baseline = {}
+    if osp.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.update_baseline:
+        if args.out:
+            write_json(args.out, report)
+        write_json(args.baseline, dict(report, results=dict(baseline.get('results', {}), **results)))
+        print("Updated {} results of {}.".format(len(results), args.baseline))
+        return 1 if errors else 0
+
+    prefixes = tuple(name + '/' for name in args.only)
+    baseline_results = {key: value for key, value in baseline.get('results', {}).items() if key.startswith(prefixes)}
+    if baseline.get('machine') and baseline['machine'] != report['machine']:
+        print("Warning: the baseline was recorded on a different machine: {}".format(baseline['machine']))
+    rows = compare(results, baseline_results, args.tolerance)
+    for _ in range(args.retries):
+        regressed = [name for name in args.only if any(row[4] == 'regression' and row[0].startswith(name + '/')
+                                                       for row in rows)]
+        if not regressed:
+            break
+        print("Measuring {} again to confirm regressions.".format(", ".join(regressed)), file=sys.stderr)
+        for key, seconds in run_benchmarks(regressed)[0].items():
+            results[key] = min(results.get(key, seconds), seconds)
+        rows = compare(results, baseline_results, args.tolerance)
+    if args.out:
+        write_json(args.out, report)
+    width = max([len(row[0]) for row in rows] + [10])
+    for key, base, seconds, ratio, status in rows:
+        print("{:<{width}s} {:>12s} {:>12s} {:>7s}  {}".format(key, _format_seconds(base), _format_seconds(seconds),
+                                                                '{:.2f}x'.format(ratio) if ratio else '-', status,
+                                                                width=width))
+    regressions = [row[0] for row in rows if row[4] == 'regression']
+    if regressions:
+        print("{} regressions above {:.0f}%: {}".format(len(regressions), args.tolerance * 100, ", ".join(regressions)))
+    return 1 if regressions or errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(create_parser().parse_args()))
@@ -0,0 +1,75 @@
+"""Synthetic pysc2 observations and a stand-in game backend, so benchmarks run without StarCraft II."""
+import numpy as np
+from pysc2.env.environment import StepType, TimeStep
+from pysc2.lib import features, named_array
+from sc2ai.envs import make_sc2env
+
+SCREEN_LAYERS = ('player_relative', 'unit_hit_points', 'unit_hit_points_ratio', 'unit_density', 'selected')
+
+
+def raw_observation(rng, screen_size=84, num_units=32, available_actions=None):
+    """Returns a random pysc2 observation with the fields the observation and action sets read.
+
+    Args:
+        rng (np.random.RandomState): the random number generator.
+        screen_size (int): the size of the feature screen layers.
+        num_units (int): the number of rows of the unit lists.
+        available_actions: the available pysc2 function ids, all of them by default.
+    """
+    player_relative = rng.choice([features.PlayerRelative.NONE, features.PlayerRelative.SELF,
+                                  features.PlayerRelative.NEUTRAL, features.PlayerRelative.ENEMY],
+                                 size=(screen_size, screen_size), p=[0.9, 0.04, 0.02, 0.04]).astype(np.int32)
+    screen = {name: rng.randint(0, 256, size=(screen_size, screen_size)).astype(np.int32) for name in SCREEN_LAYERS}
+    screen['player_relative'] = player_relative
+    units = rng.randint(0, screen_size, size=(num_units, len(features.FeatureUnit))).astype(np.int64)
+    units[:, features.FeatureUnit.alliance] = rng.choice([features.PlayerRelative.SELF, features.PlayerRelative.ENEMY,
+                                                          features.PlayerRelative.NEUTRAL], size=num_units)
+    if available_actions is None:
+        available_actions = np.arange(len(features.actions.FUNCTIONS))
+    return named_array.NamedDict(feature_screen=named_array.NamedDict(screen), raw_units=units,
+                                 feature_units=units.copy(), available_actions=np.asarray(available_actions),
+                                 game_loop=np.array([0]), score_cumulative=np.zeros(13, dtype=np.int32))
+
+
+class SyntheticBackend:
+    """Stands in for ``pysc2.env.sc2_env.SC2Env``, returning precomputed random observations.
+
+    Args:
+        episode_length (int): the number of steps after which every episode ends.
+        num_observations (int): the number of distinct observations cycled through.
+        seed (int): the seed of the observations and rewards.
+    """
+
+    def __init__(self, episode_length=100, num_observations=16, seed=0, **kwargs):
+        rng = np.random.RandomState(seed)
+        self._observations = [raw_observation(rng, **kwargs) for _ in range(num_observations)]
+        self._rewards = rng.randint(0, 2, size=num_observations).astype(np.float64)
+        self._episode_length = episode_length
+        self._step = 0
+        self._index = 0
+
+    def _timestep(self, step_type):
+        self._index = (self._index + 1) % len(self._observations)
+        reward = 0.0 if step_type == StepType.FIRST else self._rewards[self._index]
+        return [TimeStep(step_type, reward, 1.0, self._observations[self._index])]
+
+    def reset(self):
+        self._step = 0
+        return self._timestep(StepType.FIRST)
+
+    def step(self, function_calls):
+        self._step += 1
+        return self._timestep(StepType.LAST if self._step >= self._episode_length else StepType.MID)
+
+    def observation_spec(self):
+        return None
+
+    def close(self):
+        pass
+
+
+def make_synthetic_env(map_name='MoveToBeacon', **kwargs):
+    """Creates the environment of a registered map, running on a :class:`SyntheticBackend` instead of the game."""
+    env = make_sc2env(map=map_name)
+    env._sc2_env = SyntheticBackend(**kwargs)
+    return env
@@ -0,0 +1,29 @@
+"""Timing shared by the benchmarks, robust to the noise of machines that run other work."""
+import statistics
+import timeit
+
+REPEAT = 7
+""" The number of timed runs, whose median is reported. """
+
+MIN_TIME = 0.05
+""" The minimum seconds of a timed run, when the number of calls per run is chosen automatically. """
+
+
+def time_per_call(fn, number=None, repeat=REPEAT, min_time=MIN_TIME):
+    """Returns the median seconds per call of ``fn`` over ``repeat`` timed runs.
+
+    Args:
+        fn: the function to time, called without arguments.
+        number (int): the calls per run, by default as many as take at least ``min_time`` seconds.
+        repeat (int): the number of timed runs.
+        min_time (float): the minimum seconds of a run, when ``number`` is None.
+    """
+    timer = timeit.Timer(fn)
+    if number is None:
+        number = 1
+        while True:
+            seconds = timer.timeit(number)
+            if seconds >= min_time:
+                break
+            number = max(number + 1, int(number * min(10.0, 1.2 * min_time / max(seconds, 1e-9))))
+    return statistics.median(timer.repeat(repeat=repeat, number=number)) / number
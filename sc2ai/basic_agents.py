@@ -8,6 +8,7 @@ from pysc2.agents import base_agent
 from pysc2.agents.scripted_agent import _xy_locs
 from pysc2.lib import features
 from pysc2.lib import actions
+from sc2ai.observation.spatial_index import get_spatial_index
 
 class NoOpAgent(base_agent.BaseAgent):
     """An agent which does nothing. Please use this as a template in making other agents.
@@ -34,34 +35,49 @@ def get_enemy_entities_locations(obs):
     self_entities = obs.observation.feature_screen.player_relative == features.PlayerRelative.ENEMY
     return _xy_locs(self_entities)
 
+def nearest_to_army(obs, alliance):
+    """Returns the screen position of the unit of an alliance nearest to the center of the army, or None."""
+    index = get_spatial_index(obs.observation, source="feature_units")
+    army = index.positions_of(features.PlayerRelative.SELF)
+    if len(army) == 0:
+        return None
+    _, nearest = index.nearest(army.mean(axis=0), alliance=alliance)
+    if nearest[0] < 0:
+        return None
+    return index.positions[nearest[0]].astype(int)
+
 class MoveToBeacon(base_agent.BaseAgent):
+    """Moves the army to the beacon nearest to its center. Requires feature units."""
     def step(self, obs):
-        #print('wewerwerwer')
-        #print(obs.observation.raw_units)
+        super(MoveToBeacon, self).step(obs)
         if actions.FUNCTIONS.Move_screen.id in obs.observation.available_actions:
-            marines = get_self_entities_locations(obs)
-            marine_xy = numpy.mean(marines, axis=0).round()
-            beacons = get_neutral_entities_locations(obs)
-            if not beacons:
+            beacon = nearest_to_army(obs, features.PlayerRelative.NEUTRAL)
+            if beacon is None:
                 return actions.FUNCTIONS.no_op()
-            closest_distance = numpy.Inf
-            goto_xy = [0, 0]
-            for beacon in beacons:
-                print(beacon)
-                print(marine_xy)
-                distance = numpy.linalg.norm(numpy.array(beacon) - marine_xy, axis=1)
-                if closest_distance > distance:
-                    distance = closest_distance
-                    goto_xy = beacon
-
-            return actions.FUNCTIONS.Move_screen("now", goto_xy)
+            return actions.FUNCTIONS.Move_screen("now", beacon)
         else:
             return actions.FUNCTIONS.select_army("select")
 
 class CollectMineralShards(base_agent.BaseAgent):
+    """Moves the army to the mineral shard nearest to its center. Requires feature units."""
     def step(self, obs):
-        pass
+        super(CollectMineralShards, self).step(obs)
+        if actions.FUNCTIONS.Move_screen.id in obs.observation.available_actions:
+            shard = nearest_to_army(obs, features.PlayerRelative.NEUTRAL)
+            if shard is None:
+                return actions.FUNCTIONS.no_op()
+            return actions.FUNCTIONS.Move_screen("now", shard)
+        else:
+            return actions.FUNCTIONS.select_army("select")
 
 class DefeatRoaches(base_agent.BaseAgent):
+    """Attacks the enemy nearest to the center of the army. Requires feature units."""
     def step(self, obs):
-        pass
+        super(DefeatRoaches, self).step(obs)
+        if actions.FUNCTIONS.Attack_screen.id in obs.observation.available_actions:
+            enemy = nearest_to_army(obs, features.PlayerRelative.ENEMY)
+            if enemy is None:
+                return actions.FUNCTIONS.no_op()
+            return actions.FUNCTIONS.Attack_screen("now", enemy)
+        else:
+            return actions.FUNCTIONS.select_army("select")
@@ -0,0 +1,143 @@
+"""Scripted agents acting on batches of environment observations.
+
+A batched agent receives a stack of N observations, as produced by an environment's observation
+set, and returns an ``(N, 1 + P)`` action matrix in the format :meth:`DefaultActionSet.transform_actions`
+consumes, so scripted baselines can drive many environments with a handful of array operations.
+"""
+import numpy as np
+from scipy import ndimage
+from pysc2.lib import actions
+
+# Connects pixels within a screen only, never across the batch dimension.
+_SCREEN_STRUCTURE = np.zeros((3, 3, 3), dtype=bool)
+_SCREEN_STRUCTURE[1] = ndimage.generate_binary_structure(2, 2)
+
+
+def label_components(masks):
+    """Labels the connected components of a stack of binary screens.
+
+    Args:
+        masks: a boolean array of shape ``(N, H, W)``.
+
+    Returns:
+        A tuple of three arrays with one entry per component: the index of its screen in the batch,
+        its centroid as ``(x, y)`` screen coordinates of shape ``(K, 2)``, and its number of pixels.
+    """
+    labels, num_components = ndimage.label(masks, structure=_SCREEN_STRUCTURE)
+    batch, y, x = np.nonzero(labels)
+    component = labels[batch, y, x] - 1
+    sizes = np.bincount(component, minlength=num_components)
+    centroids = np.stack([np.bincount(component, weights=x, minlength=num_components),
+                          np.bincount(component, weights=y, minlength=num_components)], axis=1)
+    centroids /= np.maximum(sizes, 1)[:, None]
+    # Every component lies within one screen, so the batch index of any of its pixels will do.
+    screens = np.zeros(num_components, dtype=np.int64)
+    screens[component] = batch
+    return screens, centroids, sizes
+
+
+def screen_centroids(masks):
+    """Returns the ``(x, y)`` centroid of every screen of a ``(N, H, W)`` stack, and whether the screen has any pixel."""
+    masks = np.asarray(masks, dtype=np.float64)
+    counts = masks.sum(axis=(1, 2))
+    x = (masks.sum(axis=1) * np.arange(masks.shape[2])).sum(axis=1)
+    y = (masks.sum(axis=2) * np.arange(masks.shape[1])).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.stack([x / counts, y / counts], axis=1), counts > 0
+
+
+class BatchedScriptedAgent:
+    """The base class of scripted agents acting on batches of observations.
+
+    Args:
+        action_set (DefaultActionSet): the action set of the environments the actions are meant for.
+    """
+
+    def __init__(self, action_set):
+        self._action_set = action_set
+
+    def encode(self, function_call):
+        """Returns the action vector of a pysc2 function call, raising if the action set cannot express it."""
+        vectors, encoded = self._action_set.encode_function_calls([function_call])
+        if not encoded[0]:
+            raise Exception("The action set has no action for {}.".format(function_call))
+        return vectors[0]
+
+    def step(self, observations, available_actions=None):
+        """Returns an ``(N, 1 + P)`` action matrix for a batch of observations.
+
+        Args:
+            observations: a dict of arrays whose first dimension is the batch size.
+            available_actions: a boolean array of shape ``(N, num_actions)``, or None if every action is available.
+        """
+        raise NotImplementedError
+
+
+class BatchedNoOpAgent(BatchedScriptedAgent):
+    """Does nothing in every environment."""
+
+    def __init__(self, action_set):
+        super().__init__(action_set)
+        self._no_op = self.encode(actions.FUNCTIONS.no_op())
+
+    def step(self, observations, available_actions=None):
+        batch_size = len(next(iter(observations.values())))
+        return np.tile(self._no_op, (batch_size, 1))
+
+
+class BatchedMoveToBeacon(BatchedScriptedAgent):
+    """Moves the army to the beacon nearest to its centroid, selecting the army first when it cannot move.
+
+    Beacons are the connected components of the neutral unit layer, found for the whole batch with
+    one labelling pass, and the nearest beacon of every screen is chosen with a single sort.
+
+    Args:
+        action_set (DefaultActionSet): the action set of the environments, e.g. of :class:`MoveToBeaconEnv`.
+        observation_key (str): the observation holding the screen layers.
+        self_channel (int): the channel of the layer marking allied units.
+        neutral_channel (int): the channel of the layer marking neutral units.
+    """
+
+    def __init__(self, action_set, observation_key='feature_screen', self_channel=0, neutral_channel=1):
+        super().__init__(action_set)
+        self._observation_key = observation_key
+        self._self_channel = self_channel
+        self._neutral_channel = neutral_channel
+        self._no_op = self.encode(actions.FUNCTIONS.no_op())
+        self._select_army = self.encode(actions.FUNCTIONS.select_army("select"))
+        self._move = self.encode(actions.FUNCTIONS.Move_screen("now", [0, 0]))
+        self._screen_column = action_set.argument_column(actions.TYPES.screen)
+        self._screen_size = int(round(np.sqrt(action_set.convert_to_gym_action_spaces().nvec[self._screen_column])))
+
+    def targets(self, screens):
+        """Returns the ``(x, y)`` target of every screen of a ``(N, C, H, W)`` stack, and whether it has one."""
+        screens = np.asarray(screens)
+        marines, has_marines = screen_centroids(screens[:, self._self_channel] > 0)
+        beacon_screens, beacons, _ = label_components(screens[:, self._neutral_channel] > 0)
+        distances = np.linalg.norm(beacons - marines[beacon_screens], axis=1)
+        # Sorting by screen, then distance, puts the nearest beacon of every screen first.
+        order = np.lexsort((distances, beacon_screens))
+        first = order[np.r_[True, np.diff(beacon_screens[order]) != 0]] if len(order) else order
+        targets = np.zeros((len(screens), 2))
+        has_target = np.zeros(len(screens), dtype=bool)
+        targets[beacon_screens[first]] = beacons[first]
+        has_target[beacon_screens[first]] = True
+        return targets, has_target & has_marines
+
+    def step(self, observations, available_actions=None):
+        screens = np.asarray(observations[self._observation_key])
+        size = self._screen_size
+        if available_actions is None:
+            available_actions = np.ones((len(screens), len(self._action_set.available_actions)), dtype=bool)
+        available_actions = np.asarray(available_actions, dtype=bool)
+        can_move = available_actions[:, self._move[0]]
+        can_select = available_actions[:, self._select_army[0]]
+
+        targets, has_target = self.targets(screens)
+        output = np.tile(self._no_op, (len(screens), 1))
+        output[can_select & ~can_move] = self._select_army
+        move = can_move & has_target
+        xy = np.clip(np.rint(targets[move]).astype(np.int64), 0, size - 1)
+        output[move] = self._move
+        output[move, self._screen_column] = xy[:, 0] * size + xy[:, 1]
+        return output
@@ -0,0 +1,2 @@
+from sc2ai.data.trajectory import TrajectoryWriter, TrajectoryReader
+from sc2ai.data.dataset import TrajectoryDataset, Prefetcher
@@ -0,0 +1,231 @@
+"""Random access to recorded trajectories for offline training, with threaded prefetching."""
+import queue
+import threading
+import numpy as np
+from sc2ai.data.trajectory import TrajectoryReader, OBS_PREFIX
+
+NEXT_OBS_PREFIX = "next_" + OBS_PREFIX
+
+
+class TrajectoryDataset:
+    """Samples steps and sequences of a trajectory directory without loading whole shards.
+
+    Every step is addressed by a global index. The shard and row of each step, and of the
+    observation following it, are kept in flat arrays, so a batch is gathered with one fancy
+    index per shard it touches; only the sampled rows of memory-mapped shards are read. Shards are
+    opened when first sampled, and only the most recently used ones are kept open.
+
+    Args:
+        directory (str): a directory written by :class:`TrajectoryWriter`.
+        next_observations (bool): also gathers the next observation of every step, as ``next_obs`` columns.
+        max_open_shards (int): the number of shards kept open, as memory maps or decompressed arrays.
+    """
+
+    def __init__(self, directory, next_observations=False, max_open_shards=64):
+        self.reader = TrajectoryReader(directory, max_open_shards=max_open_shards)
+        self._next_observations = next_observations
+        self._shards = []
+        shard_ids, rows, next_shard_ids, next_rows, episode_ids, steps = [], [], [], [], [], []
+        for episode in range(len(self.reader)):
+            shards = self.reader.episode_shards(episode)
+            for i, shard in enumerate(shards):
+                shard_id = len(self._shards)
+                self._shards.append(shard)
+                shard_ids.append(np.full(shard["steps"], shard_id))
+                rows.append(np.arange(shard["steps"]))
+                # The observation after the last step of a shard is the first row of the next shard.
+                next_shard_ids.append(np.full(shard["steps"], shard_id))
+                next_rows.append(np.arange(1, shard["steps"] + 1))
+                if i < len(shards) - 1:
+                    next_shard_ids[-1][-1], next_rows[-1][-1] = shard_id + 1, 0
+                episode_ids.append(np.full(shard["steps"], episode))
+                steps.append(shard["start"] + np.arange(shard["steps"]))
+        concatenate = lambda parts: np.concatenate(parts).astype(np.int64) if parts else np.zeros(0, dtype=np.int64)
+        self._shard_ids, self._rows = concatenate(shard_ids), concatenate(rows)
+        self._next_shard_ids, self._next_rows = concatenate(next_shard_ids), concatenate(next_rows)
+        self._episode_ids, self._steps = concatenate(episode_ids), concatenate(steps)
+        self.episode_lengths = self.reader.episode_lengths
+        self.episode_starts = np.concatenate([[0], np.cumsum(self.episode_lengths)[:-1]]).astype(np.int64)
+        self._sequence_starts = {}
+
+    def __len__(self):
+        return len(self._shard_ids)
+
+    @property
+    def columns(self):
+        """A dict mapping the name of every gathered column to the shape and dtype of one step."""
+        if not self._shards:
+            return {}
+        columns = {name: (column.shape[1:], column.dtype)
+                   for name, column in self.reader.shard_columns(self._shards[0]).items()}
+        if self._next_observations:
+            columns.update({NEXT_OBS_PREFIX + name[len(OBS_PREFIX):]: spec for name, spec in columns.items()
+                            if name.startswith(OBS_PREFIX)})
+        return columns
+
+    def allocate(self, batch_shape):
+        """Returns a dict of empty arrays holding a batch of the given leading shape."""
+        batch_shape = tuple(np.atleast_1d(batch_shape))
+        return {name: np.empty(batch_shape + shape, dtype=dtype) for name, (shape, dtype) in self.columns.items()}
+
+    def _gather_rows(self, shard_ids, rows, names, out, prefix=None):
+        if len(shard_ids) == 0:
+            return
+        order = np.argsort(shard_ids, kind="stable")
+        sorted_shards = shard_ids[order]
+        bounds = np.flatnonzero(np.diff(sorted_shards)) + 1
+        for segment in np.split(order, bounds):
+            shard = self.reader.shard_columns(self._shards[shard_ids[segment[0]]])
+            segment_rows = rows[segment]
+            for name in names:
+                target = name if prefix is None else NEXT_OBS_PREFIX + name[len(OBS_PREFIX):]
+                out[target][segment] = shard[name][segment_rows]
+
+    def gather(self, indices, out=None):
+        """Gathers the columns of steps by global index.
+
+        Args:
+            indices: an integer array of global step indices, of any shape.
+            out (dict): arrays from :meth:`allocate` to fill, or None to allocate them.
+
+        Returns:
+            A dict of arrays whose leading dimensions are the shape of ``indices``.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if out is None:
+            out = self.allocate(indices.shape)
+        flat = {name: array.reshape((indices.size,) + array.shape[indices.ndim:]) for name, array in out.items()}
+        indices = indices.reshape(-1)
+        names = list(self.reader.shard_columns(self._shards[0])) if self._shards else []
+        self._gather_rows(self._shard_ids[indices], self._rows[indices], names, flat)
+        if self._next_observations:
+            obs_names = [name for name in names if name.startswith(OBS_PREFIX)]
+            self._gather_rows(self._next_shard_ids[indices], self._next_rows[indices], obs_names, flat,
+                              prefix=NEXT_OBS_PREFIX)
+        return out
+
+    def sample(self, batch_size, rng=np.random, out=None):
+        """Gathers ``batch_size`` steps drawn uniformly from all episodes."""
+        return self.gather(rng.randint(len(self), size=batch_size), out)
+
+    def sequence_starts(self, length):
+        """Returns the global indices of the steps starting a sequence of ``length`` steps within one episode."""
+        if length not in self._sequence_starts:
+            remaining = self.episode_lengths[self._episode_ids] - self._steps
+            self._sequence_starts[length] = np.flatnonzero(remaining >= length)
+        return self._sequence_starts[length]
+
+    def sample_sequences(self, batch_size, length, rng=np.random, out=None):
+        """Gathers ``batch_size`` sequences of ``length`` consecutive steps, with arrays of shape ``(batch_size, length, ...)``."""
+        starts = self.sequence_starts(length)
+        if len(starts) == 0:
+            raise Exception("No episode has {} steps.".format(length))
+        indices = starts[rng.randint(len(starts), size=batch_size)][:, None] + np.arange(length)
+        return self.gather(indices, out)
+
+
+class Prefetcher:
+    """Samples batches on worker threads into a ring of reusable, pinned host buffers.
+
+    Workers take a free buffer, fill it from the dataset and queue it, so sampling overlaps with
+    training. A batch returned by :meth:`next` stays valid until the following call, when its buffer
+    is handed back to the workers.
+
+    Args:
+        dataset (TrajectoryDataset): the dataset to sample from.
+        batch_size (int): the number of steps, or of sequences, per batch.
+        sequence_length (int): samples sequences of this length if given, single steps otherwise.
+        num_workers (int): the number of sampling threads.
+        depth (int): the number of buffers, bounding the batches sampled ahead.
+        seed (int): seeds the random state of every worker.
+        device (torch.device): batches are copied to this device if given.
+        pin_memory (bool): allocates page-locked buffers. Defaults to whether CUDA is available.
+    """
+
+    def __init__(self, dataset, batch_size, sequence_length=None, num_workers=2, depth=4, seed=0, device=None,
+                 pin_memory=None):
+        import torch
+        self._torch = torch
+        self._dataset = dataset
+        self._batch_size = batch_size
+        self._sequence_length = sequence_length
+        self._device = device
+        if pin_memory is None:
+            pin_memory = torch.cuda.is_available()
+        batch_shape = (batch_size,) if sequence_length is None else (batch_size, sequence_length)
+        self._tensors, self._arrays = [], []
+        for _ in range(max(depth, num_workers + 1)):
+            tensors = {name: torch.from_numpy(array).pin_memory() if pin_memory else torch.from_numpy(array)
+                       for name, array in dataset.allocate(batch_shape).items()}
+            self._tensors.append(tensors)
+            self._arrays.append({name: tensor.numpy() for name, tensor in tensors.items()})
+        self._free = queue.Queue()
+        for slot in range(len(self._tensors)):
+            self._free.put(slot)
+        self._ready = queue.Queue()
+        self._current = None
+        self._copied = None
+        self._stop = threading.Event()
+        self._workers = [threading.Thread(target=self._work, args=(np.random.RandomState(seed + i),), daemon=True,
+                                          name="prefetch-{}".format(i)) for i in range(num_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def _work(self, rng):
+        while not self._stop.is_set():
+            try:
+                slot = self._free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                if self._sequence_length is None:
+                    self._dataset.sample(self._batch_size, rng, out=self._arrays[slot])
+                else:
+                    self._dataset.sample_sequences(self._batch_size, self._sequence_length, rng, out=self._arrays[slot])
+            except Exception as e:
+                self._ready.put(e)
+                return
+            self._ready.put(slot)
+
+    def _release(self):
+        if self._current is None:
+            return
+        if self._copied is not None:
+            # Asynchronous copies must finish reading the buffer before it is refilled.
+            self._copied.synchronize()
+            self._copied = None
+        self._free.put(self._current)
+        self._current = None
+
+    def next(self):
+        """Returns the next batch as a dict of tensors."""
+        self._release()
+        slot = self._ready.get()
+        if isinstance(slot, Exception):
+            raise slot
+        self._current = slot
+        batch = self._tensors[slot]
+        if self._device is None:
+            return batch
+        batch = {name: tensor.to(self._device, non_blocking=True) for name, tensor in batch.items()}
+        if self._torch.device(self._device).type == "cuda":
+            self._copied = self._torch.cuda.Event()
+            self._copied.record()
+        return batch
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
+
+    def close(self):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
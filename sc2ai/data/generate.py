@@ -0,0 +1,226 @@
+"""Bulk generation of demonstrations by scripted pysc2 agents running in parallel processes.
+
+    python -m sc2ai.run generate MoveToBeacon demos --agent sc2ai.basic_agents:MoveToBeacon --episodes 1000 --parallel 8
+"""
+import argparse
+import logging
+import multiprocessing
+import queue
+import time
+import traceback
+import numpy as np
+from sc2ai.data.trajectory import TrajectoryWriter
+
+logger = logging.getLogger(__name__)
+
+EXAMPLE_USAGE = """
+Example Usage via run.py:
+    python3 run.py generate MoveToBeacon demos --agent sc2ai.basic_agents:MoveToBeacon --episodes 100 --parallel 4
+"""
+
+
+def play_episode(env, agent, max_steps=None):
+    """Plays an episode of a pysc2 agent in a :class:`SingleAgentSC2Env`.
+
+    The function calls of the agent are encoded into action vectors of the environment's action
+    set, so the recorded actions are the ones a network trained on the environment would output.
+
+    Returns:
+        A tuple of the episode columns, as lists for :meth:`TrajectoryWriter.write_episode`, and a dict of statistics.
+    """
+    from pysc2.env.environment import StepType, TimeStep
+    obs = env.reset()
+    agent.reset()
+    episode = dict(observations=[obs], actions=[], rewards=[], dones=[], available_actions=[])
+    timestep = TimeStep(StepType.FIRST, 0.0, 1.0, env.current_raw_obs)
+    stats = dict(steps=0, episode_return=0.0, agent_seconds=0.0, unencoded=0, outcome=0.0, truncated=False)
+    done = False
+    while not done:
+        agent_start = time.time()
+        function_call = agent.step(timestep)
+        stats['agent_seconds'] += time.time() - agent_start
+        vectors, encoded = env.action_set.encode_function_calls([function_call])
+        stats['unencoded'] += int(not encoded[0])
+        available_actions = env.action_set.available_actions
+        obs, reward, done, info = env.step([vectors[0]])
+        stats['steps'] += 1
+        if max_steps is not None and stats['steps'] >= max_steps and not done:
+            done, info = True, dict(info, truncated=True)
+        episode['observations'].append(obs)
+        episode['actions'].append(vectors[0])
+        episode['rewards'].append(reward)
+        episode['dones'].append(done)
+        episode['available_actions'].append(available_actions)
+        stats['episode_return'] += reward
+        stats['truncated'] = bool(info.get('truncated', False))
+        timestep = TimeStep(StepType.LAST if done else StepType.MID, reward, 0.0 if done else 1.0,
+                            env.current_raw_obs)
+    stats['outcome'] = float(reward)
+    return episode, stats
+
+
+def _work(worker_id, map_name, agent, env_kwargs, max_steps, tasks, results):
+    from absl import flags
+    flags.FLAGS.mark_as_parsed()
+    from sc2ai.envs import make_sc2env
+    from sc2ai.envs.registry import load_entry_point
+
+    env = make_sc2env(map=map_name, prelaunch=True, **env_kwargs)
+    agent = load_entry_point(agent)()
+    started = time.time()
+    busy = blocked = 0.0
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            episode_start = time.time()
+            try:
+                episode, stats = play_episode(env, agent, max_steps)
+            except Exception:
+                busy += time.time() - episode_start
+                results.put(("error", worker_id, traceback.format_exc()))
+                continue
+            busy += time.time() - episode_start
+            stats['seconds'] = time.time() - episode_start
+            # Blocks while the writer is behind, which bounds the episodes held in memory.
+            put_start = time.time()
+            results.put(("episode", worker_id, (episode, stats)))
+            blocked += time.time() - put_start
+    finally:
+        env.close()
+        results.put(("done", worker_id, dict(busy=busy, blocked=blocked, seconds=time.time() - started)))
+
+
+def generate(map_name, agent, out, num_episodes=100, num_workers=None, max_steps=None, queue_size=None,
+             chunk_size=1024, compress=False, report_every=60.0, env_kwargs=dict()):
+    """Plays episodes of a scripted agent in a pool of processes and records them to one trajectory directory.
+
+    Every worker process runs its own environment and agent, and sends finished episodes to this
+    process, which writes them with a :class:`TrajectoryWriter`. The queue of finished episodes is
+    bounded, so workers wait when writing falls behind instead of accumulating episodes in memory.
+
+    Args:
+        map_name (str): a registered map name.
+        agent: a pysc2 agent class or a ``module:Class`` string, e.g. ``sc2ai.basic_agents:MoveToBeacon``.
+        out (str): the output trajectory directory.
+        num_episodes (int): the total number of episodes to play.
+        num_workers (int): the number of processes, by default the ``parallel`` environment option.
+        max_steps (int): truncates episodes after this many steps.
+        queue_size (int): the maximum number of finished episodes waiting to be written, by default twice the workers.
+        chunk_size (int): steps per shard.
+        compress (bool): writes compressed shards.
+        report_every (float): seconds between progress reports.
+        env_kwargs (dict): options of the environments, see :class:`SC2EnvOptions`.
+
+    Returns:
+        A dict of the games per hour, steps per second, mean return, win rate (the fraction of episodes
+        ending with a positive reward, the game outcome on melee maps), errors, and the utilization
+        and back-pressure wait of every worker.
+    """
+    if num_workers is None:
+        from sc2ai.envs.game_info import default_env_options
+        num_workers = env_kwargs.get('parallel', default_env_options.parallel)
+    context = multiprocessing.get_context("spawn")
+    tasks = context.Queue()
+    results = context.Queue(maxsize=queue_size or 2 * num_workers)
+    for episode in range(num_episodes):
+        tasks.put(episode)
+    for _ in range(num_workers):
+        tasks.put(None)
+    workers = [context.Process(target=_work, args=(i, map_name, agent, env_kwargs, max_steps, tasks, results),
+                               name="generate-{}".format(i)) for i in range(num_workers)]
+    for worker in workers:
+        worker.start()
+
+    start = last_report = time.time()
+    steps = errors = 0
+    returns, outcomes = [], []
+    worker_stats = {}
+    write_seconds = 0.0
+    with TrajectoryWriter(out, chunk_size=chunk_size, compress=compress) as writer:
+        while len(worker_stats) < num_workers:
+            try:
+                kind, worker_id, payload = results.get(timeout=report_every)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    logger.error("All workers exited without finishing.")
+                    break
+                kind = None
+            if kind == "episode":
+                episode, stats = payload
+                write_start = time.time()
+                writer.write_episode(**episode)
+                write_seconds += time.time() - write_start
+                steps += stats['steps']
+                returns.append(stats['episode_return'])
+                if not stats['truncated']:
+                    outcomes.append(stats['outcome'] > 0)
+                if stats['unencoded']:
+                    logger.warning("Worker %d: %d calls of the agent are not in the action set and were recorded "
+                                   "as no-ops.", worker_id, stats['unencoded'])
+            elif kind == "error":
+                errors += 1
+                logger.error("Worker %d failed an episode:\n%s", worker_id, payload)
+            elif kind == "done":
+                worker_stats[worker_id] = payload
+            if time.time() - last_report >= report_every:
+                last_report = time.time()
+                elapsed = last_report - start
+                logger.info("%d/%d episodes, %.1f games/hour, %.1f steps/s, %d errors", len(returns), num_episodes,
+                            len(returns) * 3600.0 / elapsed, steps / elapsed, errors)
+    for worker in workers:
+        worker.join()
+
+    elapsed = time.time() - start
+    report = dict(episodes=len(returns), steps=steps, seconds=elapsed, errors=errors,
+                  games_per_hour=len(returns) * 3600.0 / elapsed, steps_per_second=steps / elapsed,
+                  mean_return=float(np.mean(returns)) if returns else float('nan'),
+                  win_rate=float(np.mean(outcomes)) if outcomes else float('nan'),
+                  writer_utilization=write_seconds / elapsed,
+                  worker_utilization={i: stats['busy'] / max(stats['seconds'], 1e-9)
+                                      for i, stats in sorted(worker_stats.items())},
+                  worker_blocked_seconds={i: stats['blocked'] for i, stats in sorted(worker_stats.items())})
+    return report
+
+
+def create_parser(parser_creator=None):
+    parser_creator = parser_creator or argparse.ArgumentParser
+    parser = parser_creator(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Record demonstrations of a scripted agent with parallel environments.",
+        epilog=EXAMPLE_USAGE)
+
+    parser.add_argument(
+        "mapname", type=str, help="Name of the minimap.")
+    parser.add_argument(
+        "out", type=str, help="Output directory of the recorded trajectories.")
+    parser.add_argument(
+        "--agent", type=str, default="sc2ai.basic_agents:MoveToBeacon", help="The agent class as module:Class.")
+    parser.add_argument(
+        "--episodes", type=int, default=100, help="Number of episodes to record.")
+    parser.add_argument(
+        "--parallel", type=int, default=None, help="Number of environments running in parallel.")
+    parser.add_argument(
+        "--max-steps", type=int, default=None, help="Number of steps after which episodes are truncated.")
+    parser.add_argument(
+        "--compress",
+        default=False,
+        action="store_const",
+        const=True,
+        help="Write compressed shards.")
+    return parser
+
+
+def run(args, parser):
+    logging.basicConfig(level=logging.INFO)
+    report = generate(args.mapname, args.agent, args.out, num_episodes=args.episodes, num_workers=args.parallel,
+                      max_steps=args.max_steps, compress=args.compress)
+    for key, value in report.items():
+        print("{:<24s} {}".format(key, value))
+
+
+if __name__ == "__main__":
+    parser = create_parser()
+    args = parser.parse_args()
+    run(args, parser)
@@ -0,0 +1,49 @@
+import numpy as np
+from .dataset import TrajectoryDataset, Prefetcher
+from .trajectory import TrajectoryWriter
+
+
+def write_counting_episodes(directory, lengths, chunk_size=3):
+    """Writes episodes whose observation at step t of episode e is 100 * e + t."""
+    with TrajectoryWriter(directory, chunk_size=chunk_size) as writer:
+        for e, length in enumerate(lengths):
+            writer.begin_episode(np.full(2, 100 * e, dtype=np.int64))
+            for t in range(length):
+                writer.append(t, 1.0, t == length - 1, np.full(2, 100 * e + t + 1, dtype=np.int64),
+                              available_actions=np.array([True, t % 2 == 0]))
+
+
+class TestTrajectoryDataset:
+    def test_gather_with_next_observations(self, tmp_path):
+        write_counting_episodes(str(tmp_path), [5, 4])
+        dataset = TrajectoryDataset(str(tmp_path), next_observations=True)
+        assert len(dataset) == 9
+        batch = dataset.gather(np.arange(9))
+        np.testing.assert_array_equal(batch["obs"][:, 0], [0, 1, 2, 3, 4, 100, 101, 102, 103])
+        np.testing.assert_array_equal(batch["next_obs"][:, 0], batch["obs"][:, 0] + 1)
+        np.testing.assert_array_equal(batch["action"], [0, 1, 2, 3, 4, 0, 1, 2, 3])
+        assert batch["available_actions"].dtype == bool
+
+    def test_sequences_stay_within_episodes(self, tmp_path):
+        write_counting_episodes(str(tmp_path), [5, 2, 4])
+        dataset = TrajectoryDataset(str(tmp_path))
+        assert len(dataset.sequence_starts(4)) == 3
+        batch = dataset.sample_sequences(32, 4, np.random.RandomState(0))
+        assert batch["obs"].shape == (32, 4, 2)
+        np.testing.assert_array_equal(np.diff(batch["obs"][:, :, 0], axis=1), 1)
+
+    def test_shards_are_opened_lazily(self, tmp_path):
+        write_counting_episodes(str(tmp_path), [5, 4], chunk_size=2)
+        dataset = TrajectoryDataset(str(tmp_path), max_open_shards=2)
+        assert len(dataset.reader._open) == 0
+        batch = dataset.gather(np.arange(9))
+        np.testing.assert_array_equal(batch["obs"][:, 0], [0, 1, 2, 3, 4, 100, 101, 102, 103])
+        assert len(dataset.reader._open) == 2
+
+    def test_prefetcher(self, tmp_path):
+        write_counting_episodes(str(tmp_path), [6, 6])
+        with Prefetcher(TrajectoryDataset(str(tmp_path)), 8, num_workers=2, depth=3) as prefetcher:
+            for _ in range(10):
+                batch = prefetcher.next()
+                assert tuple(batch["obs"].shape) == (8, 2)
+                assert ((batch["obs"][:, 0] % 100) == batch["action"]).all()
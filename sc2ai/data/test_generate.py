@@ -0,0 +1,52 @@
+import numpy as np
+from pysc2.lib import actions
+from sc2ai.envs import env_spaces, make_sc2env
+from .generate import play_episode
+from .trajectory import TrajectoryWriter, TrajectoryReader
+
+
+class FakeEnv:
+    """Steps the action set of MoveToBeacon without launching StarCraft II."""
+    def __init__(self, length):
+        self.action_set = make_sc2env(map="MoveToBeacon").action_set
+        self.action_set.update_available_actions(np.array([actions.FUNCTIONS.no_op.id, actions.FUNCTIONS.select_army.id]))
+        self.current_raw_obs = {}
+        self._length = length
+        self._t = 0
+
+    def reset(self):
+        self._t = 0
+        return {"feature_screen": np.zeros((2, 4, 4), dtype=np.uint8)}
+
+    def step(self, vectors):
+        self._t += 1
+        obs = {"feature_screen": np.full((2, 4, 4), self._t, dtype=np.uint8)}
+        return obs, 1.0, self._t == self._length, {}
+
+
+class FakeAgent:
+    def reset(self):
+        pass
+
+    def step(self, timestep):
+        return actions.FUNCTIONS.select_army("select") if timestep.first() else actions.FUNCTIONS.Move_screen("now", [3, 5])
+
+
+class TestGenerate:
+    def test_encode_function_calls(self):
+        action_set = make_sc2env(map="MoveToBeacon").action_set
+        calls = [actions.FUNCTIONS.Move_screen("now", [3, 5]), actions.FUNCTIONS.select_army("add")]
+        matrix, encoded = action_set.encode_function_calls(calls)
+        assert list(encoded) == [True, False]
+        assert action_set.transform_actions(matrix[:1], available_actions=np.ones((1, 5), dtype=bool))[0] == calls[0]
+        assert matrix[1, 0] == 0
+
+    def test_play_and_write_episode(self, tmp_path):
+        episode, stats = play_episode(FakeEnv(3), FakeAgent())
+        assert stats["steps"] == 3 and stats["episode_return"] == 3.0 and stats["unencoded"] == 0
+        with TrajectoryWriter(str(tmp_path)) as writer:
+            writer.write_episode(**episode)
+        columns = TrajectoryReader(str(tmp_path)).episode(0)
+        assert columns["obs.feature_screen"].shape == (4, 2, 4, 4)
+        assert list(columns["action"][:, 0]) == [3, 4, 4]
+        assert columns["available_actions"].shape == (3, env_spaces("MoveToBeacon").action_space.nvec[0])
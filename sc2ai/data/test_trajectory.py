@@ -0,0 +1,68 @@
+import numpy as np
+from .trajectory import TrajectoryWriter, TrajectoryReader
+
+
+def write_episodes(directory, lengths, chunk_size, compress=False):
+    episodes = []
+    with TrajectoryWriter(directory, chunk_size=chunk_size, compress=compress) as writer:
+        for length in lengths:
+            screens = np.random.randint(0, 5, size=(length + 1, 2, 4, 4)).astype(np.uint8)
+            writer.begin_episode({"feature_screen": screens[0]})
+            for t in range(length):
+                writer.append([t, t + 1], float(t), t == length - 1, {"feature_screen": screens[t + 1]})
+            episodes.append(screens)
+    return episodes
+
+
+class TestTrajectory:
+    def test_roundtrip_across_shards(self, tmp_path):
+        episodes = write_episodes(str(tmp_path), [5, 3], chunk_size=2)
+        reader = TrajectoryReader(str(tmp_path))
+        assert len(reader) == 2
+        assert list(reader.episode_lengths) == [5, 3]
+        assert list(reader.episode_returns) == [10.0, 3.0]
+        for i, screens in enumerate(episodes):
+            columns = reader.episode(i)
+            np.testing.assert_array_equal(columns["obs.feature_screen"], screens)
+            assert columns["done"][-1] and not columns["done"][:-1].any()
+        transitions = list(reader.transitions())
+        assert len(transitions) == 8
+        obs, action, reward, next_obs, done = transitions[1]
+        np.testing.assert_array_equal(next_obs["feature_screen"], episodes[0][2])
+        assert list(action) == [1, 2] and reward == 1.0 and not done
+
+    def test_single_shard_is_memory_mapped(self, tmp_path):
+        write_episodes(str(tmp_path), [3], chunk_size=8)
+        columns = TrajectoryReader(str(tmp_path)).episode(0)
+        assert isinstance(columns["obs.feature_screen"], np.memmap)
+        assert len(columns["obs.feature_screen"]) == 4
+
+    def test_compressed_and_appended(self, tmp_path):
+        write_episodes(str(tmp_path), [4], chunk_size=3, compress=True)
+        episodes = write_episodes(str(tmp_path), [2], chunk_size=3, compress=True)
+        reader = TrajectoryReader(str(tmp_path))
+        assert list(reader.episode_lengths) == [4, 2]
+        np.testing.assert_array_equal(reader.episode(1)["obs.feature_screen"], episodes[0])
+
+    def test_unfinished_episodes_are_skipped(self, tmp_path):
+        writer = TrajectoryWriter(str(tmp_path), chunk_size=2)
+        writer.begin_episode(np.zeros(3))
+        for t in range(3):
+            writer.append(0, 1.0, False, np.full(3, t + 1.0))
+        assert len(TrajectoryReader(str(tmp_path))) == 0
+        writer.close()
+        reader = TrajectoryReader(str(tmp_path))
+        assert list(reader.episode_lengths) == [3]
+        assert reader.episode(0)["obs"][-1, 0] == 3.0
+
+    def test_column_dtypes(self, tmp_path):
+        with TrajectoryWriter(str(tmp_path), chunk_size=4, dtypes={"value": np.float16}) as writer:
+            writer.begin_episode(np.zeros(2, dtype=np.uint8))
+            writer.append(0, 0, False, np.ones(2, dtype=np.uint8), value=1, extra=2)
+            writer.append(1, 0.5, True, np.ones(2, dtype=np.uint8), value=0.25, extra=2.5)
+        columns = TrajectoryReader(str(tmp_path)).episode(0)
+        # An integer first reward must not truncate the later float rewards.
+        assert columns["reward"].dtype == np.float32 and list(columns["reward"]) == [0.0, 0.5]
+        assert columns["done"].dtype == np.bool_ and columns["obs"].dtype == np.uint8
+        assert columns["value"].dtype == np.float16 and list(columns["value"]) == [1.0, 0.25]
+        assert list(columns["extra"]) == [2.0, 2.5]
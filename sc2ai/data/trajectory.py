@@ -0,0 +1,265 @@
+"""Streaming storage of trajectories as chunked column shards, and a memory-mapped reader.
+
+A trajectory directory holds one sub-directory per shard and an ``index.jsonl`` file::
+
+    index.jsonl
+    shard_000000/obs.feature_screen.npy
+    shard_000000/action.npy
+    shard_000000/reward.npy
+    shard_000000/done.npy
+
+Every shard holds consecutive steps of a single episode, at most ``chunk_size`` of them, as one
+``.npy`` file per column (or one compressed ``.npz`` file). Each observation is stored once: the
+observation columns hold the observation *before* every step, and the last shard of an episode
+holds one extra row with the final observation. A line of the index is written after its shard
+is complete, so a crash loses at most the steps of the shard being filled.
+"""
+import json
+import os
+import os.path as osp
+import threading
+from collections import OrderedDict
+import numpy as np
+
+INDEX_FILE = "index.jsonl"
+OBS_PREFIX = "obs"
+DEFAULT_DTYPES = {"reward": np.float32, "done": np.bool_}
+
+
+def _flatten_observation(obs):
+    if isinstance(obs, dict):
+        return {OBS_PREFIX + "." + key: value for key, value in obs.items()}
+    return {OBS_PREFIX: obs}
+
+
+class TrajectoryWriter:
+    """Appends steps to a trajectory directory with memory bounded by one chunk per column.
+
+    Args:
+        directory (str): the output directory, created if necessary. Existing shards are kept.
+        chunk_size (int): the maximum number of steps per shard.
+        compress (bool): writes shards as compressed ``.npz`` files, which are smaller but cannot
+            be memory-mapped by the reader.
+        dtypes (dict): the dtype of columns by name, added to :data:`DEFAULT_DTYPES`. Other columns
+            take the dtype of their first value and are promoted when a later value is of another
+            kind, e.g. a float after integers.
+    """
+
+    def __init__(self, directory, chunk_size=1024, compress=False, dtypes=None):
+        self._directory = directory
+        self._chunk_size = chunk_size
+        self._compress = compress
+        self._dtypes = dict(DEFAULT_DTYPES, **(dtypes or {}))
+        os.makedirs(directory, exist_ok=True)
+        self._index = open(osp.join(directory, INDEX_FILE), "a")
+        self._num_shards = len([name for name in os.listdir(directory) if name.startswith("shard_")])
+        self._num_episodes = self._count_episodes()
+        self._columns = None
+        self._obs = None
+        self._steps = 0
+        self._episode_start = 0
+        self._episode_return = 0.0
+
+    def _count_episodes(self):
+        episodes = set()
+        with open(osp.join(self._directory, INDEX_FILE)) as f:
+            for line in f:
+                episodes.add(json.loads(line)["episode"])
+        return len(episodes)
+
+    def _allocate(self, name, value):
+        value = np.asarray(value)
+        # Observation columns hold one extra row for the final observation of an episode.
+        rows = self._chunk_size + 1 if name.startswith(OBS_PREFIX) else self._chunk_size
+        self._columns[name] = np.zeros((rows,) + value.shape, dtype=self._dtypes.get(name, value.dtype))
+
+    def _put(self, name, row, value):
+        if name not in self._columns:
+            self._allocate(name, value)
+        column = self._columns[name]
+        if name not in self._dtypes:
+            dtype = np.asarray(value).dtype
+            if not np.can_cast(dtype, column.dtype, casting="same_kind"):
+                column = self._columns[name] = column.astype(np.result_type(column.dtype, dtype))
+        column[row] = value
+
+    @property
+    def num_episodes(self):
+        return self._num_episodes
+
+    def begin_episode(self, obs):
+        """Starts an episode with its initial observation."""
+        if self._obs is not None:
+            self.end_episode()
+        if self._columns is None:
+            self._columns = {}
+        self._obs = _flatten_observation(obs)
+        self._steps = 0
+        self._episode_start = 0
+        self._episode_return = 0.0
+
+    def append(self, action, reward, done, next_obs, **extras):
+        """Appends a step. The episode is flushed and ended if ``done``.
+
+        Args:
+            action: the action taken from the current observation.
+            reward (float): the reward received.
+            done (bool): whether the episode ended.
+            next_obs: the observation after the step, an array or a dict of arrays.
+            **extras: further per-step columns, e.g. ``available_actions``.
+        """
+        if self._obs is None:
+            raise Exception("begin_episode must be called before appending steps.")
+        if self._steps == self._chunk_size:
+            self._flush(final=False)
+        row = self._steps
+        for name, value in self._obs.items():
+            self._put(name, row, value)
+        self._put("action", row, action)
+        self._put("reward", row, reward)
+        self._put("done", row, done)
+        for name, value in extras.items():
+            self._put(name, row, value)
+        self._steps += 1
+        self._episode_return += float(reward)
+        self._obs = _flatten_observation(next_obs)
+        if done:
+            self.end_episode()
+
+    def write_episode(self, observations, actions, rewards, dones, **extras):
+        """Writes a complete episode given as per-step sequences, with one more observation than steps."""
+        self.begin_episode(observations[0])
+        for t in range(len(actions)):
+            self.append(actions[t], rewards[t], dones[t], observations[t + 1],
+                        **{name: values[t] for name, values in extras.items()})
+        self.end_episode()
+
+    def end_episode(self):
+        """Flushes the current episode, e.g. when it is cut off without ``done``."""
+        if self._obs is None:
+            return
+        for name, value in self._obs.items():
+            self._put(name, self._steps, value)
+        self._flush(final=True)
+        self._obs = None
+        self._num_episodes += 1
+
+    def _flush(self, final):
+        shard = "shard_{:06d}".format(self._num_shards)
+        path = osp.join(self._directory, shard)
+        os.makedirs(path, exist_ok=True)
+        columns = {}
+        for name, buffer in self._columns.items():
+            rows = self._steps + 1 if final and name.startswith(OBS_PREFIX) else self._steps
+            columns[name] = buffer[:rows]
+        if self._compress:
+            np.savez_compressed(osp.join(path, "columns.npz"), **columns)
+        else:
+            for name, column in columns.items():
+                np.save(osp.join(path, name + ".npy"), column)
+        self._index.write(json.dumps(dict(shard=shard, episode=self._num_episodes, start=self._episode_start,
+                                          steps=self._steps, final=final, compressed=self._compress,
+                                          episode_return=self._episode_return if final else None)) + "\n")
+        self._index.flush()
+        self._num_shards += 1
+        self._episode_start += self._steps
+        self._steps = 0
+
+    def close(self):
+        self.end_episode()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TrajectoryReader:
+    """Reads a trajectory directory, memory-mapping uncompressed shards.
+
+    Shards are opened on first access and the most recently used ones are kept open, so a large
+    directory holds at most ``max_open_shards`` memory maps or decompressed shards at a time.
+
+    Args:
+        directory (str): a directory written by :class:`TrajectoryWriter`.
+        max_open_shards (int): the number of shards kept open.
+    """
+
+    def __init__(self, directory, max_open_shards=64):
+        self._directory = directory
+        self._max_open_shards = max_open_shards
+        self._shards = []
+        with open(osp.join(directory, INDEX_FILE)) as f:
+            for line in f:
+                self._shards.append(json.loads(line))
+        # Only complete episodes are readable.
+        complete = {shard["episode"] for shard in self._shards if shard["final"]}
+        self._episodes = {}
+        for shard in self._shards:
+            if shard["episode"] in complete:
+                self._episodes.setdefault(shard["episode"], []).append(shard)
+        self._episode_ids = sorted(self._episodes)
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._episode_ids)
+
+    @property
+    def episode_lengths(self):
+        return np.array([sum(shard["steps"] for shard in self._episodes[episode]) for episode in self._episode_ids])
+
+    @property
+    def episode_returns(self):
+        return np.array([self._episodes[episode][-1]["episode_return"] for episode in self._episode_ids])
+
+    def shard_columns(self, shard):
+        """Returns a dict of the columns of a shard, memory-mapped unless the shard is compressed."""
+        name = shard["shard"]
+        with self._lock:
+            if name in self._open:
+                self._open.move_to_end(name)
+                return self._open[name]
+        path = osp.join(self._directory, name)
+        if shard["compressed"]:
+            with np.load(osp.join(path, "columns.npz")) as data:
+                columns = {key: data[key] for key in data.files}
+        else:
+            columns = {file[:-len(".npy")]: np.load(osp.join(path, file), mmap_mode="r")
+                       for file in os.listdir(path) if file.endswith(".npy")}
+        with self._lock:
+            self._open[name] = columns
+            while len(self._open) > self._max_open_shards:
+                self._open.popitem(last=False)
+        return columns
+
+    def episode_shards(self, i):
+        """Returns the index entries of the shards of the i-th complete episode, in order."""
+        return self._episodes[self._episode_ids[i]]
+
+    def episode(self, i):
+        """Returns the columns of the i-th complete episode. Observation columns have one row more than the others.
+
+        Episodes stored in a single shard are returned as memory-mapped views without copying.
+        """
+        parts = [self.shard_columns(shard) for shard in self.episode_shards(i)]
+        if len(parts) == 1:
+            return dict(parts[0])
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[-1]}
+
+    def observation(self, columns, t):
+        """Returns observation t of an episode's columns, a dict if the observations were dicts."""
+        if OBS_PREFIX in columns:
+            return columns[OBS_PREFIX][t]
+        return {name[len(OBS_PREFIX) + 1:]: column[t] for name, column in columns.items()
+                if name.startswith(OBS_PREFIX + ".")}
+
+    def transitions(self):
+        """Iterates over ``(obs, action, reward, next_obs, done)`` tuples of all complete episodes."""
+        for i in range(len(self)):
+            columns = self.episode(i)
+            for t in range(len(columns["reward"])):
+                yield (self.observation(columns, t), columns["action"][t], columns["reward"][t],
+                       self.observation(columns, t + 1), columns["done"][t])
@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
 from pysc2.lib import actions
 from sc2ai.envs import game_info
 from gym.spaces.multi_discrete import MultiDiscrete
@@ -8,6 +11,11 @@ from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Compiled tables of action sets built from the same tuple of actions, shared between instances.
+# Only the most recently used ones are kept, as tuples of actions may be built dynamically.
+_compiled_action_tables = OrderedDict()
+_MAX_COMPILED_ACTION_TABLES = 16
+
 
 class ActionVectorType(Enum):
     ACTION_TYPE = 1
@@ -39,6 +47,19 @@ def translate_parameter_value(arg_type, value, feature_screen_size, feature_mini
         return [value]
 
 
+def validate_argument_value(arg_type, value):
+    """Converts an argument value the same way as pysc2's ``FunctionCall.init_with_validation``."""
+    if arg_type.values:
+        if isinstance(value, str):
+            return [arg_type.values[value]]
+        if isinstance(value, list):
+            value = value[0]
+        return [arg_type.values(value)]
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
 class ActionSet(ABC):
     """An abstraction class for Action Sets.
     An Action Set handles a set of actions assigned to a specific environment and
@@ -50,7 +71,8 @@ class ActionSet(ABC):
     def __init__(self, action_list):
         self._action_list = action_list
         self._num_actions = len(action_list)
-        self._current_available_actions = [False] * self._num_actions
+        self._current_available_actions = np.zeros(self._num_actions, dtype=bool)
+        self._pysc2_action_ids = None
 
     @abstractmethod
     def convert_to_gym_action_spaces(self):
@@ -64,6 +86,11 @@ class ActionSet(ABC):
     def get_action_spec_and_action_mask(self):
         pass
 
+    @property
+    def available_actions(self):
+        """A boolean array telling which actions of the set are available in the current observation."""
+        return self._current_available_actions.copy()
+
     def is_action_available(self, action_index):
         if action_index < 0 or action_index >= self._num_actions:
             raise Exception("action index is out of range.")
@@ -79,19 +106,32 @@ class ActionSet(ABC):
         Returns:
             None
         """
-        for i, action in enumerate(self._action_list):
-            ids = action.get_pysc2_action_ids()
-            check = False
-            for id in ids:
-                if not id in available_actions:
-                    check = True
-                    break
-            self._current_available_actions[i] = not check
+        self._current_available_actions = self.compute_available_actions(available_actions)
+
+    def compute_available_actions(self, available_actions):
+        """Returns which actions of the set are available given pysc2's available action IDs, without storing it."""
+        if self._pysc2_action_ids is None:
+            self._pysc2_action_ids = self._compile_pysc2_action_ids()
+        ids, owners = self._pysc2_action_ids
+        missing = ~np.isin(ids, available_actions)
+        return np.bincount(owners, weights=missing, minlength=self._num_actions) == 0
+
+    def _compile_pysc2_action_ids(self):
+        """Returns the pysc2 function ids required by all actions, and the index of the action requiring each."""
+        action_ids = [action.get_pysc2_action_ids() for action in self._action_list]
+        ids = np.asarray([id for ids in action_ids for id in ids], dtype=np.int64)
+        owners = np.repeat(np.arange(len(action_ids)), [len(ids) for ids in action_ids])
+        return ids, owners
 
 
 class DefaultActionSet(ActionSet):
     """Store a list of default PySC2 actions in this set.
-    Uses a shared parameter space called _parameter_registry."""
+    Uses a shared parameter space called _parameter_registry.
+
+    The parameter registry, action mask and decoding tables of action sets built from the same
+    tuple of actions are compiled once and shared, read-only, between instances."""
+    _shared_tables = ('_parameter_registry', '_action_mask', '_column_sizes', '_column_spatial',
+                      '_column_values', '_action_table', '_static_calls', '_pysc2_action_ids')
 
     def __init__(self, action_list, reorder_action_id=False,
                  feature_screen_size=game_info.feature_screen_size,
@@ -99,10 +139,30 @@ class DefaultActionSet(ActionSet):
         super().__init__(action_list)
         self._reorder_action_id = reorder_action_id
         self._current_num_actions = self._num_actions
-        self._parameter_registry, self._action_mask = self.register_argument_types()
         self._feature_screen_size = feature_screen_size
         self._feature_minimap_size = feature_minimap_size
         self._no_op_action = NoOpAction()
+        self._no_op_call = actions.FunctionCall(actions.FUNCTIONS.no_op.id, [])
+        self._load_action_tables()
+
+    def _load_action_tables(self):
+        key = None
+        if isinstance(self._action_list, tuple):
+            key = (type(self), self._action_list, self._feature_screen_size, self._feature_minimap_size)
+            tables = _compiled_action_tables.get(key)
+            if tables is not None:
+                _compiled_action_tables.move_to_end(key)
+                self.__dict__.update(tables)
+                return
+        self._parameter_registry, self._action_mask = self.register_argument_types()
+        self._compile_action_table()
+        self._pysc2_action_ids = self._compile_pysc2_action_ids()
+        if key is not None:
+            self._action_mask.setflags(write=False)
+            self._column_sizes.setflags(write=False)
+            _compiled_action_tables[key] = {name: getattr(self, name) for name in self._shared_tables}
+            while len(_compiled_action_tables) > _MAX_COMPILED_ACTION_TABLES:
+                _compiled_action_tables.popitem(last=False)
 
     def register_argument_types(self):
         registry = {}
@@ -121,43 +181,171 @@ class DefaultActionSet(ActionSet):
         return registry, action_mask
 
     @classmethod
-    def add_all_basic_sc2_actions(cls):
+    def add_all_basic_sc2_actions(cls, **kwargs):
         """A method to create a DefaultActionSet with all the PySC2 actions.
 
+        The actions are the process-wide descriptors of :func:`basic_sc2_actions`, so every
+        full action space set shares the same actions and compiled tables.
+
+        Args:
+            **kwargs: passed to the constructor, e.g. ``feature_screen_size``.
+
         Returns:
             A DefaultActionSet containing all the available action set in PySC2.
         """
-        action_list = []
-        for func in actions.FUNCTIONS:
-            cls_ = AtomAction.factory(func)
-            globals()[cls_.__name__] = cls_
-            action_list.append(cls_)
-        return cls(action_list)
+        return cls(basic_sc2_actions(), **kwargs)
+
+    def _compile_action_table(self):
+        """Precompiles how every action's pysc2 function call is built from an action vector.
+
+        For every action this stores the pysc2 function id and, per argument, either the validated
+        default value or the action vector column to read it from. Function calls of actions without
+        any network-provided argument never change, so they are built once here.
+        """
+        num_columns = len(self._parameter_registry)
+        self._column_sizes = np.ones(num_columns, dtype=np.int64)
+        self._column_spatial = [False] * num_columns
+        self._column_values = [None] * num_columns
+        for arg_type, column in self._parameter_registry.items():
+            if arg_type is actions.TYPES.screen or arg_type is actions.TYPES.screen2:
+                self._column_sizes[column] = self._feature_screen_size
+                self._column_spatial[column] = True
+            elif arg_type is actions.TYPES.minimap:
+                self._column_sizes[column] = self._feature_minimap_size
+                self._column_spatial[column] = True
+            elif arg_type.values:
+                self._column_values[column] = [arg_type.values(value) for value in range(arg_type.sizes[0])]
+
+        self._action_table = []
+        self._static_calls = []
+        for action in self._action_list:
+            function_tuple = getattr(action, 'function_tuple', None)
+            if function_tuple is None:
+                # Custom actions build their own function calls through transform_action.
+                self._action_table.append(None)
+                self._static_calls.append(None)
+                continue
+            arguments = []
+            for arg_type in action.arg_types:
+                if arg_type.name in action.defaults:
+                    arguments.append((-1, validate_argument_value(arg_type, action.defaults[arg_type.name])))
+                else:
+                    arguments.append((self._parameter_registry[arg_type], None))
+            arguments = tuple(arguments)
+            self._action_table.append((function_tuple.id, arguments))
+            if all(column < 0 for column, _ in arguments):
+                self._static_calls.append(actions.FunctionCall(function_tuple.id, [value for _, value in arguments]))
+            else:
+                self._static_calls.append(None)
 
     def transform_action(self, observation, action_values):
-        # print("action value : ", action_values)
-        action_id = action_values[0]
+        return self.transform_actions(np.asarray(action_values)[np.newaxis], [observation])
+
+    def transform_actions(self, action_matrix, observations=None, available_actions=None):
+        """Decodes a batch of action vectors into pysc2 function calls.
+
+        Args:
+            action_matrix: an integer array of shape ``(N, 1 + P)``, one action vector per row.
+            observations: a list of N observations, only used by actions without a pysc2 function.
+            available_actions: an optional boolean array of shape ``(N, num_actions)``. Defaults to
+                the availability table of this action set for every row.
 
+        Returns:
+            A list of N pysc2 function calls. Unavailable actions are replaced by a no-op.
+        """
         if self._reorder_action_id:
             raise NotImplementedError()
+        action_matrix = np.asarray(action_matrix, dtype=np.int64)
+        action_ids = action_matrix[:, 0]
+        if np.any((action_ids < 0) | (action_ids >= self._num_actions)):
+            logger.error("The wrong action IDs %s from the network output", action_ids)
+            raise Exception("The wrong action ID. {}".format(action_ids))
+        if available_actions is None:
+            available = np.asarray(self._current_available_actions, dtype=bool)[action_ids]
         else:
-            if self.is_action_available(action_id):
-                if action_id < 0 or action_id > len(self._action_list):
-                    logger.error("The wrong action ID %d from the network output", action_id)
-                    raise Exception("The wrong action ID. {}".format(action_id))
+            available = np.asarray(available_actions, dtype=bool)[np.arange(len(action_ids)), action_ids]
+
+        parameters = action_matrix[:, 1:]
+        quotients, remainders = np.divmod(parameters, self._column_sizes)
+        parameters, quotients, remainders = parameters.tolist(), quotients.tolist(), remainders.tolist()
+
+        function_calls = []
+        for i, (action_id, is_available) in enumerate(zip(action_ids.tolist(), available.tolist())):
+            if not is_available:
+                function_calls.append(self._no_op_call)
+                continue
+            static_call = self._static_calls[action_id]
+            if static_call is not None:
+                function_calls.append(static_call)
+                continue
+            entry = self._action_table[action_id]
+            if entry is None:
                 action = self._action_list[action_id]
-                parameter_types = action.arg_types
-                parameter_values = []
-                for parameter_type in parameter_types:
-                    if parameter_type.name in action.defaults:
-                        parameter_values += [action.defaults[parameter_type.name]]
-                    else:
-                        parameter_values += [action_values[1 + self._parameter_registry[parameter_type]]]
-                transformed_action = action.transform_action(observation, parameter_values)
-            else:
-                transformed_action = self._no_op_action.transform_action(observation, [])
+                parameter_values = [action.defaults[arg_type.name] if arg_type.name in action.defaults
+                                    else parameters[i][self._parameter_registry[arg_type]]
+                                    for arg_type in action.arg_types]
+                observation = observations[i] if observations is not None else None
+                function_calls.append(action.transform_action(observation, parameter_values))
+                continue
+            function_id, arguments = entry
+            arg_values = []
+            for column, default in arguments:
+                if column < 0:
+                    arg_values.append(default)
+                elif self._column_spatial[column]:
+                    arg_values.append([quotients[i][column], remainders[i][column]])
+                elif self._column_values[column] is not None:
+                    arg_values.append([self._column_values[column][parameters[i][column]]])
+                else:
+                    arg_values.append([parameters[i][column]])
+            function_calls.append(actions.FunctionCall(function_id, arg_values))
+        return function_calls
+
+    def argument_column(self, arg_type):
+        """Returns the column of an action vector holding an argument type, or None if no action takes it from the network."""
+        if arg_type not in self._parameter_registry:
+            return None
+        return 1 + self._parameter_registry[arg_type]
+
+    def encode_function_calls(self, function_calls):
+        """Encodes pysc2 function calls, e.g. of scripted agents, into action vectors; the inverse of transform_actions.
+
+        A call is encoded by the first action of this set with the same pysc2 function whose default
+        arguments match the call. Calls no action can express are encoded as the no-op action if the
+        set has one.
 
-        return [transformed_action]
+        Args:
+            function_calls: a list of N pysc2 function calls.
+
+        Returns:
+            A tuple of an integer array of shape ``(N, 1 + P)`` and a boolean array of shape ``(N,)``
+            telling which calls were encoded exactly.
+        """
+        if getattr(self, '_function_encodings', None) is None:
+            self._function_encodings = {}
+            for action_id, entry in enumerate(self._action_table):
+                if entry is not None:
+                    self._function_encodings.setdefault(entry[0], []).append((action_id, entry[1]))
+        no_op = self._function_encodings.get(actions.FUNCTIONS.no_op.id, [(0, ())])[0][0]
+        matrix = np.zeros((len(function_calls), 1 + len(self._parameter_registry)), dtype=np.int64)
+        encoded = np.zeros(len(function_calls), dtype=bool)
+        for i, call in enumerate(function_calls):
+            matrix[i, 0] = no_op
+            for action_id, arguments in self._function_encodings.get(int(call.function), ()):
+                if any(column < 0 and list(value) != list(default)
+                       for (column, default), value in zip(arguments, call.arguments)):
+                    continue
+                matrix[i, 0] = action_id
+                for (column, _), value in zip(arguments, call.arguments):
+                    if column < 0:
+                        continue
+                    if self._column_spatial[column]:
+                        matrix[i, 1 + column] = int(value[0]) * self._column_sizes[column] + int(value[1])
+                    else:
+                        matrix[i, 1 + column] = int(value[0])
+                encoded[i] = True
+                break
+        return matrix, encoded
 
     def convert_to_gym_action_spaces(self):
         vector = [0] * (1 + len(self._parameter_registry))
@@ -257,6 +445,48 @@ class AtomAction(Action):
         return self.function_tuple(*arg_values)
 
 
+class ActionDescriptor:
+    """A lightweight stand-in for an :class:`AtomAction` of a pysc2 function without default arguments.
+
+    Descriptors only hold the pysc2 function, so one descriptor per function is shared by every
+    action set using the full action space.
+    """
+    __slots__ = ('function_tuple',)
+    _defaults = MappingProxyType({})
+
+    def __init__(self, function_tuple):
+        self.function_tuple = function_tuple
+
+    def get_pysc2_action_ids(self):
+        return [self.function_tuple.id]
+
+    def transform_action(self, observation, action_values):
+        arg_values = [translate_parameter_value(arg_type, value, game_info.feature_screen_size,
+                                                game_info.feature_minimap_size)
+                      for arg_type, value in zip(self.function_tuple.args, action_values)]
+        return self.function_tuple(*arg_values)
+
+    @property
+    def arg_types(self):
+        return self.function_tuple.args
+
+    @property
+    def defaults(self):
+        return self._defaults
+
+    def __repr__(self):
+        return "ActionDescriptor({})".format(self.function_tuple.name)
+
+
+Action.register(ActionDescriptor)
+
+
+@lru_cache(maxsize=None)
+def basic_sc2_actions():
+    """Returns a tuple with an :class:`ActionDescriptor` for every pysc2 function, built once per process."""
+    return tuple(ActionDescriptor(function_tuple) for function_tuple in actions.FUNCTIONS)
+
+
 class NoOpAction(AtomAction):
     def __init__(self, **kwargs):
         super().__init__(actions.FUNCTIONS.no_op, **kwargs)
@@ -1,9 +1,27 @@
-from sc2ai.envs.minigames.collect_minerals_and_gas import CollectMineralAndGasEnv
-from sc2ai.envs.minigames.defeat_zerglings_and_banelings import DefeatZerglingsAndBanelingsEnv
-from sc2ai.envs.minigames.defeat_roaches import DefeatRoachesEnv
-from sc2ai.envs.minigames.move_to_beacon import MoveToBeaconEnv
-from sc2ai.envs.minigames.build_marines import BuildMarinesEnv
-from sc2ai.envs.minigames.flee_roaches import FleeRoachesEnv
+import importlib
+
+# The environments are imported on first access, so importing this package does not load pysc2.
+_ENV_MODULES = {
+    "CollectMineralAndGasEnv": "sc2ai.envs.minigames.collect_minerals_and_gas",
+    "DefeatZerglingsAndBanelingsEnv": "sc2ai.envs.minigames.defeat_zerglings_and_banelings",
+    "DefeatRoachesEnv": "sc2ai.envs.minigames.defeat_roaches",
+    "MoveToBeaconEnv": "sc2ai.envs.minigames.move_to_beacon",
+    "BuildMarinesEnv": "sc2ai.envs.minigames.build_marines",
+    "FleeRoachesEnv": "sc2ai.envs.minigames.flee_roaches",
+    "ExpandBaseEnv": "sc2ai.envs.minigames.expand_base",
+}
 
 __all__ = ["CollectMineralAndGasEnv", "DefeatZerglingsAndBanelingsEnv", "DefeatRoachesEnv", "MoveToBeaconEnv",
-           "BuildMarinesEnv", "FleeRoachesEnv"]
+           "BuildMarinesEnv", "FleeRoachesEnv", "ExpandBaseEnv"]
+
+
+def __getattr__(name):
+    if name not in _ENV_MODULES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_ENV_MODULES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -5,8 +5,12 @@ from sc2ai.envs.observations import *
 
 class DefeatRoachesEnv(SingleAgentSC2Env):
     """A class containing specifications for the FleeRoaches Minimap
+
+    Args:
+        unit_list (bool): adds the unit list as a ``raw_units`` :class:`UnitListCategory`, e.g. for
+            :class:`sc2ai.spinup.algorithms.ppo.sc2_nets.SC2EntityActorCritic`.
     """
-    def __init__(self, **kwargs):
+    def __init__(self, unit_list=False, **kwargs):
         action_set = DefaultActionSet([
             NoOpAction(),
             SelectPointAction(select_point_act="select"),
@@ -22,6 +26,6 @@ class DefeatRoachesEnv(SingleAgentSC2Env):
                 FeatureScreenNeutralUnitFilter(),
                 FeatureScreenEnemyUnitFilter(),
                 FeatureScreenUnitHitPointFilter()])
-        ])
+        ] + ([UnitListCategory("raw_units", default_unit_field_filters())] if unit_list else []))
 
         super().__init__("DefeatRoaches", action_set, observation_set, num_players=1, **kwargs)
@@ -4,7 +4,7 @@ from ..observations import *
 
 
 class ExpandBaseEnv(SingleAgentSC2Env):
-    """A class containing specifications for the MoveToBeacon Minimap
+    """A class containing specifications for the ExpandBase Minimap
     """
     def __init__(self, **kwargs):
         action_set = DefaultActionSet([
@@ -1,6 +1,7 @@
 from sc2ai.envs.sc2env import SingleAgentSC2Env
 from sc2ai.envs.actions import *
 from sc2ai.envs.observations import *
+from sc2ai.envs.rewards import ShapedRewardProcessor, EnvReward
 
 
 class FleeRoachesEnv(SingleAgentSC2Env):
@@ -23,10 +24,8 @@ class FleeRoachesEnv(SingleAgentSC2Env):
                 FeatureScreenUnitHitPointFilter()])
         ])
 
-        super().__init__("FleeRoachesv4_training", action_set, observation_set, num_players=1, **kwargs)
+        # Only penalties are kept, the map rewards for killing roaches are discarded.
+        reward_processor = ShapedRewardProcessor([EnvReward(max_value=0)])
 
-    def step(self, _actions):
-        obs, total_reward, done, info = super().step(_actions)
-        if total_reward > 0:
-            total_reward = 0
-        return obs, total_reward, done, info
+        super().__init__("FleeRoachesv4_training", action_set, observation_set, num_players=1,
+                         reward_processor=reward_processor, **kwargs)
@@ -0,0 +1,134 @@
+import numpy as np
+import logging
+from pysc2.env import sc2_env
+from pysc2.env.environment import StepType
+from sc2ai.envs.sc2env import SingleAgentSC2Env
+from sc2ai.profiler import profiler
+
+logger = logging.getLogger(__name__)
+
+
+class MultiAgentSC2Env(SingleAgentSC2Env):
+    """A StarCraft II environment controlling every agent slot of a game, e.g. for self-play.
+
+    Observations of all agents are returned as one batch: a dict whose arrays are the per-agent
+    observations stacked along a first dimension of size :attr:`num_agents`. Actions are given as an
+    ``(num_agents, 1 + P)`` action matrix and decoded together, so a single policy forward serves
+    every player. The gym spaces describe a single agent.
+
+    Args:
+        map_name (str): the pysc2 map name, a map with at least ``num_agents + num_bots`` player slots.
+        action_set (DefaultActionSet): the action set shared by all agents.
+        observation_set (ObservationSet): the observation set shared by all agents.
+        num_agents (int): the number of controlled players.
+        num_bots (int): the number of additional built-in bots.
+        reward_processor (RewardProcessor): processes the rewards of all agents as one batch.
+        **kwargs: environment options, see :class:`SC2EnvOptions`. Agents play ``agent1_race``,
+            bots ``agent2_race`` at ``difficulty``.
+    """
+
+    def __init__(self, map_name, action_set, observation_set, num_agents=2, num_bots=0, reward_processor=None,
+                 prelaunch=False, **kwargs):
+        self._num_agents = num_agents
+        self._num_bots = num_bots
+        self._current_raw_observations = None
+        self._available_actions = None
+        super().__init__(map_name, action_set, observation_set, num_players=num_agents + num_bots,
+                         reward_processor=reward_processor, prelaunch=prelaunch, **kwargs)
+
+    @classmethod
+    def from_env(cls, env, num_agents=2, num_bots=0, **kwargs):
+        """Creates a multi-agent environment with the map, action set and observation set of a single-agent one."""
+        return cls(env._map_name, env._action_set, env._observation_set, num_agents=num_agents, num_bots=num_bots,
+                   **dict(env._env_options._asdict(), **kwargs))
+
+    @property
+    def num_agents(self):
+        return self._num_agents
+
+    @property
+    def available_actions(self):
+        """A boolean array of shape ``(num_agents, num_actions)`` telling which actions every agent can take."""
+        return self._available_actions
+
+    @property
+    def current_raw_observations(self):
+        return self._current_raw_observations
+
+    def _players(self):
+        players = [sc2_env.Agent(sc2_env.Race[self._env_options.agent1_race],
+                                 "{}_{}".format(self._env_options.agent1_name, i)) for i in range(self._num_agents)]
+        players += [sc2_env.Bot(sc2_env.Race[self._env_options.agent2_race], self._env_options.difficulty)
+                    for _ in range(self._num_bots)]
+        return players
+
+    def _observe(self, raw_observations):
+        self._current_raw_observations = raw_observations
+        self._current_raw_obs = raw_observations[0]
+        self._available_actions = np.stack([self._action_set.compute_available_actions(raw_obs.available_actions)
+                                            for raw_obs in raw_observations])
+        # Every player is written into the batch before the next is transformed, as categories may
+        # return the same buffer on every call.
+        stacked = None
+        for i, raw_obs in enumerate(raw_observations):
+            obs = self._observation_set.transform_observation(raw_obs)
+            if stacked is None:
+                stacked = {key: np.empty((len(raw_observations),) + np.shape(value), dtype=np.asarray(value).dtype)
+                           for key, value in obs.items()}
+            for key, value in obs.items():
+                stacked[key][i] = value
+        self._current_obs = stacked
+        return self._current_obs
+
+    def reset(self):
+        self._ensure_sc2_env()
+        raw_observations = [timestep.observation for timestep in self._sc2_env.reset()]
+        self._reward_processor.reset(raw_observations)
+        return self._observe(raw_observations)
+
+    def step(self, action_matrix):
+        """Steps all agents.
+
+        Args:
+            action_matrix: an integer array of shape ``(num_agents, 1 + P)``, one action vector per agent.
+
+        Returns:
+            The stacked observations, an array of rewards per agent, whether the game ended, and an info
+            dict with the ``available_actions`` of the new observations.
+        """
+        action_matrix = np.asarray(action_matrix)
+        if len(action_matrix) != self._num_agents:
+            raise Exception("Expected {} action vectors, got {}.".format(self._num_agents, len(action_matrix)))
+        observations = [{key: value[i] for key, value in self._current_obs.items()} for i in range(self._num_agents)]
+        with profiler.timer('env.transform_action'):
+            function_calls = self._action_set.transform_actions(action_matrix, observations, self._available_actions)
+        sc2_env = self._sc2_env
+        try:
+            with profiler.timer('env.sc2_step'):
+                timesteps = sc2_env.step(function_calls)
+        except Exception:
+            logging.exception("An unexpected exception occurred.")
+            self._discard_sc2_env(sc2_env)
+            return self._current_obs, np.zeros(self._num_agents), True, \
+                {'truncated': True, 'terminal': False, 'crashed': True, 'available_actions': self._available_actions}
+
+        done = any(timestep.step_type == StepType.LAST for timestep in timesteps)
+        raw_observations = [timestep.observation for timestep in timesteps]
+        with profiler.timer('env.reward'):
+            rewards, breakdown = self._reward_processor.process_batch(
+                [timestep.reward for timestep in timesteps], raw_observations, np.full(self._num_agents, done))
+        with profiler.timer('env.transform_observation'):
+            obs = self._observe(raw_observations)
+        truncated = done and self._reached_step_limit()
+        info = {'truncated': truncated, 'terminal': done and not truncated, 'available_actions': self._available_actions}
+        if breakdown:
+            info['reward_components'] = breakdown
+        return obs, rewards, done, info
+
+    def sample_action(self):
+        """Samples an available action for every agent, as an action matrix."""
+        matrix = np.stack([self.action_gym_space.sample() for _ in range(self._num_agents)])
+        for i in range(self._num_agents):
+            while not self._available_actions[i, matrix[i, 0]]:
+                matrix[i] = self.action_gym_space.sample()
+        return matrix
@@ -6,6 +6,7 @@ from pysc2.lib.named_array import NamedNumpyArray
 from abc import ABC, abstractmethod
 import numpy as np
 from sc2ai.envs import game_info
+from sc2ai.observation.spatial_index import get_spatial_index
 import logging
 from gym.spaces.dict import Dict
 from gym.spaces.box import Box
@@ -214,3 +215,182 @@ class FeatureScreenUnitHitPointFilter(FeatureScreenFilter):
 
     def __call__(self, observation):
         return self._filter(observation)
+
+
+class UnitListCategory(Category):
+    """A category for handling filters which read per-unit fields from the unit list.
+
+    The whole unit list is converted into a fixed-size ``(max_units, num_fields)`` array with a
+    single numpy gather. Units beyond ``max_units`` are dropped and unused rows are zero-filled.
+    When ``use_stacked`` is set, a validity mask is appended as the last column so the output
+    stays a single tensor, otherwise a dict with ``units`` and ``mask`` entries is returned.
+
+    Every call returns a new array, so observations can be kept across steps, e.g. by trajectory
+    writers and multi-agent batches. Distance columns of :class:`UnitDistanceFilter` are queried
+    from the spatial index of the step, shared with reward processors and scripted agents.
+
+    Args:
+        name (str): name of the category, also the key in the observation dict.
+        filters_list (list): a list of :class:`UnitFieldFilter` and :class:`UnitDistanceFilter`.
+        source (str): either ``raw_units`` or ``feature_units``.
+        max_units (int): the fixed number of rows in the output.
+        sort_by_alliance (bool): orders the units by ``alliance_order`` before truncation.
+        alliance_order (tuple): the order of :class:`features.PlayerRelative` values.
+        use_stacked (bool): appends the mask as the last column instead of returning a dict.
+    """
+    def __init__(self, name, filters_list, source="raw_units", max_units=64, sort_by_alliance=True,
+                 alliance_order=(features.PlayerRelative.SELF, features.PlayerRelative.ALLY,
+                                 features.PlayerRelative.ENEMY, features.PlayerRelative.NEUTRAL),
+                 use_stacked=True):
+        super().__init__(name, filters_list)
+        if source not in ("raw_units", "feature_units"):
+            raise Exception("The unit list source should be either raw_units or feature_units.")
+        self._source = source
+        self._max_units = max_units
+        self._sort_by_alliance = sort_by_alliance
+        self._use_stacked = use_stacked
+        field_filters = [(i, f) for i, f in enumerate(self._filters) if not isinstance(f, UnitDistanceFilter)]
+        self._field_positions = np.array([i for i, _ in field_filters], dtype=np.intp)
+        self._columns = np.array([f.field for _, f in field_filters], dtype=np.intp)
+        self._offsets = np.array([f.offset for _, f in field_filters], dtype=np.float32)
+        self._scales = np.array([f.scale for _, f in field_filters], dtype=np.float32)
+        self._distance_filters = [(i, f) for i, f in enumerate(self._filters) if isinstance(f, UnitDistanceFilter)]
+        # Units whose alliance is not listed are ranked last.
+        self._alliance_rank = np.full(max(features.PlayerRelative) + 1, len(alliance_order), dtype=np.int64)
+        for rank, alliance in enumerate(alliance_order):
+            self._alliance_rank[alliance] = rank
+
+    @property
+    def max_units(self):
+        return self._max_units
+
+    def _select_rows(self, units):
+        num_units = min(len(units), self._max_units)
+        if self._sort_by_alliance and len(units) > 0:
+            ranks = self._alliance_rank[units[:, features.FeatureUnit.alliance]]
+            return np.argsort(ranks, kind="stable")[:num_units]
+        return np.arange(num_units)
+
+    def transform_observation(self, observation):
+        units = getattr(observation, self._source)
+        if isinstance(units, NamedNumpyArray):
+            units = units.view(np.ndarray)
+        rows = self._select_rows(units)
+        num_units, num_fields = len(rows), len(self._filters)
+        output = np.zeros((self._max_units, num_fields + 1), dtype=np.float32)
+        if num_units > 0:
+            output[:num_units, self._field_positions] = \
+                (units[rows[:, np.newaxis], self._columns] - self._offsets) * self._scales
+            for position, distance_filter in self._distance_filters:
+                output[:num_units, position] = distance_filter.distances(observation, rows)
+        output[:num_units, num_fields] = 1.0
+        if self._use_stacked:
+            return output
+        return {"units": output[:, :num_fields], "mask": output[:, num_fields]}
+
+    def convert_to_gym_observation_spaces(self):
+        num_fields = len(self._filters)
+        if self._use_stacked:
+            return Box(low=-np.inf, high=np.inf, shape=(self._max_units, num_fields + 1), dtype=np.float32)
+        return Dict({"units": Box(low=-np.inf, high=np.inf, shape=(self._max_units, num_fields), dtype=np.float32),
+                     "mask": Box(low=0.0, high=1.0, shape=(self._max_units,), dtype=np.float32)})
+
+    def __repr__(self):
+        return self._name
+
+
+class UnitFieldFilter(ObservationFilter):
+    """Selects a single field of every unit and normalizes it as ``(value - offset) * scale``.
+
+    Used by :class:`UnitListCategory`, which gathers all of its fields at once. Calling the filter
+    directly returns the normalized column for every unit in the observation.
+
+    Args:
+        name (str): name of the filter.
+        field (features.FeatureUnit): the unit field to read.
+        scale (float): multiplied after subtracting the offset.
+        offset (float): subtracted from the raw value.
+        source (str): either ``raw_units`` or ``feature_units``.
+    """
+    def __init__(self, name, field, scale=1.0, offset=0.0, source="raw_units"):
+        super().__init__(source, name)
+        self._field = field
+        self._scale = scale
+        self._offset = offset
+
+    @property
+    def field(self):
+        return self._field
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @property
+    def offset(self):
+        return self._offset
+
+    def __call__(self, observation):
+        units = getattr(observation, self._category).view(np.ndarray)
+        return (units[:, self._field] - self._offset).astype(np.float32) * self._scale
+
+    def get_space(self):
+        return np.array((1,))
+
+
+class UnitDistanceFilter(ObservationFilter):
+    """The distance of every unit to the nearest other unit of an alliance, scaled by ``scale``.
+
+    Distances are queried from the spatial index of the observation's unit list. Units without
+    such a neighbour get ``max_distance``.
+
+    Args:
+        name (str): name of the filter.
+        alliance (features.PlayerRelative): the alliance of the neighbours.
+        scale (float): multiplied with the distance.
+        max_distance (float): the distance when there is no neighbour, and the largest one reported.
+        source (str): either ``raw_units`` or ``feature_units``.
+    """
+    def __init__(self, name, alliance, scale=1.0, max_distance=game_info.feature_minimap_size, source="raw_units"):
+        super().__init__(source, name)
+        self._alliance = alliance
+        self._scale = scale
+        self._max_distance = max_distance
+
+    def distances(self, observation, rows=None):
+        """Returns the scaled distances of the units at ``rows`` of the unit list, every unit by default."""
+        index = get_spatial_index(observation, self._category)
+        if rows is None:
+            rows = np.arange(len(index.positions))
+        distances, neighbours = index.knn(index.positions[rows], k=2, alliance=self._alliance)
+        # A unit of the alliance itself is its own nearest neighbour.
+        distances = np.where(neighbours[:, 0] == rows, distances[:, 1], distances[:, 0])
+        return np.minimum(distances, self._max_distance).astype(np.float32) * self._scale
+
+    def __call__(self, observation):
+        return self.distances(observation)
+
+    def get_space(self):
+        return np.array((1,))
+
+
+def default_unit_field_filters(map_size=game_info.feature_minimap_size):
+    """Returns a list of unit field filters which suits the combat minigames.
+
+    Args:
+        map_size (int): the size of the map in world units, used to rescale the positions.
+
+    Returns:
+        A list of :class:`UnitFieldFilter`
+    """
+    return [
+        UnitFieldFilter("unit_type", features.FeatureUnit.unit_type, scale=1.0 / 2000),
+        UnitFieldFilter("alliance", features.FeatureUnit.alliance, scale=1.0 / 4),
+        UnitFieldFilter("health_ratio", features.FeatureUnit.health_ratio, scale=1.0 / 255),
+        UnitFieldFilter("shield_ratio", features.FeatureUnit.shield_ratio, scale=1.0 / 255),
+        UnitFieldFilter("x", features.FeatureUnit.x, scale=1.0 / map_size),
+        UnitFieldFilter("y", features.FeatureUnit.y, scale=1.0 / map_size),
+        UnitFieldFilter("radius", features.FeatureUnit.radius, scale=1.0 / 8),
+        UnitFieldFilter("weapon_cooldown", features.FeatureUnit.weapon_cooldown, scale=1.0 / 32),
+        UnitFieldFilter("is_selected", features.FeatureUnit.is_selected),
+    ]
@@ -0,0 +1,118 @@
+"""A registry of the maps sc2ai can create environments for.
+
+Maps are declared by the dotted path of their environment class and resolved on first use, so
+listing maps or querying their spaces neither imports every minigame nor launches StarCraft II.
+Other packages can add maps through the ``sc2ai.maps`` setuptools entry point group::
+
+    entry_points={"sc2ai.maps": ["MyMap = my_package.envs:MyMapEnv"]}
+"""
+import importlib
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "sc2ai.maps"
+
+MapSpec = namedtuple('MapSpec', ('map_name', 'entry_point', 'kwargs'))
+""" A registered map: the pysc2 map name, a ``module:attribute`` entry point and default keyword arguments. """
+
+EnvSpaces = namedtuple('EnvSpaces', ('action_space', 'observation_space', 'action_spec', 'action_mask'))
+""" The gym spaces, action spec and action mask of an environment, as the learners consume them. """
+
+_map_specs = {}
+_env_spaces = {}
+_entry_points_loaded = False
+
+
+def load_entry_point(entry_point):
+    """Resolves a ``module:attribute`` string, returning non-string entry points unchanged."""
+    if not isinstance(entry_point, str):
+        return entry_point
+    module_name, attribute = entry_point.split(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def register_map(map_name, entry_point, **kwargs):
+    """Registers the environment class of a map.
+
+    Args:
+        map_name (str): the pysc2 map name.
+        entry_point: a ``module:attribute`` string or the environment class itself.
+        **kwargs: default keyword arguments of the environment.
+    """
+    if map_name in _map_specs:
+        logger.warning("The map %s is registered again, overriding %s.", map_name, _map_specs[map_name].entry_point)
+        _env_spaces.pop(map_name, None)
+    _map_specs[map_name] = MapSpec(map_name, entry_point, kwargs)
+
+
+def _iter_entry_points():
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        from pkg_resources import iter_entry_points
+        return list(iter_entry_points(ENTRY_POINT_GROUP))
+    found = entry_points()
+    if hasattr(found, "select"):
+        return list(found.select(group=ENTRY_POINT_GROUP))
+    return list(found.get(ENTRY_POINT_GROUP, []))
+
+
+def _load_entry_points():
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    for entry_point in _iter_entry_points():
+        if entry_point.name not in _map_specs:
+            register_map(entry_point.name, entry_point.value if hasattr(entry_point, "value")
+                         else "{}:{}".format(entry_point.module_name, ".".join(entry_point.attrs)))
+
+
+def registered_maps():
+    """Returns the sorted names of all registered maps, including those of installed plugins."""
+    _load_entry_points()
+    return sorted(_map_specs)
+
+
+def map_spec(map_name):
+    """Returns the :class:`MapSpec` of a map."""
+    if map_name not in _map_specs:
+        _load_entry_points()
+    if map_name not in _map_specs:
+        raise Exception("The map is unknown and not registered.")
+    return _map_specs[map_name]
+
+
+def make_sc2env(**kwargs):
+    """Creates the environment of a registered map. StarCraft II is launched on the first reset.
+
+    Args:
+        **kwargs: the environment options, at least ``map``.
+
+    Returns:
+        A :class:`SingleAgentSC2Env`
+    """
+    spec = map_spec(kwargs["map"])
+    cls = load_entry_point(spec.entry_point)
+    return cls(**dict(spec.kwargs, **kwargs))
+
+
+def env_spaces(map_name):
+    """Returns the :class:`EnvSpaces` of a map, computed once per process without launching StarCraft II."""
+    if map_name not in _env_spaces:
+        env = make_sc2env(map=map_name)
+        action_spec, action_mask = env.action_set.get_action_spec_and_action_mask()
+        _env_spaces[map_name] = EnvSpaces(env.action_gym_space, env.observation_gym_space, action_spec, action_mask)
+    return _env_spaces[map_name]
+
+
+register_map("DefeatZerglingsAndBanelings",
+             "sc2ai.envs.minigames.defeat_zerglings_and_banelings:DefeatZerglingsAndBanelingsEnv")
+register_map("DefeatRoaches", "sc2ai.envs.minigames.defeat_roaches:DefeatRoachesEnv")
+register_map("CollectMineralAndGas", "sc2ai.envs.minigames.collect_minerals_and_gas:CollectMineralAndGasEnv")
+register_map("MoveToBeacon", "sc2ai.envs.minigames.move_to_beacon:MoveToBeaconEnv")
+register_map("BuildMarines", "sc2ai.envs.minigames.build_marines:BuildMarinesEnv")
+register_map("FleeRoachesv4_training", "sc2ai.envs.minigames.flee_roaches:FleeRoachesEnv")
+register_map("ExpandBase", "sc2ai.envs.minigames.expand_base:ExpandBaseEnv")
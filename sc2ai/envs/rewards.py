@@ -1,11 +1,325 @@
-from pysc2.lib import actions
+from pysc2.lib import features
 from sc2ai.envs import game_info
-from gym.spaces.multi_discrete import MultiDiscrete
+from sc2ai.observation.spatial_index import get_spatial_index
+import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class RewardProcessor:
+    """The default reward processor, which passes the environment reward through."""
+    def reset(self, observation=None):
+        """Clears any per-episode state. Called by the environment on reset.
+
+        Args:
+            observation: the first pysc2 observation of the episode, or a list of them when the
+                rewards of a batch, e.g. of every agent, are processed together.
+        """
+        pass
+
     def process(self, rew, observation):
         return rew
+
+    def process_batch(self, rews, observations, dones=None):
+        """Processes the rewards of a batch of observations.
+
+        Args:
+            rews: the environment rewards, one per observation.
+            observations: a list of pysc2 observations.
+            dones: whether each observation ended its episode.
+
+        Returns:
+            A tuple of the total rewards and a dict of per-component rewards, both as arrays.
+        """
+        return np.asarray(rews, dtype=np.float64), {}
+
+    @property
+    def last_breakdown(self):
+        """The per-component rewards of the last processed observation."""
+        return {}
+
+
+def extract_reward_features(observations):
+    """Computes the quantities reward components are built from, for a batch of observations.
+
+    The unit lists of all observations are concatenated and reduced per observation with a
+    handful of weighted ``bincount`` calls, so the cost does not grow with the batch size in Python.
+    Distances between units are queried from the spatial index of every observation, shared with
+    the observation categories and scripted agents handling the same step.
+
+    Args:
+        observations: a list of pysc2 observations.
+
+    Returns:
+        A dict of arrays whose first dimension is the batch size.
+    """
+    num_obs = len(observations)
+    unit_lists = [np.asarray(obs["raw_units"]) if "raw_units" in obs else
+                  np.zeros((0, len(features.FeatureUnit)), dtype=np.int64) for obs in observations]
+    counts = [len(units) for units in unit_lists]
+    units = np.concatenate(unit_lists) if unit_lists else np.zeros((0, len(features.FeatureUnit)), dtype=np.int64)
+    segment = np.repeat(np.arange(num_obs), counts)
+
+    alliance = units[:, features.FeatureUnit.alliance]
+    hit_points = units[:, features.FeatureUnit.health] + units[:, features.FeatureUnit.shield]
+    x = units[:, features.FeatureUnit.x]
+    y = units[:, features.FeatureUnit.y]
+    allies = (alliance == features.PlayerRelative.SELF).astype(np.float64)
+    enemies = (alliance == features.PlayerRelative.ENEMY).astype(np.float64)
+    neutrals = (alliance == features.PlayerRelative.NEUTRAL).astype(np.float64)
+    idle = allies * (units[:, features.FeatureUnit.order_length] == 0)
+
+    def per_observation(weights):
+        return np.bincount(segment, weights=weights, minlength=num_obs)
+
+    output = dict(
+        ally_count=per_observation(allies),
+        enemy_count=per_observation(enemies),
+        neutral_count=per_observation(neutrals),
+        ally_hit_points=per_observation(allies * hit_points),
+        enemy_hit_points=per_observation(enemies * hit_points),
+        idle_allies=per_observation(idle))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        output["ally_x"] = per_observation(allies * x) / output["ally_count"]
+        output["ally_y"] = per_observation(allies * y) / output["ally_count"]
+        output["neutral_x"] = per_observation(neutrals * x) / output["neutral_count"]
+        output["neutral_y"] = per_observation(neutrals * y) / output["neutral_count"]
+    # The mean distance of the allied units to their nearest enemy and neutral unit, NaN without such units.
+    output["ally_enemy_distance"] = np.full(num_obs, np.nan)
+    output["ally_neutral_distance"] = np.full(num_obs, np.nan)
+    for i, obs in enumerate(observations):
+        if counts[i] == 0:
+            continue
+        index = get_spatial_index(obs)
+        allies = index.positions_of(features.PlayerRelative.SELF)
+        if len(allies) == 0:
+            continue
+        for key, alliance in (("ally_enemy_distance", features.PlayerRelative.ENEMY),
+                              ("ally_neutral_distance", features.PlayerRelative.NEUTRAL)):
+            if len(index.rows(alliance)):
+                output[key][i] = index.nearest(allies, alliance)[0].mean()
+    output["score"] = np.zeros((num_obs, len(features.ScoreCumulative)))
+    for i, obs in enumerate(observations):
+        if "score_cumulative" in obs:
+            output["score"][i] = obs["score_cumulative"]
+    return output
+
+
+class RewardComponent:
+    """A single shaping term. Components compute a value for every observation in a batch.
+
+    Args:
+        name (str): the key of this component in the reward breakdown.
+        weight (float): multiplied with the computed value.
+    """
+    #: Components relying on the previous step are zeroed on the first step of an episode.
+    uses_previous = False
+
+    def __init__(self, name, weight=1.0):
+        self._name = name
+        self._weight = weight
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def weight(self):
+        return self._weight
+
+    def __call__(self, current, previous):
+        """Returns an array of unweighted values, one per observation.
+
+        Args:
+            current: the reward features of the current step.
+            previous: the reward features of the previous step.
+        """
+        raise NotImplementedError
+
+
+class EnvReward(RewardComponent):
+    """The reward given by the environment, optionally clipped."""
+    def __init__(self, weight=1.0, min_value=None, max_value=None, name="env"):
+        super().__init__(name, weight)
+        self._min_value = -np.inf if min_value is None else min_value
+        self._max_value = np.inf if max_value is None else max_value
+
+    def __call__(self, current, previous):
+        return np.clip(current["env_reward"], self._min_value, self._max_value)
+
+
+class DamageDealtReward(RewardComponent):
+    """Hit points (health and shield) the enemy units lost since the previous step."""
+    uses_previous = True
+
+    def __init__(self, weight=1.0, name="damage_dealt"):
+        super().__init__(name, weight)
+
+    def __call__(self, current, previous):
+        return np.maximum(previous["enemy_hit_points"] - current["enemy_hit_points"], 0.0)
+
+
+class DamageTakenReward(RewardComponent):
+    """Hit points (health and shield) the allied units lost since the previous step."""
+    uses_previous = True
+
+    def __init__(self, weight=-1.0, name="damage_taken"):
+        super().__init__(name, weight)
+
+    def __call__(self, current, previous):
+        return np.maximum(previous["ally_hit_points"] - current["ally_hit_points"], 0.0)
+
+
+class UnitLossReward(RewardComponent):
+    """Number of allied units lost since the previous step."""
+    uses_previous = True
+
+    def __init__(self, weight=-1.0, name="unit_losses"):
+        super().__init__(name, weight)
+
+    def __call__(self, current, previous):
+        return np.maximum(previous["ally_count"] - current["ally_count"], 0.0)
+
+
+class EnemyKillReward(RewardComponent):
+    """Number of enemy units killed since the previous step."""
+    uses_previous = True
+
+    def __init__(self, weight=1.0, name="enemy_kills"):
+        super().__init__(name, weight)
+
+    def __call__(self, current, previous):
+        return np.maximum(previous["enemy_count"] - current["enemy_count"], 0.0)
+
+
+class IdlePenalty(RewardComponent):
+    """Fraction of allied units without any order."""
+    def __init__(self, weight=-0.01, name="idle"):
+        super().__init__(name, weight)
+
+    def __call__(self, current, previous):
+        return current["idle_allies"] / np.maximum(current["ally_count"], 1.0)
+
+
+class ScoreDeltaReward(RewardComponent):
+    """Change of a ``score_cumulative`` entry since the previous step.
+
+    Args:
+        field (features.ScoreCumulative): the score entry, e.g. ``collected_minerals``.
+    """
+    uses_previous = True
+
+    def __init__(self, field, weight=1.0, name=None):
+        super().__init__(name or "score_" + features.ScoreCumulative(field).name, weight)
+        self._field = field
+
+    def __call__(self, current, previous):
+        return current["score"][:, self._field] - previous["score"][:, self._field]
+
+
+class PotentialReward(RewardComponent):
+    """A potential-based shaping term ``gamma * phi(s') - phi(s)``, which leaves optimal policies unchanged.
+
+    Args:
+        potential: a function mapping reward features to an array of potentials.
+        gamma (float): the discount factor of the learner.
+    """
+    uses_previous = True
+
+    def __init__(self, potential, gamma=0.99, weight=1.0, name="potential"):
+        super().__init__(name, weight)
+        self._potential = potential
+        self._gamma = gamma
+
+    def __call__(self, current, previous):
+        return self._gamma * self._potential(current) - self._potential(previous)
+
+
+def nearest_distance_potential(alliance_key, map_size=game_info.feature_minimap_size):
+    """Returns a potential of minus the mean distance of the allied units to their nearest unit of an alliance.
+
+    Args:
+        alliance_key (str): the reward feature of the distances, ``ally_neutral_distance`` or ``ally_enemy_distance``.
+        map_size (int): the distances are divided by it.
+    """
+    def potential(reward_features):
+        return -np.nan_to_num(reward_features[alliance_key], nan=0.0) / map_size
+    return potential
+
+
+def beacon_distance_potential(map_size=game_info.feature_minimap_size):
+    """Returns a potential of minus the mean distance of the allied units to their nearest beacon (neutral unit)."""
+    return nearest_distance_potential("ally_neutral_distance", map_size)
+
+
+class DistanceToBeaconReward(PotentialReward):
+    """Potential-based reward for moving the allied units towards the beacon (neutral units)."""
+    def __init__(self, gamma=0.99, weight=1.0, map_size=game_info.feature_minimap_size, name="distance_to_beacon"):
+        super().__init__(beacon_distance_potential(map_size), gamma=gamma, weight=weight, name=name)
+
+
+class DistanceToEnemyReward(PotentialReward):
+    """Potential-based reward for moving the allied units towards their nearest enemies."""
+    def __init__(self, gamma=0.99, weight=1.0, map_size=game_info.feature_minimap_size, name="distance_to_enemy"):
+        super().__init__(nearest_distance_potential("ally_enemy_distance", map_size), gamma=gamma, weight=weight,
+                         name=name)
+
+
+class ShapedRewardProcessor(RewardProcessor):
+    """A reward processor summing a list of :class:`RewardComponent`.
+
+    Reward features are extracted once per step for all components, and the previous step's
+    features are cached per batch slot to compute deltas. The per-component values of the last
+    step are kept in :attr:`last_breakdown` so environments can report them in ``info``.
+
+    Args:
+        components (list): a list of :class:`RewardComponent`.
+    """
+    def __init__(self, components):
+        self._components = components
+        self._previous = None
+        self._first = None
+        self._last_breakdown = {}
+
+    @property
+    def components(self):
+        return self._components
+
+    @property
+    def last_breakdown(self):
+        return self._last_breakdown
+
+    def reset(self, observation=None):
+        self._previous = None
+        self._first = None
+        self._last_breakdown = {}
+        if observation is not None:
+            observations = list(observation) if isinstance(observation, (list, tuple)) else [observation]
+            self._previous = extract_reward_features(observations)
+            self._first = np.zeros(len(observations), dtype=bool)
+
+    def process(self, rew, observation):
+        total, breakdown = self.process_batch([rew], [observation])
+        self._last_breakdown = {name: float(value[0]) for name, value in breakdown.items()}
+        return float(total[0])
+
+    def process_batch(self, rews, observations, dones=None):
+        current = extract_reward_features(observations)
+        current["env_reward"] = np.asarray(rews, dtype=np.float64)
+        if self._previous is None or len(self._first) != len(observations):
+            previous, first = current, np.ones(len(observations), dtype=bool)
+        else:
+            previous, first = self._previous, self._first
+        total = np.zeros(len(observations))
+        breakdown = {}
+        for component in self._components:
+            value = component.weight * component(current, previous)
+            if component.uses_previous:
+                value = np.where(first, 0.0, value)
+            breakdown[component.name] = value
+            total += value
+        self._previous = current
+        self._first = np.zeros(len(observations), dtype=bool) if dones is None else np.asarray(dones, dtype=bool)
+        self._last_breakdown = breakdown
+        return total, breakdown
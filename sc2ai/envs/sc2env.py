@@ -1,10 +1,13 @@
 import numpy as np
 import logging
+import threading
 import gym
 from gym.utils import closer
 
 from pysc2.env import sc2_env
 from pysc2.env.environment import StepType
+from pysc2.lib import stopwatch
+from sc2ai.profiler import profiler
 from .game_info import default_env_options
 from sc2ai.envs.rewards import RewardProcessor
 
@@ -20,8 +23,12 @@ def tensor_analyzer(tensor):
 class SingleAgentSC2Env(gym.Env):
     """A gym wrapper for PySC2's Starcraft II environment.
 
+    StarCraft II is launched on the first reset. The gym spaces and the action set are derived
+    from the action and observation sets, so reading them never launches the game.
+
     Args:
         map_name (str):
+        prelaunch (bool): starts launching StarCraft II in a background thread right away.
         **kwargs:
     """
     metadata = {'render.modes': [None, 'human']}
@@ -30,7 +37,8 @@ class SingleAgentSC2Env(gym.Env):
 
     _owns_render = True
 
-    def __init__(self, map_name, action_set, observation_set, num_players=2, reward_processor=RewardProcessor(), **kwargs):
+    def __init__(self, map_name, action_set, observation_set, num_players=2, reward_processor=None, prelaunch=False,
+                 **kwargs):
         super().__init__()
         self._num_players = num_players
         self._map_name = map_name
@@ -44,9 +52,44 @@ class SingleAgentSC2Env(gym.Env):
         self._observation_spec = None
         self._observation_set = observation_set
         self._observation_gym_space = None
-        self._reward_processor = reward_processor
+        self._reward_processor = reward_processor if reward_processor is not None else RewardProcessor()
         self._current_raw_obs = None
         self._current_obs = None
+        self._launch_thread = None
+        self._launch_error = None
+        if prelaunch:
+            self.prelaunch()
+
+    def prelaunch(self):
+        """Starts launching StarCraft II in a background thread, so the first reset does not wait for the game."""
+        if self._sc2_env is None and self._launch_thread is None:
+            self._launch_thread = threading.Thread(target=self._background_launch, name="sc2-launch", daemon=True)
+            self._launch_thread.start()
+
+    def _background_launch(self):
+        try:
+            self._init_sc2_env()
+        except Exception as e:
+            logger.exception("Launching StarCraft II in the background failed.")
+            self._launch_error = e
+
+    def _ensure_sc2_env(self):
+        """Waits for a background launch, or launches StarCraft II if it is not running."""
+        if self._launch_thread is not None:
+            self._launch_thread.join()
+            self._launch_thread = None
+            if self._launch_error is not None:
+                error, self._launch_error = self._launch_error, None
+                raise error
+        if self._sc2_env is None:
+            self._init_sc2_env()
+
+    def _players(self):
+        """Returns the pysc2 player setup: the agent, and a built-in bot if there are two players."""
+        players = [sc2_env.Agent(sc2_env.Race[self._env_options.agent1_race], self._env_options.agent1_name)]
+        if self._num_players > 1:
+            players += [sc2_env.Bot(sc2_env.Race[self._env_options.agent2_race], self._env_options.difficulty)]
+        return players
 
     def _init_sc2_env(self):
         """
@@ -55,13 +98,13 @@ class SingleAgentSC2Env(gym.Env):
         Returns:
 
         """
-        players = [sc2_env.Agent(sc2_env.Race[self._env_options.agent1_race], self._env_options.agent1_name)]
-        if self._num_players > 1:
-            players += [sc2_env.Bot(sc2_env.Race[self._env_options.agent2_race], self._env_options.difficulty)]
-
+        if self._env_options.profile or self._env_options.trace:
+            stopwatch.sw.enabled = True
+            stopwatch.sw.trace = stopwatch.sw.trace or self._env_options.trace
+            profiler.enable(trace=self._env_options.trace)
         self._sc2_env = sc2_env.SC2Env(
             map_name=self._map_name,
-            players=players,
+            players=self._players(),
             agent_interface_format=sc2_env.parse_agent_interface_format(
                 feature_screen=self._env_options.feature_screen_size,
                 feature_minimap=self._env_options.feature_minimap_size,
@@ -76,8 +119,6 @@ class SingleAgentSC2Env(gym.Env):
             visualize=self._env_options.render,
             realtime=self._env_options.realtime)
         self._observation_spec = self._sc2_env.observation_spec()
-        self._action_gym_space = self._action_set.convert_to_gym_action_spaces()
-        self._observation_gym_space = self._observation_set.convert_to_gym_observation_spaces()
         self._current_obs = None
 
     def render(self, mode='human', close=False):
@@ -104,33 +145,35 @@ class SingleAgentSC2Env(gym.Env):
             return
         if self._owns_render:
             self.render(close=True)
+        if self._launch_thread is not None:
+            self._launch_thread.join()
+            self._launch_thread = None
         if self._sc2_env is not None:
             self._sc2_env.close()
+        if self._env_options.profile:
+            logger.info("pysc2 timings:\n%s", stopwatch.sw)
         self._closed = True
         super().close()
 
     @property
     def observation_spec(self):
-        if self._sc2_env is None:
-            self._init_sc2_env()
+        self._ensure_sc2_env()
         return self._observation_spec
 
     @property
     def action_set(self):
-        if self._sc2_env is None:
-            self._init_sc2_env()
         return self._action_set
 
     @property
     def action_gym_space(self):
-        if self._sc2_env is None:
-            self._init_sc2_env()
+        if self._action_gym_space is None:
+            self._action_gym_space = self._action_set.convert_to_gym_action_spaces()
         return self._action_gym_space
 
     @property
     def observation_gym_space(self):
-        if self._sc2_env is None:
-            self._init_sc2_env()
+        if self._observation_gym_space is None:
+            self._observation_gym_space = self._observation_set.convert_to_gym_observation_spaces()
         return self._observation_gym_space
 
     @property
@@ -154,7 +197,7 @@ class SingleAgentSC2Env(gym.Env):
 
     def sample_action(self):
         while True:
-            sampled_action = self._action_gym_space.sample()
+            sampled_action = self.action_gym_space.sample()
             if self._action_set.is_action_available(sampled_action[0]):
                 break
         return sampled_action
@@ -169,9 +212,11 @@ class SingleAgentSC2Env(gym.Env):
 
         """
         total_reward = 0
+        reward_components = {}
         # Features double-step action cascading
         for action in actions:
-            transformed_actions = self._action_set.transform_action(self._current_obs, action)
+            with profiler.timer('env.transform_action'):
+                transformed_actions = self._action_set.transform_action(self._current_obs, action)
             #print(transformed_actions)
             for transformed_action in transformed_actions:
                 raw_obs, reward, done, info = self._single_step(transformed_action)
@@ -183,7 +228,10 @@ class SingleAgentSC2Env(gym.Env):
 
                 self._current_raw_obs = raw_obs
                 #print(raw_obs.available_actions)
-                total_reward += self._process_reward(reward, raw_obs)
+                with profiler.timer('env.reward'):
+                    total_reward += self._process_reward(reward, raw_obs)
+                    for name, value in self._reward_processor.last_breakdown.items():
+                        reward_components[name] = reward_components.get(name, 0.0) + value
                 if done:
                     break
             if done:
@@ -192,29 +240,53 @@ class SingleAgentSC2Env(gym.Env):
         #print(self._current_raw_obs is None)
         #print(type(self._current_raw_obs.available_actions))
         #print(self._current_raw_obs.available_actions)
-        self._action_set.update_available_actions(self._current_raw_obs.available_actions)
-        obs = self._observation_set.transform_observation(self._current_raw_obs)
+        with profiler.timer('env.transform_observation'):
+            self._action_set.update_available_actions(self._current_raw_obs.available_actions)
+            obs = self._observation_set.transform_observation(self._current_raw_obs)
         self._current_obs = obs
+        if reward_components:
+            info['reward_components'] = reward_components
+        truncated = done and (info.get('truncated', False) or self._reached_step_limit())
+        info['truncated'] = truncated
+        info['terminal'] = done and not truncated
         return obs, total_reward, done, info
+
+    def _reached_step_limit(self):
+        """Whether the episode was ended by ``game_steps_per_episode`` rather than by the game."""
+        limit = self._env_options.game_steps_per_episode
+        if not limit or self._current_raw_obs is None:
+            return False
+        return int(self._current_raw_obs.game_loop[0]) >= limit
     
     def _single_step(self, action):
+        """Steps the game. If the game fails, the episode is truncated at the last valid observation
+        and the game is relaunched on the next reset."""
+        sc2_env = self._sc2_env
         try:
             # Only observing the first player's timestep
-            timestep = self._sc2_env.step([action])[0]
-        except KeyboardInterrupt:
-            logging.info("Keyboard Interruption.")
-            return None, 0, True, {}
+            with profiler.timer('env.sc2_step'):
+                timestep = sc2_env.step([action])[0]
         except Exception:
             logging.exception("An unexpected exception occurred.")
-            self._sc2_env = None
-            return None, 0, True, {}
+            self._discard_sc2_env(sc2_env)
+            return self._current_raw_obs, 0, True, {'truncated': True, 'crashed': True}
         reward = timestep.reward
         return timestep.observation, reward, timestep.step_type == StepType.LAST, {}
 
+    def _discard_sc2_env(self, sc2_env):
+        """Closes a failed game, unless it was already replaced by a new one."""
+        if sc2_env is None or self._sc2_env is not sc2_env:
+            return
+        self._sc2_env = None
+        try:
+            sc2_env.close()
+        except Exception:
+            logger.exception("Closing the failed StarCraft II environment raised an exception.")
+
     def reset(self):
-        if self._sc2_env is None:
-            self._init_sc2_env()
+        self._ensure_sc2_env()
         self._current_raw_obs = self._sc2_env.reset()[0].observation
+        self._reward_processor.reset(self._current_raw_obs)
         self._action_set.update_available_actions(self._current_raw_obs.available_actions)
         self._current_obs = self._observation_set.transform_observation(self._current_raw_obs)
         return self._current_obs
@@ -0,0 +1,120 @@
+"""A supervisor keeping long runs alive through StarCraft II crashes and hangs."""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import gym
+
+logger = logging.getLogger(__name__)
+
+
+class SupervisedSC2Env(gym.Wrapper):
+    """Wraps a :class:`SingleAgentSC2Env` so that game failures end episodes instead of runs.
+
+    Every step runs with a timeout. When a step times out or the game crashes, the game is
+    closed, the in-flight episode is returned as ``done`` with ``info['truncated']`` set and the
+    last valid observation, so learners bootstrap it instead of treating it as terminal. A new
+    game is launched in the background and picked up by the next reset. Restarts, timeouts
+    and the time spent without a running game are kept in :attr:`metrics`.
+
+    A call that timed out cannot be stopped and may still return later, so after a timeout the
+    abandoned environment is replaced by a new instance from ``env_fn``; the late call then only
+    changes the state of the abandoned one.
+
+    Args:
+        env_fn: a function creating the :class:`SingleAgentSC2Env` to supervise.
+        step_timeout (float): seconds a step may take before the game is considered hung.
+        reset_timeout (float): seconds a reset, including launching the game, may take.
+        max_restarts (int): the number of restarts after which failures are raised, or None.
+    """
+
+    def __init__(self, env_fn, step_timeout=60.0, reset_timeout=600.0, max_restarts=100):
+        super().__init__(env_fn())
+        self._env_fn = env_fn
+        self._step_timeout = step_timeout
+        self._reset_timeout = reset_timeout
+        self._max_restarts = max_restarts
+        self._executor = None
+        self._last_obs = None
+        self._down_since = None
+        self._metrics = dict(restarts=0, crashes=0, timeouts=0, downtime=0.0)
+
+    @property
+    def action_space(self):
+        return self.env.action_gym_space
+
+    @property
+    def observation_space(self):
+        return self.env.observation_gym_space
+
+    @property
+    def metrics(self):
+        """Counts of restarts, crashes and timeouts, and the downtime in seconds, since construction."""
+        return dict(self._metrics)
+
+    def _call(self, timeout, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sc2-step")
+        return self._executor.submit(fn, *args).result(timeout=timeout)
+
+    def _restart(self, reason, abandon=False):
+        """Discards the current game and starts launching a new one in the background.
+
+        Args:
+            reason (str): the failure, for the log.
+            abandon (bool): whether a call on the environment may still be running, in which case
+                the environment is replaced by a new instance.
+        """
+        self._metrics['restarts'] += 1
+        if self._max_restarts is not None and self._metrics['restarts'] > self._max_restarts:
+            raise Exception("StarCraft II failed {} times, giving up: {}".format(self._metrics['restarts'], reason))
+        logger.warning("Restarting StarCraft II (%d restarts so far): %s", self._metrics['restarts'], reason)
+        if self._down_since is None:
+            self._down_since = time.time()
+        if self._executor is not None:
+            # A hung step keeps its worker thread busy, so later calls go to a fresh one.
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.env.unwrapped._discard_sc2_env(self.env.unwrapped._sc2_env)
+        if abandon:
+            self.env = self._env_fn()
+        self.env.unwrapped.prelaunch()
+
+    def reset(self, **kwargs):
+        while True:
+            try:
+                obs = self._call(self._reset_timeout, lambda: self.env.reset(**kwargs))
+                break
+            except TimeoutError:
+                self._metrics['timeouts'] += 1
+                self._restart("reset timed out after {} seconds".format(self._reset_timeout), abandon=True)
+            except Exception as e:
+                self._metrics['crashes'] += 1
+                self._restart("reset failed with {!r}".format(e))
+        if self._down_since is not None:
+            self._metrics['downtime'] += time.time() - self._down_since
+            self._down_since = None
+        self._last_obs = obs
+        return obs
+
+    def step(self, action):
+        try:
+            obs, reward, done, info = self._call(self._step_timeout, self.env.step, action)
+        except TimeoutError:
+            self._metrics['timeouts'] += 1
+            self._restart("step timed out after {} seconds".format(self._step_timeout), abandon=True)
+            return self._last_obs, 0.0, True, {'truncated': True, 'crashed': True}
+        except Exception as e:
+            self._metrics['crashes'] += 1
+            self._restart("step failed with {!r}".format(e))
+            return self._last_obs, 0.0, True, {'truncated': True, 'crashed': True}
+        if info.get('crashed', False):
+            self._metrics['crashes'] += 1
+            self._restart("the game crashed during the step")
+        self._last_obs = obs
+        return obs, reward, done, info
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        return self.env.close()
@@ -0,0 +1,65 @@
+import numpy as np
+from pysc2.lib import actions
+from . import actions as sc2_actions
+from .actions import DefaultActionSet, AtomAction, SelectArmyAction, MoveScreenAction, \
+    retrieve_parameter_size_vector
+
+
+def legacy_transform_action(action_set, observation, action_values):
+    """The decoder before the action tables were compiled, calling every action's transform_action."""
+    action_id = action_values[0]
+    if not action_set.is_action_available(action_id):
+        return [sc2_actions.NoOpAction().transform_action(observation, [])]
+    action = action_set._action_list[action_id]
+    parameter_values = []
+    for parameter_type in action.arg_types:
+        if parameter_type.name in action.defaults:
+            parameter_values += [action.defaults[parameter_type.name]]
+        else:
+            parameter_values += [action_values[1 + action_set._parameter_registry[parameter_type]]]
+    return [action.transform_action(observation, parameter_values)]
+
+
+def random_action_vectors(action_set, rng, num_vectors):
+    registry = action_set._parameter_registry
+    sizes = [0] * len(registry)
+    for arg_type, column in registry.items():
+        sizes[column] = retrieve_parameter_size_vector(arg_type, action_set._feature_screen_size,
+                                                       action_set._feature_minimap_size)
+    vectors = np.zeros((num_vectors, 1 + len(sizes)), dtype=np.int64)
+    vectors[:, 0] = rng.randint(len(action_set._action_list), size=num_vectors)
+    for column, size in enumerate(sizes):
+        vectors[:, 1 + column] = rng.randint(size, size=num_vectors)
+    return vectors
+
+
+def assert_equivalent(action_set, vectors):
+    batched = action_set.transform_actions(vectors)
+    for vector, function_call in zip(vectors.tolist(), batched):
+        expected, = legacy_transform_action(action_set, None, vector)
+        assert function_call.function == expected.function
+        assert function_call.arguments == expected.arguments
+        assert action_set.transform_action(None, vector) == [function_call]
+
+
+class TestTransformActions:
+    def test_full_action_space_matches_legacy_decoder(self):
+        rng = np.random.RandomState(0)
+        action_set = DefaultActionSet.add_all_basic_sc2_actions()
+        action_set.update_available_actions(rng.choice(len(actions.FUNCTIONS), size=400, replace=False))
+        assert_equivalent(action_set, random_action_vectors(action_set, rng, 3000))
+
+    def test_defaults_match_legacy_decoder(self):
+        rng = np.random.RandomState(1)
+        action_set = DefaultActionSet([sc2_actions.NoOpAction(), SelectArmyAction(select_add="select"),
+                                       MoveScreenAction(queued="now"),
+                                       AtomAction.factory(actions.FUNCTIONS.select_rect)()])
+        action_set.update_available_actions(np.arange(len(actions.FUNCTIONS)))
+        assert_equivalent(action_set, random_action_vectors(action_set, rng, 500))
+
+    def test_compiled_tables_are_bounded(self):
+        action_lists = [(sc2_actions.NoOpAction(), SelectArmyAction(select_add="select")) for _ in range(40)]
+        for action_list in action_lists:
+            DefaultActionSet(action_list)
+        assert len(sc2_actions._compiled_action_tables) <= sc2_actions._MAX_COMPILED_ACTION_TABLES
+        assert DefaultActionSet(action_lists[-1])._action_mask is DefaultActionSet(action_lists[-1])._action_mask
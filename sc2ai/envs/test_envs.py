@@ -0,0 +1,32 @@
+import subprocess
+import sys
+from .registry import load_entry_point, map_spec, registered_maps, env_spaces, make_sc2env
+
+
+class TestLazyImports:
+    def test_package_import_does_not_load_pysc2(self):
+        code = ("import sys, sc2ai.envs, sc2ai.envs.minigames; "
+                "print(any(name.startswith(('pysc2', 'sc2ai.envs.minigames.', 'sc2ai.envs.sc2env')) "
+                "for name in sys.modules))")
+        output = subprocess.check_output([sys.executable, "-c", code], universal_newlines=True)
+        assert output.strip() == "False"
+
+    def test_entry_points_resolve(self):
+        from .minigames import MoveToBeaconEnv
+        assert load_entry_point(map_spec("MoveToBeacon").entry_point) is MoveToBeaconEnv
+
+
+class TestRegistry:
+    def test_spaces_without_launching(self):
+        assert "ExpandBase" in registered_maps()
+        spaces = env_spaces("MoveToBeacon")
+        assert spaces.action_space.nvec[0] == 5
+        assert spaces.action_mask.shape == (5, len(spaces.action_space.nvec))
+        assert env_spaces("MoveToBeacon") is spaces
+
+    def test_space_properties_do_not_launch(self):
+        env = make_sc2env(map="MoveToBeacon")
+        assert env.action_gym_space.nvec[0] == 5
+        assert env.observation_gym_space["feature_screen"].shape == (2, 84, 84)
+        assert env.action_set.get_action_spec_and_action_mask()[1].shape[0] == 5
+        assert env._sc2_env is None
@@ -0,0 +1,88 @@
+import numpy as np
+from pysc2.env.environment import StepType, TimeStep
+from pysc2.lib import actions, features, named_array
+from .multiagent import MultiAgentSC2Env
+from .rewards import ShapedRewardProcessor, DamageTakenReward
+from .observations import ObservationSet, UnitListCategory, default_unit_field_filters
+from .registry import make_sc2env
+
+
+def make_raw_observation(player, available):
+    player_relative = np.zeros((84, 84), dtype=np.int32)
+    player_relative[player, player] = features.PlayerRelative.SELF
+    raw_units = np.zeros((player + 1, len(features.FeatureUnit)), dtype=np.int64)
+    raw_units[:, features.FeatureUnit.alliance] = features.PlayerRelative.SELF
+    raw_units[:, features.FeatureUnit.x] = 10 * (player + 1)
+    return named_array.NamedDict(feature_screen=named_array.NamedDict(player_relative=player_relative),
+                                 raw_units=raw_units, available_actions=np.array(available), game_loop=np.array([0]))
+
+
+class FakeSC2Env:
+    """Records the function calls of every step and ends the game after two steps."""
+    def __init__(self):
+        self.calls = []
+
+    def _timesteps(self, step_type, rewards):
+        return [TimeStep(step_type, reward, 1.0, make_raw_observation(i, [0, 7] if i == 0 else [0, 7, 331]))
+                for i, reward in enumerate(rewards)]
+
+    def reset(self):
+        return self._timesteps(StepType.FIRST, [0.0, 0.0])
+
+    def step(self, function_calls):
+        self.calls.append(function_calls)
+        if len(self.calls) == 2:
+            return self._timesteps(StepType.LAST, [1.0, -1.0])
+        return self._timesteps(StepType.MID, [0.0, 0.0])
+
+
+class DamagingSC2Env(FakeSC2Env):
+    """Every step takes 10 hit points from the units of every player."""
+    def _timesteps(self, step_type, rewards):
+        timesteps = super()._timesteps(step_type, rewards)
+        for timestep in timesteps:
+            timestep.observation["raw_units"][:, features.FeatureUnit.health] = 50 - 10 * len(self.calls)
+        return timesteps
+
+
+class TestMultiAgentSC2Env:
+    def test_batched_steps(self):
+        env = MultiAgentSC2Env.from_env(make_sc2env(map="MoveToBeacon"), num_agents=2)
+        env._sc2_env = FakeSC2Env()
+        obs = env.reset()
+        assert obs["feature_screen"].shape == (2, 2, 84, 84)
+        assert obs["feature_screen"][1, 0, 1, 1] == 1
+        assert env.available_actions.shape == (2, 5)
+        assert not env.available_actions[0, 4] and env.available_actions[1, 4]
+
+        move = [4, 5 * 84 + 6, 0]
+        obs, rewards, done, info = env.step(np.array([move, move]))
+        calls = env._sc2_env.calls[0]
+        assert calls[0].function == actions.FUNCTIONS.no_op.id
+        assert calls[1] == actions.FUNCTIONS.Move_screen("now", [5, 6])
+        assert list(rewards) == [0.0, 0.0] and not done
+
+        obs, rewards, done, info = env.step(env.sample_action())
+        assert list(rewards) == [1.0, -1.0] and done and info["terminal"]
+
+    def test_unit_list_observations(self):
+        single = make_sc2env(map="MoveToBeacon")
+        observation_set = ObservationSet([UnitListCategory("raw_units", default_unit_field_filters(map_size=64),
+                                                           max_units=4)])
+        env = MultiAgentSC2Env("MoveToBeacon", single._action_set, observation_set, num_agents=2)
+        env._sc2_env = FakeSC2Env()
+        units = env.reset()["raw_units"]
+        assert units.shape == (2, 4, 10)
+        # Every player keeps its own units, although the category reuses its output buffer.
+        assert list(units[0, :, -1]) == [1, 0, 0, 0] and list(units[1, :, -1]) == [1, 1, 0, 0]
+        assert np.allclose(units[0, 0, 4], 10 / 64) and np.allclose(units[1, :2, 4], 20 / 64)
+
+    def test_first_step_rewards_use_reset_observations(self):
+        env = MultiAgentSC2Env.from_env(make_sc2env(map="MoveToBeacon"), num_agents=2,
+                                        reward_processor=ShapedRewardProcessor([DamageTakenReward()]))
+        env._sc2_env = DamagingSC2Env()
+        env.reset()
+        _, rewards, _, info = env.step(env.sample_action())
+        # Player i has i + 1 units, each losing 10 hit points on the first step.
+        assert list(rewards) == [-10.0, -20.0]
+        assert list(info["reward_components"]["damage_taken"]) == [-10.0, -20.0]
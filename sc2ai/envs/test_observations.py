@@ -0,0 +1,68 @@
+import numpy as np
+from pysc2.lib import features, named_array
+from .observations import UnitDistanceFilter, UnitFieldFilter, UnitListCategory
+from .registry import make_sc2env
+
+
+def make_raw_observation(alliances, x):
+    raw_units = np.zeros((len(alliances), len(features.FeatureUnit)), dtype=np.int64)
+    raw_units[:, features.FeatureUnit.alliance] = alliances
+    raw_units[:, features.FeatureUnit.x] = x
+    return named_array.NamedDict(raw_units=raw_units)
+
+
+def make_category(**kwargs):
+    return UnitListCategory("raw_units", [UnitFieldFilter("x", features.FeatureUnit.x, scale=0.5, offset=2.0),
+                                          UnitFieldFilter("alliance", features.FeatureUnit.alliance)], **kwargs)
+
+
+class TestUnitListCategory:
+    def test_alliance_ordering_and_truncation(self):
+        enemy, self_, neutral = features.PlayerRelative.ENEMY, features.PlayerRelative.SELF, \
+            features.PlayerRelative.NEUTRAL
+        obs = make_raw_observation([enemy, neutral, self_, enemy, self_], [10, 20, 30, 40, 50])
+        units = make_category(max_units=3).transform_observation(obs)
+        assert units.shape == (3, 3) and units.dtype == np.float32
+        # Own units first, then enemies, in their original order; the neutral unit is dropped.
+        assert list(units[:, 1]) == [self_, self_, enemy]
+        np.testing.assert_allclose(units[:, 0], [(30 - 2) * 0.5, (50 - 2) * 0.5, (10 - 2) * 0.5])
+        assert list(units[:, 2]) == [1, 1, 1]
+        unsorted = make_category(max_units=3, sort_by_alliance=False).transform_observation(obs)
+        assert list(unsorted[:, 1]) == [enemy, neutral, self_]
+
+    def test_zero_padding_and_mask(self):
+        category = make_category(max_units=4)
+        units = category.transform_observation(make_raw_observation([features.PlayerRelative.SELF] * 3, [4, 6, 8]))
+        assert list(units[:, 2]) == [1, 1, 1, 0]
+        assert not units[3].any()
+        empty = category.transform_observation(make_raw_observation([], []))
+        assert empty.shape == (4, 3) and not empty.any()
+        assert category.convert_to_gym_observation_spaces().shape == (4, 3)
+
+    def test_returns_new_arrays(self):
+        category = make_category(max_units=2)
+        first = category.transform_observation(make_raw_observation([features.PlayerRelative.SELF], [4]))
+        second = category.transform_observation(make_raw_observation([features.PlayerRelative.SELF] * 2, [6, 8]))
+        assert first is not second and list(first[:, 2]) == [1, 0] and first[0, 0] == 1.0
+
+    def test_unsplit_output(self):
+        obs = make_category(max_units=2, use_stacked=False).transform_observation(
+            make_raw_observation([features.PlayerRelative.SELF], [4]))
+        assert obs["units"].shape == (2, 2) and list(obs["mask"]) == [1, 0]
+
+    def test_distance_columns(self):
+        enemy, self_ = features.PlayerRelative.ENEMY, features.PlayerRelative.SELF
+        obs = make_raw_observation([enemy, self_, enemy, self_], [10, 30, 40, 50])
+        category = UnitListCategory("raw_units", [UnitDistanceFilter("ally_distance", self_, scale=0.1),
+                                                  UnitFieldFilter("x", features.FeatureUnit.x)], max_units=5)
+        units = category.transform_observation(obs)
+        assert list(units[:, 1]) == [30, 50, 10, 40, 0]
+        # Allies are not their own nearest ally.
+        np.testing.assert_allclose(units[:, 0], [2.0, 2.0, 2.0, 1.0, 0.0])
+        alone = category.transform_observation(make_raw_observation([self_], [30]))
+        assert alone[0, 0] == np.float32(64 * 0.1)
+
+    def test_minigame_unit_list(self):
+        space = make_sc2env(map="DefeatRoaches", unit_list=True).observation_gym_space
+        assert space["raw_units"].shape == (64, 10)
+        assert "raw_units" not in make_sc2env(map="DefeatRoaches").observation_gym_space.spaces
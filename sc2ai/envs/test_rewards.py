@@ -0,0 +1,104 @@
+import numpy as np
+from pysc2.env.environment import StepType, TimeStep
+from pysc2.lib import features, named_array
+from .registry import make_sc2env
+from .rewards import DamageDealtReward, DamageTakenReward, DistanceToBeaconReward, DistanceToEnemyReward, \
+    EnemyKillReward, EnvReward, IdlePenalty, ScoreDeltaReward, ShapedRewardProcessor, UnitLossReward, \
+    extract_reward_features
+
+SELF, ENEMY, NEUTRAL = features.PlayerRelative.SELF, features.PlayerRelative.ENEMY, features.PlayerRelative.NEUTRAL
+
+
+def make_raw_observation(units, minerals=0):
+    """Creates an observation from ``(alliance, health, shield, x, y, order_length)`` tuples."""
+    raw_units = np.zeros((len(units), len(features.FeatureUnit)), dtype=np.int64)
+    for row, (alliance, health, shield, x, y, order_length) in zip(raw_units, units):
+        row[[features.FeatureUnit.alliance, features.FeatureUnit.health, features.FeatureUnit.shield,
+             features.FeatureUnit.x, features.FeatureUnit.y, features.FeatureUnit.order_length]] = \
+            alliance, health, shield, x, y, order_length
+    score = np.zeros(len(features.ScoreCumulative), dtype=np.int32)
+    score[features.ScoreCumulative.collected_minerals] = minerals
+    player_relative = np.zeros((84, 84), dtype=np.int32)
+    return named_array.NamedDict(raw_units=raw_units, score_cumulative=score, available_actions=np.array([0, 7, 331]),
+                                 feature_screen=named_array.NamedDict(player_relative=player_relative),
+                                 game_loop=np.array([0]))
+
+
+FIRST = make_raw_observation([(SELF, 40, 10, 0, 0, 0), (SELF, 50, 0, 4, 0, 1), (ENEMY, 100, 0, 9, 9, 1),
+                              (ENEMY, 30, 0, 9, 8, 1), (NEUTRAL, 0, 0, 0, 10, 0)], minerals=10)
+SECOND = make_raw_observation([(SELF, 30, 0, 0, 4, 1), (ENEMY, 70, 0, 9, 9, 1), (NEUTRAL, 0, 0, 0, 10, 0)],
+                              minerals=25)
+
+
+def all_components():
+    return [EnvReward(max_value=1.0), DamageDealtReward(), DamageTakenReward(), UnitLossReward(), EnemyKillReward(),
+            IdlePenalty(), ScoreDeltaReward(features.ScoreCumulative.collected_minerals),
+            DistanceToBeaconReward(gamma=1.0, map_size=1), DistanceToEnemyReward(gamma=1.0, map_size=1)]
+
+
+class TestRewardComponents:
+    def test_component_values(self):
+        processor = ShapedRewardProcessor(all_components())
+        processor.reset(FIRST)
+        total = processor.process(5.0, SECOND)
+        breakdown = processor.last_breakdown
+        assert breakdown["env"] == 1.0
+        assert breakdown["damage_dealt"] == 60.0  # 130 enemy hit points down to 70
+        assert breakdown["damage_taken"] == -70.0  # 100 allied hit points down to 30
+        assert breakdown["unit_losses"] == -1.0 and breakdown["enemy_kills"] == 1.0
+        assert breakdown["idle"] == 0.0
+        assert breakdown["score_collected_minerals"] == 15.0
+        # The allies at (0, 0) and (4, 0) become one at (0, 4), with the beacon at (0, 10).
+        assert np.isclose(breakdown["distance_to_beacon"], (10 + np.hypot(4, 10)) / 2 - 6)
+        # Their nearest enemies are at (9, 8) and at (9, 8), then at (9, 9).
+        assert np.isclose(breakdown["distance_to_enemy"], (np.hypot(9, 8) + np.hypot(5, 8)) / 2 - np.hypot(9, 5))
+        assert np.isclose(total, sum(breakdown.values()))
+
+    def test_first_step_ignores_previous(self):
+        processor = ShapedRewardProcessor(all_components())
+        processor.reset()
+        processor.process(0.0, FIRST)
+        breakdown = processor.last_breakdown
+        assert breakdown["damage_dealt"] == 0.0 and breakdown["score_collected_minerals"] == 0.0
+        assert np.isclose(breakdown["idle"], -0.01 * 0.5)
+
+    def test_batch_matches_single_steps(self):
+        episodes = [[FIRST, SECOND, SECOND], [SECOND, FIRST, SECOND], [FIRST, FIRST, SECOND]]
+        batch = ShapedRewardProcessor(all_components())
+        batch.reset()
+        singles = [ShapedRewardProcessor(all_components()) for _ in episodes]
+        for single in singles:
+            single.reset()
+        for t in range(3):
+            totals, breakdown = batch.process_batch([float(t)] * len(episodes), [episode[t] for episode in episodes])
+            for i, (single, episode) in enumerate(zip(singles, episodes)):
+                assert np.isclose(single.process(float(t), episode[t]), totals[i])
+                for name, value in single.last_breakdown.items():
+                    assert np.isclose(breakdown[name][i], value)
+
+    def test_empty_batch(self):
+        assert extract_reward_features([])["score"].shape == (0, len(features.ScoreCumulative))
+        totals, breakdown = ShapedRewardProcessor(all_components()).process_batch([], [])
+        assert totals.shape == (0,) and all(value.shape == (0,) for value in breakdown.values())
+
+
+class FakeSC2Env:
+    def __init__(self, observations):
+        self.observations = list(observations)
+
+    def reset(self):
+        return [TimeStep(StepType.FIRST, 0.0, 1.0, self.observations.pop(0))]
+
+    def step(self, function_calls):
+        return [TimeStep(StepType.MID, 1.0, 1.0, self.observations.pop(0))]
+
+
+class TestRewardInfo:
+    def test_components_summed_over_game_steps(self):
+        processor = ShapedRewardProcessor([EnvReward(), DamageDealtReward()])
+        env = make_sc2env(map="MoveToBeacon", reward_processor=processor)
+        env._sc2_env = FakeSC2Env([FIRST, FIRST, SECOND])
+        env.reset()
+        _, reward, _, info = env.step([[0, 0, 0], [0, 0, 0]])
+        assert info["reward_components"] == {"env": 2.0, "damage_dealt": 60.0}
+        assert reward == 62.0
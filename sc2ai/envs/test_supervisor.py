@@ -0,0 +1,108 @@
+import threading
+import time
+import numpy as np
+from pysc2.env.environment import StepType, TimeStep
+from pysc2.lib import features, named_array
+from .registry import make_sc2env
+from .supervisor import SupervisedSC2Env
+
+
+def make_raw_observation(x):
+    player_relative = np.zeros((84, 84), dtype=np.int32)
+    player_relative[0, x] = features.PlayerRelative.SELF
+    return named_array.NamedDict(feature_screen=named_array.NamedDict(player_relative=player_relative),
+                                 available_actions=np.array([0, 7, 331]), game_loop=np.array([0]))
+
+
+class FakeBackend:
+    """A game whose steps follow a shared plan: ``ok``, ``crash`` or ``hang`` until released."""
+    def __init__(self, plan, release):
+        self.plan = plan
+        self.release = release
+        self.x = 0
+
+    def reset(self):
+        self.x = 0
+        return [TimeStep(StepType.FIRST, 0.0, 1.0, make_raw_observation(self.x))]
+
+    def step(self, function_calls):
+        behaviour = self.plan.pop(0) if self.plan else "ok"
+        if behaviour == "crash":
+            raise Exception("The game crashed.")
+        if behaviour == "hang":
+            self.release.wait()
+            self.x = 50
+        else:
+            self.x += 1
+        return [TimeStep(StepType.MID, 1.0, 1.0, make_raw_observation(self.x))]
+
+    def close(self):
+        pass
+
+
+def make_env_fn(plan, release, created):
+    def env_fn():
+        env = make_sc2env(map="MoveToBeacon")
+
+        def init_sc2_env():
+            env._sc2_env = FakeBackend(plan, release)
+        env._init_sc2_env = init_sc2_env
+        created.append(env)
+        return env
+    return env_fn
+
+
+def self_x(obs):
+    return int(np.argmax(obs["feature_screen"][0, 0]))
+
+
+class TestSupervisedSC2Env:
+    def test_crash_restarts_the_game(self):
+        created = []
+        env = SupervisedSC2Env(make_env_fn(["ok", "crash"], threading.Event(), created), step_timeout=5.0)
+        env.reset()
+        obs, _, done, _ = env.step([[0, 0, 0]])
+        assert self_x(obs) == 1 and not done
+        obs, reward, done, info = env.step([[0, 0, 0]])
+        assert done and info["truncated"] and info["crashed"] and reward == 0.0 and self_x(obs) == 1
+        assert env.metrics["crashes"] == 1 and env.metrics["restarts"] == 1
+        # A crash leaves no call running, so the same environment relaunches its game.
+        assert len(created) == 1
+        assert self_x(env.reset()) == 0 and env.metrics["downtime"] >= 0.0
+        env.close()
+
+    def test_hang_abandons_the_environment(self):
+        created, release = [], threading.Event()
+        env = SupervisedSC2Env(make_env_fn(["hang"], release, created), step_timeout=0.2)
+        first_obs = env.reset()
+        obs, _, done, info = env.step([[0, 0, 0]])
+        assert done and info["truncated"] and obs is first_obs
+        assert env.metrics["timeouts"] == 1 and env.metrics["restarts"] == 1
+        assert len(created) == 2 and env.env is created[1]
+
+        obs = env.reset()
+        release.set()
+        # The late result of the hung step lands on the abandoned environment only.
+        for _ in range(200):
+            if created[0].current_obs is not None and self_x(created[0].current_obs) == 50:
+                break
+            time.sleep(0.01)
+        assert self_x(created[0].current_obs) == 50
+        assert self_x(env.env.current_obs) == 0 and self_x(obs) == 0
+        obs, _, done, _ = env.step([[0, 0, 0]])
+        assert self_x(obs) == 1 and not done
+        env.close()
+
+    def test_keyboard_interrupt_is_raised(self):
+        env = SupervisedSC2Env(make_env_fn([], threading.Event(), []), step_timeout=5.0)
+        env.reset()
+
+        def interrupt(function_calls):
+            raise KeyboardInterrupt
+        env.env.unwrapped._sc2_env.step = interrupt
+        try:
+            env.step([[0, 0, 0]])
+            assert False, "The interruption was swallowed."
+        except KeyboardInterrupt:
+            pass
+        env.close()
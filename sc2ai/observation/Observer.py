@@ -1,108 +1,118 @@
-
-import enum
-
-class PlayerRelative(enum.IntEnum):
-  """The values for the `player_relative` feature layers."""
-  NONE = 0
-  SELF = 1
-  ALLY = 2
-  NEUTRAL = 3
-  ENEMY = 4
-
-class FeatureUnit(enum.IntEnum):
-  """Indices for the `feature_unit` observations."""
-  unit_type = 0
-  alliance = 1
-  health = 2
-  shield = 3
-  energy = 4
-  cargo_space_taken = 5
-  build_progress = 6
-  health_ratio = 7
-  shield_ratio = 8
-  energy_ratio = 9
-  display_type = 10
-  owner = 11
-  x = 12
-  y = 13
-  facing = 14
-  radius = 15
-  cloak = 16
-  is_selected = 17
-  is_blip = 18
-  is_powered = 19
-  mineral_contents = 20
-  vespene_contents = 21
-  cargo_space_max = 22
-  assigned_harvesters = 23
-  ideal_harvesters = 24
-  weapon_cooldown = 25
-  order_length = 26  # If zero, the unit is idle.
-  tag = 27  # Unique identifier for a unit (only populated for raw units).
+import numpy as np
+from pysc2.env.environment import TimeStep
+from pysc2.lib.features import PlayerRelative, FeatureUnit
+from sc2ai.observation.spatial_index import UnitSpatialIndex, get_spatial_index
 
 
 class Observer:
+    """Vectorized analytics over the raw units of an observation.
+
+    Every observation is processed once into column views (alliance, health, shield, x, y, tag)
+    of its ``raw_units`` array. The views are cached until a new game loop or a new unit list is
+    seen, so every query afterwards is a single numpy reduction or a dictionary lookup.
+
+    The query methods accept either a pysc2 ``TimeStep`` or its ``observation``.
+    """
 
     def __init__(self):
-        #Stores tags for all allied units. Updated as units or are created in game
-        self.allied_units = []
-        pass
+        self._observation = None
+        self._raw_units = None
+        self._game_loop = None
+        self._units = np.zeros((0, len(FeatureUnit)), dtype=np.int64)
+        self._tag_index = None
+        self._split_columns()
+
+    def _split_columns(self):
+        units = self._units
+        self.alliance = units[:, FeatureUnit.alliance]
+        self.health = units[:, FeatureUnit.health]
+        self.shield = units[:, FeatureUnit.shield]
+        self.x = units[:, FeatureUnit.x]
+        self.y = units[:, FeatureUnit.y]
+        self.tag = units[:, FeatureUnit.tag]
+        self.allies = self.alliance == PlayerRelative.SELF
+        self.enemies = self.alliance == PlayerRelative.ENEMY
+        self._tag_index = None
+
+    def update(self, obs):
+        """processes an observation into cached column views unless it is already cached"""
+        observation = obs.observation if isinstance(obs, TimeStep) else obs
+        raw_units = observation.raw_units
+        game_loop = int(observation.game_loop[0]) if "game_loop" in observation else None
+        if raw_units is self._raw_units and game_loop == self._game_loop:
+            return self
+        self._observation = observation
+        self._raw_units = raw_units
+        self._game_loop = game_loop
+        self._units = np.asarray(raw_units)
+        self._split_columns()
+        return self
+
+    @property
+    def allied_units(self):
+        """tags of all allied units in the last processed observation"""
+        return self.tag[self.allies]
+
+    @property
+    def spatial_index(self):
+        """the spatial index over the units of the last processed observation, empty before any observation"""
+        if self._observation is None:
+            return UnitSpatialIndex.from_units(self._units)
+        return get_spatial_index(self._observation)
 
-    def print_obs(self,obs):
+    def print_obs(self, obs):
         """prints the whole observation from this timestep of the sc2 game"""
         print(obs)
 
-    def get_total_health(self,obs):
+    def get_total_health(self, obs):
         """returns the total health of all allied units"""
-        total_health = 0
-        for unit in obs.observation.raw_units:
-            if(unit.alliance == PlayerRelative.SELF):
-                total_health += unit[FeatureUnit.health]
-        return total_health
+        self.update(obs)
+        return self.health[self.allies].sum()
 
+    def _center_of_mass(self, mask):
+        if not mask.any():
+            return None
+        return [self.x[mask].mean(), self.y[mask].mean()]
 
-    def get_center_of_mass_allies(self,obs):
+    def get_center_of_mass_allies(self, obs):
         """returns the x,y of the center of mass for allied units
-        returns [-1,-1] if no allied units are present"""
-        num_units = 0
-        total_x = 0
-        total_y = 0
-        for unit in obs.observation.raw_units:
-            if(unit.alliance == PlayerRelative.SELF):
-                total_x += unit[FeatureUnit.x]
-                total_y += unit[FeatureUnit.y]
-                num_units += 1
-        if num_units != 0:
-            return [total_x/num_units,total_y/num_units]
-        else:
-            return None
+        returns None if no allied units are present"""
+        self.update(obs)
+        return self._center_of_mass(self.allies)
 
-    def get_center_of_mass_enemies(self,obs):
+    def get_center_of_mass_enemies(self, obs):
         """returns the x,y of the center of mass for the enemy units
-        returns [-1,-1] if no enemies units are present
+        returns None if no enemies units are present
         """
-        num_units = 0
-        total_x = 0
-        total_y = 0
-        for unit in obs.observation.raw_units:
-            if(unit.alliance == PlayerRelative.ENEMY):
-                total_x += unit[FeatureUnit.x]
-                total_y += unit[FeatureUnit.y]
-                num_units += 1
-        if num_units != 0:
-            return [total_x/num_units,total_y/num_units]
-        else:
-            return None
+        self.update(obs)
+        return self._center_of_mass(self.enemies)
 
-    def get_total_shield(self,obs):
+    def get_total_shield(self, obs):
         """returns total shield of allied units"""
+        self.update(obs)
+        return self.shield[self.allies].sum()
 
-    def list_all_tags(self,obs):
+    def list_all_tags(self, obs):
         """return a list of all tags for all units in the current game"""
+        self.update(obs)
+        return self.tag.tolist()
 
-    def get_unit(self,tag):
+    def get_unit(self, tag):
         """Takes in a units tag number and returns the unit corresponding
-        that tag"""
-        
-    def health_of_weakest_unit(self,obs):
-        """returns a tuple with the weakest unit's health and tag"""
+        that tag in the last processed observation, or None if there is no such unit"""
+        if self._tag_index is None:
+            self._tag_index = dict(zip(self.tag.tolist(), range(len(self.tag))))
+        row = self._tag_index.get(int(tag))
+        if row is None:
+            return None
+        return self._raw_units[row]
+
+    def health_of_weakest_unit(self, obs):
+        """returns a tuple with the weakest unit's health and tag
+        returns None if no allied units are present"""
+        self.update(obs)
+        rows = np.flatnonzero(self.allies)
+        if len(rows) == 0:
+            return None
+        weakest = rows[np.argmin(self.health[rows])]
+        return self.health[weakest], self.tag[weakest]
@@ -0,0 +1,176 @@
+"""A per-step spatial index over unit positions for nearest-neighbour and range queries."""
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy.spatial import cKDTree
+from pysc2.lib.features import PlayerRelative, FeatureUnit
+
+
+class UnitSpatialIndex:
+    """Answers batched nearest-neighbour, k-NN and radius queries over one step's units.
+
+    Units are grouped by alliance lazily on the first query against that alliance. Small groups
+    are searched with a single vectorized distance matrix, larger ones with a KD-tree, which is
+    only worth building past a few dozen units.
+
+    Args:
+        positions: an array of shape ``(num_units, 2)`` with the x, y of every unit.
+        alliance: an array of shape ``(num_units,)`` with the :class:`PlayerRelative` of every unit.
+    """
+    brute_force_limit = 64
+
+    def __init__(self, positions, alliance):
+        self._positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        self._alliance = np.asarray(alliance).reshape(-1)
+        self._groups = {}
+
+    @classmethod
+    def from_units(cls, units):
+        """Builds an index from a ``raw_units`` or ``feature_units`` array."""
+        units = np.asarray(units)
+        return cls(units[:, [FeatureUnit.x, FeatureUnit.y]], units[:, FeatureUnit.alliance])
+
+    @property
+    def positions(self):
+        return self._positions
+
+    def _group(self, alliance):
+        if alliance not in self._groups:
+            if alliance is None:
+                rows = np.arange(len(self._positions))
+            else:
+                rows = np.flatnonzero(self._alliance == alliance)
+            tree = cKDTree(self._positions[rows]) if len(rows) > self.brute_force_limit else None
+            self._groups[alliance] = (rows, tree)
+        return self._groups[alliance]
+
+    def rows(self, alliance):
+        """Returns the unit rows belonging to an alliance, or every row if alliance is None."""
+        return self._group(alliance)[0]
+
+    def positions_of(self, alliance):
+        return self._positions[self.rows(alliance)]
+
+    def _squared_distances(self, points, rows):
+        diff = points[:, np.newaxis, :] - self._positions[rows][np.newaxis, :, :]
+        return np.einsum('ijk,ijk->ij', diff, diff)
+
+    def knn(self, points, k=1, alliance=PlayerRelative.ENEMY):
+        """Finds the k nearest units of an alliance for every query point.
+
+        Args:
+            points: an array of shape ``(num_points, 2)``.
+            k (int): the number of neighbours.
+            alliance: a :class:`PlayerRelative` value, or None to search every unit.
+
+        Returns:
+            A tuple of distances and unit rows, both of shape ``(num_points, k)`` and sorted by
+            distance. Missing neighbours have an infinite distance and a row of -1.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        rows, tree = self._group(alliance)
+        distances = np.full((len(points), k), np.inf)
+        neighbours = np.full((len(points), k), -1, dtype=np.intp)
+        found = min(k, len(rows))
+        if found == 0 or len(points) == 0:
+            return distances, neighbours
+        if tree is None:
+            squared = self._squared_distances(points, rows)
+            if found < len(rows):
+                nearest = np.argpartition(squared, found - 1, axis=1)[:, :found]
+            else:
+                nearest = np.broadcast_to(np.arange(found), (len(points), found))
+            nearest_squared = np.take_along_axis(squared, nearest, axis=1)
+            order = np.argsort(nearest_squared, axis=1)
+            distances[:, :found] = np.sqrt(np.take_along_axis(nearest_squared, order, axis=1))
+            neighbours[:, :found] = rows[np.take_along_axis(nearest, order, axis=1)]
+        else:
+            tree_distances, tree_rows = tree.query(points, k=found)
+            distances[:, :found] = tree_distances.reshape(len(points), found)
+            neighbours[:, :found] = rows[tree_rows.reshape(len(points), found)]
+        return distances, neighbours
+
+    def nearest(self, points, alliance=PlayerRelative.ENEMY):
+        """Returns the distance and row of the nearest unit of an alliance for every query point."""
+        distances, neighbours = self.knn(points, 1, alliance)
+        return distances[:, 0], neighbours[:, 0]
+
+    def count_within(self, points, radius, alliance=PlayerRelative.ENEMY):
+        """Counts the units of an alliance within ``radius`` of every query point."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        rows, tree = self._group(alliance)
+        if len(rows) == 0:
+            return np.zeros(len(points), dtype=np.intp)
+        if tree is None:
+            return np.count_nonzero(self._squared_distances(points, rows) <= np.square(radius), axis=1)
+        return tree.query_ball_point(points, radius, return_length=True)
+
+    def within_radius(self, points, radius, alliance=PlayerRelative.ENEMY):
+        """Returns a list holding the rows of the units within ``radius`` of every query point."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        rows, tree = self._group(alliance)
+        if len(rows) == 0:
+            return [rows[:0] for _ in range(len(points))]
+        if tree is None:
+            inside = self._squared_distances(points, rows) <= np.square(radius)
+            return [rows[np.flatnonzero(mask)] for mask in inside]
+        return [rows[np.asarray(found, dtype=np.intp)] for found in tree.query_ball_point(points, radius)]
+
+    def nearest_enemies(self):
+        """Returns the distance and row of the nearest enemy for every allied unit."""
+        return self.nearest(self.positions_of(PlayerRelative.SELF), PlayerRelative.ENEMY)
+
+
+class SpatialIndexCache:
+    """Keeps the spatial indexes of the last few unit lists, so that everything handling a step shares one index.
+
+    Indexes are keyed by the identity of the unit list array, which pysc2 creates anew for every
+    observation. A reference to the array is kept with its index, so the identity of an array is
+    never reused while it is cached.
+
+    Args:
+        maxsize (int): the number of indexes kept, e.g. one per player of a multi-agent game.
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, units):
+        """Returns the index of a ``raw_units`` or ``feature_units`` array, building it on the first request."""
+        key = id(units)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is units:
+                self._entries.move_to_end(key)
+                return entry[1]
+        index = UnitSpatialIndex.from_units(units)
+        with self._lock:
+            self._entries[key] = (units, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+spatial_index_cache = SpatialIndexCache()
+""" The cache shared by observation categories, reward processors and scripted agents. """
+
+
+def get_spatial_index(observation, source="raw_units", cache=spatial_index_cache):
+    """Returns the spatial index of an observation's unit list, shared within a step.
+
+    Args:
+        observation: a pysc2 observation.
+        source (str): either ``raw_units`` or ``feature_units``.
+        cache (SpatialIndexCache): the cache of recent indexes.
+
+    Returns:
+        A :class:`UnitSpatialIndex`
+    """
+    return cache.get(observation[source])
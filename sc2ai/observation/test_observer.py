@@ -0,0 +1,33 @@
+import numpy as np
+from pysc2.lib import features, named_array
+from .Observer import Observer
+
+
+def make_observation(alliance, health, x, y, tag, game_loop=0):
+    raw_units = np.zeros((len(alliance), len(features.FeatureUnit)), dtype=np.int64)
+    raw_units[:, features.FeatureUnit.alliance] = alliance
+    raw_units[:, features.FeatureUnit.health] = health
+    raw_units[:, features.FeatureUnit.x] = x
+    raw_units[:, features.FeatureUnit.y] = y
+    raw_units[:, features.FeatureUnit.tag] = tag
+    raw_units = named_array.NamedNumpyArray(raw_units, [None, features.FeatureUnit])
+    return named_array.NamedDict(raw_units=raw_units, game_loop=np.array([game_loop]))
+
+
+class TestObserver:
+    def test_queries(self):
+        obs = make_observation([1, 4, 1, 3], [45, 100, 30, 0], [1, 2, 3, 4], [2, 2, 4, 2], [11, 12, 13, 14])
+        observer = Observer()
+        assert observer.get_total_health(obs) == 75
+        assert observer.get_center_of_mass_allies(obs) == [2, 3]
+        assert observer.get_center_of_mass_enemies(obs) == [2, 2]
+        assert observer.list_all_tags(obs) == [11, 12, 13, 14]
+        assert observer.health_of_weakest_unit(obs) == (30, 13)
+        assert observer.get_unit(12)[features.FeatureUnit.health] == 100
+        assert observer.get_unit(99) is None
+
+    def test_cache_invalidates_per_game_loop(self):
+        observer = Observer()
+        assert observer.get_total_health(make_observation([1], [10], [0], [0], [1], game_loop=0)) == 10
+        assert observer.get_total_health(make_observation([1, 1], [10, 5], [0, 0], [0, 0], [1, 2], game_loop=8)) == 15
+        assert observer.get_center_of_mass_enemies(make_observation([1], [10], [0], [0], [1], game_loop=16)) is None
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from pysc2.lib import features, named_array
+from .spatial_index import SpatialIndexCache, UnitSpatialIndex, get_spatial_index
+from .Observer import Observer
+
+ALLIANCES = [features.PlayerRelative.SELF, features.PlayerRelative.ENEMY, features.PlayerRelative.NEUTRAL]
+
+
+def make_units(rng, num_units):
+    units = np.zeros((num_units, len(features.FeatureUnit)), dtype=np.int64)
+    units[:, features.FeatureUnit.alliance] = rng.choice(ALLIANCES, size=num_units)
+    units[:, features.FeatureUnit.x] = rng.randint(0, 64, size=num_units)
+    units[:, features.FeatureUnit.y] = rng.randint(0, 64, size=num_units)
+    return units
+
+
+def make_index(units, brute_force):
+    index = UnitSpatialIndex.from_units(units)
+    index.brute_force_limit = len(units) if brute_force else 0
+    return index
+
+
+def brute_force_distances(units, points, alliance):
+    rows = np.arange(len(units)) if alliance is None else \
+        np.flatnonzero(units[:, features.FeatureUnit.alliance] == alliance)
+    positions = units[rows][:, [features.FeatureUnit.x, features.FeatureUnit.y]].astype(np.float64)
+    return rows, np.linalg.norm(points[:, np.newaxis, :] - positions[np.newaxis, :, :], axis=2)
+
+
+@pytest.mark.parametrize("brute_force", [True, False])
+class TestUnitSpatialIndex:
+    def test_knn(self, brute_force):
+        rng = np.random.RandomState(0)
+        units = make_units(rng, 200)
+        points = rng.uniform(0, 64, size=(50, 2))
+        index = make_index(units, brute_force)
+        for alliance in ALLIANCES + [None]:
+            rows, distances = brute_force_distances(units, points, alliance)
+            found, neighbours = index.knn(points, k=5, alliance=alliance)
+            np.testing.assert_allclose(found, np.sort(distances, axis=1)[:, :5])
+            # Ties may be broken either way, the distances of the returned rows must match.
+            lookup = {row: column for column, row in enumerate(rows)}
+            np.testing.assert_allclose(np.take_along_axis(
+                distances, np.vectorize(lookup.get)(neighbours), axis=1), found)
+            nearest, _ = index.nearest(points, alliance=alliance)
+            np.testing.assert_allclose(nearest, distances.min(axis=1))
+
+    def test_radius(self, brute_force):
+        rng = np.random.RandomState(1)
+        units = make_units(rng, 200)
+        points = rng.uniform(0, 64, size=(50, 2))
+        index = make_index(units, brute_force)
+        for alliance in ALLIANCES + [None]:
+            rows, distances = brute_force_distances(units, points, alliance)
+            for radius in [0.0, 3.0, 10.0]:
+                inside = distances <= radius
+                np.testing.assert_array_equal(index.count_within(points, radius, alliance), inside.sum(axis=1))
+                for found, mask in zip(index.within_radius(points, radius, alliance), inside):
+                    assert sorted(found) == sorted(rows[mask])
+
+    def test_missing_neighbours(self, brute_force):
+        units = make_units(np.random.RandomState(2), 3)
+        units[:, features.FeatureUnit.alliance] = features.PlayerRelative.SELF
+        index = make_index(units, brute_force)
+        distances, neighbours = index.knn([[0, 0]], k=5, alliance=features.PlayerRelative.SELF)
+        assert np.isfinite(distances[0, :3]).all() and np.isinf(distances[0, 3:]).all()
+        assert list(neighbours[0, 3:]) == [-1, -1]
+        assert index.count_within([[0, 0]], 100, alliance=features.PlayerRelative.ENEMY)[0] == 0
+        assert len(index.within_radius([[0, 0]], 100, alliance=features.PlayerRelative.ENEMY)[0]) == 0
+
+
+class TestSpatialIndexCache:
+    def test_reuse_and_eviction(self):
+        rng = np.random.RandomState(3)
+        cache = SpatialIndexCache(maxsize=2)
+        first, second, third = (named_array.NamedDict(raw_units=make_units(rng, 4)) for _ in range(3))
+        index = get_spatial_index(first, cache=cache)
+        assert get_spatial_index(first, cache=cache) is index
+        get_spatial_index(second, cache=cache)
+        get_spatial_index(third, cache=cache)
+        assert get_spatial_index(first, cache=cache) is not index
+        cache.clear()
+        assert get_spatial_index(third, cache=cache) is not None
+
+    def test_observer_before_any_observation(self):
+        index = Observer().spatial_index
+        assert index.nearest([[0, 0]])[1][0] == -1
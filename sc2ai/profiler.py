@@ -0,0 +1,150 @@
+"""Named timers and counters for the hot paths of environments and training.
+
+Code is instrumented once with the process-wide :data:`profiler`::
+
+    with profiler.timer('env.sc2_step'):
+        timestep = sc2_env.step(actions)
+
+While the profiler is disabled, :meth:`Profiler.timer` returns a shared no-op context manager, so an
+instrumented block costs a method call and two empty calls. When enabled, every timer accumulates
+its count and total seconds, which training loops read and reset once per epoch with
+:meth:`Profiler.epoch_stats`. With tracing on, every timed block is also recorded as an event and
+can be exported in the Chrome trace-event format, viewable in ``chrome://tracing`` or Perfetto.
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('_profiler', '_name', '_start')
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.add_time(self._name, self._start, time.perf_counter())
+        return False
+
+
+class Profiler:
+    """Accumulates the time spent in named blocks of code, and optionally records a trace of them.
+
+    Args:
+        enabled (bool): whether timers measure anything.
+        trace (bool): whether every timed block is recorded as a trace event.
+        max_events (int): the number of trace events kept, older events are dropped first.
+    """
+
+    def __init__(self, enabled=False, trace=False, max_events=1000000):
+        self.enabled = enabled or trace
+        self.trace = trace
+        self.max_events = max_events
+        self._stats = {}
+        self._counts = {}
+        self._events = []
+        self._origin = time.perf_counter()
+
+    def enable(self, trace=False):
+        self.enabled = True
+        self.trace = self.trace or trace
+
+    def disable(self):
+        self.enabled = False
+        self.trace = False
+
+    def timer(self, name):
+        """Returns a context manager timing its block under ``name``."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        """Decorates a function to time every call under ``name``."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_time(self, name, start, end):
+        """Records a block timed with ``time.perf_counter``, from ``start`` to ``end``."""
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = [0, 0.0]
+        stats[0] += 1
+        stats[1] += end - start
+        if self.trace:
+            if len(self._events) >= self.max_events:
+                del self._events[:len(self._events) // 10 + 1]
+            self._events.append((name, start, end, threading.get_ident()))
+
+    def count(self, name, n=1):
+        """Increments a named counter, when the profiler is enabled."""
+        if self.enabled:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def stats(self):
+        """Returns a dict of the ``(count, total seconds)`` of every timer, and the value of every counter."""
+        result = {name: tuple(stats) for name, stats in self._stats.items()}
+        result.update(self._counts)
+        return result
+
+    def epoch_stats(self, names=None):
+        """Returns the total seconds of every timer and the value of every counter, and resets them.
+
+        Args:
+            names (list): the timers and counters to report, reported as 0 if they did not run, so every
+                epoch reports the same keys. All of them by default.
+        """
+        totals = {name: stats[1] for name, stats in self._stats.items()}
+        totals.update(self._counts)
+        self.reset()
+        if names is None:
+            return totals
+        return {name: totals.get(name, 0) for name in names}
+
+    def reset(self):
+        self._stats = {}
+        self._counts = {}
+
+    def export_trace(self, path, clear=True):
+        """Writes the recorded events as Chrome trace-event JSON.
+
+        Args:
+            path (str): the output file.
+            clear (bool): whether to drop the written events, so that every export holds new events only.
+        """
+        events, pid = list(self._events), os.getpid()
+        if clear:
+            del self._events[:len(events)]
+        trace_events = [dict(name=name, cat=name.split('.')[0], ph='X', pid=pid, tid=tid,
+                             ts=(start - self._origin) * 1e6, dur=(end - start) * 1e6)
+                        for name, start, end, tid in events]
+        with open(path, 'w') as f:
+            json.dump(dict(traceEvents=trace_events, displayTimeUnit='ms'), f)
+        return len(trace_events)
+
+
+profiler = Profiler()
+""" The process-wide profiler that library code is instrumented with. """
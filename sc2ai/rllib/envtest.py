@@ -5,9 +5,9 @@ from __future__ import division
 from __future__ import print_function
 
 import argparse
-import pickle
 
 import sc2ai.envs as sc2ai_env
+from sc2ai.data import TrajectoryWriter
 from absl import flags
 from sc2ai.spinup.utils.mpi_pytorch import num_procs, proc_id
 import numpy as np
@@ -33,7 +33,8 @@ def create_parser(parser_creator=None):
         "mapname", type=str, help="Name of the minimap.")
     #parser.add_argument(
     #    "out", type=str, help="Name of the minimap.")
-    parser.add_argument("--out", default=None, help="Output filename.")
+    parser.add_argument(
+        "--out", default=None, help="Output directory of the recorded trajectories.")
     parser.add_argument(
             "--no-render",
         default=False,
@@ -68,33 +69,35 @@ def envtest(mapname, num_steps, out=None, no_render=True, realtime=False, num_sk
     print(env.observation_gym_space)
     print("mpi proc : {}/{}".format(proc_id(), num_procs()))
     max_steps_per_episode = 10000
+    writer = TrajectoryWriter(out) if out is not None else None
     total_steps = 0
     while total_steps < (num_steps or total_steps + 1):
-        if out is not None:
-            rollout = []
         state = env.reset()
+        if writer is not None:
+            writer.begin_episode(state)
         done = False
         reward_total = 0.0
         steps = 0
         while not done and steps < max_steps_per_episode:
             # randomly sample an action
             actions = [env.sample_action()]
+            available_actions = env.action_set.available_actions
             next_state, reward, done, _ = env.step(actions)
             print("=>", actions, steps, reward, done)
             print(next_state['feature_screen'].shape)
             reward_total += reward
             if not no_render:
                 env.render()
-            if out is not None:
-                rollout.append([state, actions, next_state, reward, done])
+            if writer is not None:
+                writer.append(actions, reward, done, next_state, available_actions=available_actions)
             steps += 1
             total_steps += 1
             state = next_state
-        if out is not None:
-            rollout.append(rollout)
+        if writer is not None:
+            writer.end_episode()
         print("{} steps and episode reward {}".format(steps, reward_total))
-    if out is not None:
-        pickle.dump(rollout, open(out, "wb"))
+    if writer is not None:
+        writer.close()
 
 
 if __name__ == "__main__":
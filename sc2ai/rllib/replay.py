@@ -5,144 +5,59 @@ from __future__ import division
 from __future__ import print_function
 
 import argparse
-import json
-import os
-import pickle
 
-import gym
-import ray
-from ray.rllib.agents.registry import get_agent_class
+import numpy as np
+from sc2ai.data import TrajectoryDataset
 
 EXAMPLE_USAGE = """
-Example Usage via RLlib CLI:
-    run_ray rollout /tmp/ray/checkpoint_dir/checkpoint-0 --run DQN
-    --env CartPole-v0 --steps 1000000 --out rollouts.pkl
+Example Usage via run.py:
+    python3 run.py replay rollouts --episodes
 
 Example Usage via executable:
-    ./rollout.py /tmp/ray/checkpoint_dir/checkpoint-0 --run DQN
-    --env CartPole-v0 --steps 1000000 --out rollouts.pkl
+    ./replay.py rollouts --sample 64
 """
 
-# Note: if you use any custom models or envs, register them here first, e.g.:
-#
-# ModelCatalog.register_custom_model("pa_model", ParametricActionsModel)
-# register_env("pa_cartpole", lambda _: ParametricActionCartpole(10))
-
 
 def create_parser(parser_creator=None):
     parser_creator = parser_creator or argparse.ArgumentParser
     parser = parser_creator(
         formatter_class=argparse.RawDescriptionHelpFormatter,
-        description="Roll out a reinforcement learning agent "
-        "given a checkpoint.",
+        description="Summarize trajectories recorded by rollout or envtest.",
         epilog=EXAMPLE_USAGE)
 
     parser.add_argument(
-        "checkpoint", type=str, help="Checkpoint from which to roll out.")
-    required_named = parser.add_argument_group("required named arguments")
-    required_named.add_argument(
-        "--run",
-        type=str,
-        required=True,
-        help="The algorithm or model to train. This may refer to the name "
-        "of a built-on algorithm (e.g. RLLib's DQN or PPO), or a "
-        "user-defined trainable function or class registered in the "
-        "tune registry.")
-    required_named.add_argument(
-        "--env", type=str, help="The gym environment to use.")
+        "directory", type=str, help="Directory of the recorded trajectories.")
     parser.add_argument(
-        "--no-render",
+        "--episodes",
         default=False,
         action="store_const",
         const=True,
-        help="Surpress rendering of the environment.")
-    parser.add_argument(
-        "--steps", default=10000, help="Number of steps to roll out.")
-    parser.add_argument("--out", default=None, help="Output filename.")
+        help="Print the length and return of every episode.")
     parser.add_argument(
-        "--config",
-        default="{}",
-        type=json.loads,
-        help="Algorithm-specific configuration (e.g. env, hyperparams). "
-        "Surpresses loading of configuration from checkpoint.")
+        "--sample", default=0, type=int, help="Size of a minibatch to sample and describe.")
     return parser
 
 
 def run(args, parser):
-    config = args.config
-    if not config:
-        # Load configuration from file
-        config_dir = os.path.dirname(args.checkpoint)
-        config_path = os.path.join(config_dir, "params.json")
-        if not os.path.exists(config_path):
-            config_path = os.path.join(config_dir, "../params.json")
-        if not os.path.exists(config_path):
-            raise ValueError(
-                "Could not find params.json in either the checkpoint dir or "
-                "its parent directory.")
-        with open(config_path) as f:
-            config = json.load(f)
-        if "num_workers" in config:
-            config["num_workers"] = min(2, config["num_workers"])
-
-    if not args.env:
-        if not config.get("env"):
-            parser.error("the following arguments are required: --env")
-        args.env = config.get("env")
-
-    ray.init()
-
-    cls = get_agent_class(args.run)
-    agent = cls(env=args.env, config=config)
-    agent.restore(args.checkpoint)
-    num_steps = int(args.steps)
-    rollout(agent, args.env, num_steps, args.out, args.no_render)
-
-
-def rollout(agent, env_name, num_steps, out=None, no_render=True):
-    if hasattr(agent, "local_evaluator"):
-        env = agent.local_evaluator.env
-    else:
-        env = gym.make(env_name)
-
-    if hasattr(agent, "local_evaluator"):
-        state_init = agent.local_evaluator.policy_map[
-            "default"].get_initial_state()
-    else:
-        state_init = []
-    if state_init:
-        use_lstm = True
-    else:
-        use_lstm = False
-
-    if out is not None:
-        rollouts = []
-    steps = 0
-    while steps < (num_steps or steps + 1):
-        if out is not None:
-            rollout = []
-        state = env.reset()
-        done = False
-        reward_total = 0.0
-        while not done and steps < (num_steps or steps + 1):
-            if use_lstm:
-                action, state_init, logits = agent.compute_action(
-                    state, state=state_init)
-            else:
-                action = agent.compute_action(state)
-            next_state, reward, done, _ = env.step(action)
-            reward_total += reward
-            if not no_render:
-                env.render()
-            if out is not None:
-                rollout.append([state, action, next_state, reward, done])
-            steps += 1
-            state = next_state
-        if out is not None:
-            rollouts.append(rollout)
-        print("Episode reward", reward_total)
-    if out is not None:
-        pickle.dump(rollouts, open(out, "wb"))
+    replay(args.directory, args.episodes, args.sample)
+
+
+def replay(directory, episodes=False, sample=0):
+    dataset = TrajectoryDataset(directory)
+    lengths, returns = dataset.episode_lengths, dataset.reader.episode_returns
+    print("{} episodes, {} steps".format(len(lengths), len(dataset)))
+    if len(lengths) > 0:
+        print("episode length {:.1f} +- {:.1f}, return {:.2f} +- {:.2f}".format(
+            lengths.mean(), lengths.std(), returns.mean(), returns.std()))
+    for name, (shape, dtype) in dataset.columns.items():
+        print("  {:<32s} {} {}".format(name, shape, dtype))
+    if episodes:
+        for i, (length, episode_return) in enumerate(zip(lengths, returns)):
+            print("episode {}: {} steps, return {}".format(i, length, episode_return))
+    if sample > 0 and len(dataset) > 0:
+        batch = dataset.sample(sample)
+        for name, array in batch.items():
+            print("  sampled {:<24s} {} mean {:.3f}".format(name, array.shape, np.mean(array)))
 
 
 if __name__ == "__main__":
@@ -7,20 +7,20 @@ from __future__ import print_function
 import argparse
 import json
 import os
-import pickle
 
 import gym
 import ray
 from ray.rllib.agents.registry import get_agent_class
+from sc2ai.data import TrajectoryWriter
 
 EXAMPLE_USAGE = """
 Example Usage via RLlib CLI:
     run_ray rollout /tmp/ray/checkpoint_dir/checkpoint-0 --run DQN
-    --env CartPole-v0 --steps 1000000 --out rollouts.pkl
+    --env CartPole-v0 --steps 1000000 --out rollouts
 
 Example Usage via executable:
     ./rollout.py /tmp/ray/checkpoint_dir/checkpoint-0 --run DQN
-    --env CartPole-v0 --steps 1000000 --out rollouts.pkl
+    --env CartPole-v0 --steps 1000000 --out rollouts
 """
 
 # Note: if you use any custom models or envs, register them here first, e.g.:
@@ -58,7 +58,8 @@ def create_parser(parser_creator=None):
         help="Surpress rendering of the environment.")
     parser.add_argument(
         "--steps", default=10000, help="Number of steps to roll out.")
-    parser.add_argument("--out", default=None, help="Output filename.")
+    parser.add_argument(
+        "--out", default=None, help="Output directory of the recorded trajectories.")
     parser.add_argument(
         "--config",
         default="{}",
@@ -115,13 +116,12 @@ def rollout(agent, env_name, num_steps, out=None, no_render=True):
     else:
         use_lstm = False
 
-    if out is not None:
-        rollouts = []
+    writer = TrajectoryWriter(out) if out is not None else None
     steps = 0
     while steps < (num_steps or steps + 1):
-        if out is not None:
-            rollout = []
         state = env.reset()
+        if writer is not None:
+            writer.begin_episode(state)
         done = False
         reward_total = 0.0
         while not done and steps < (num_steps or steps + 1):
@@ -134,15 +134,15 @@ def rollout(agent, env_name, num_steps, out=None, no_render=True):
             reward_total += reward
             if not no_render:
                 env.render()
-            if out is not None:
-                rollout.append([state, action, next_state, reward, done])
+            if writer is not None:
+                writer.append(action, reward, done, next_state)
             steps += 1
             state = next_state
-        if out is not None:
-            rollouts.append(rollout)
+        if writer is not None:
+            writer.end_episode()
         print("Episode reward", reward_total)
-    if out is not None:
-        pickle.dump(rollouts, open(out, "wb"))
+    if writer is not None:
+        writer.close()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,23 @@
 """A script to train a Ray agent using the :py:mod:`sc2ai` environment.
 """
 import argparse
+import importlib
+import sys
 from absl import flags
-from sc2ai.rllib import train, rollout, worker, envtest
 
+# Subcommands are imported only when selected, so e.g. ``envtest`` does not pay for ray and TensorFlow.
+SUBCOMMANDS = {
+    "train": "sc2ai.rllib.train",
+    "worker": "sc2ai.rllib.worker",
+    "rollout": "sc2ai.rllib.rollout",
+    "envtest": "sc2ai.rllib.envtest",
+    "replay": "sc2ai.rllib.replay",
+    "generate": "sc2ai.data.generate",
+}
 
-def run():
+
+def run(args=None):
+    args = sys.argv[1:] if args is None else args
     parser = argparse.ArgumentParser(
         description="Train or Run an Starcraft II RLlib Agent.",
         formatter_class=argparse.RawDescriptionHelpFormatter)
@@ -14,24 +26,19 @@ def run():
 
     # see _SubParsersAction.add_parser in
     # https://github.com/python/cpython/blob/master/Lib/argparse.py
-    train_parser = train.create_parser(
-        lambda **kwargs: subcommand_group.add_parser("train", **kwargs))
-    worker_parser = worker.create_parser(
-        lambda **kwargs: subcommand_group.add_parser("worker", **kwargs))
-    rollout_parser = rollout.create_parser(
-        lambda **kwargs: subcommand_group.add_parser("rollout", **kwargs))
-    envtest_parser = envtest.create_parser(
-        lambda **kwargs: subcommand_group.add_parser("envtest", **kwargs))
-    options = parser.parse_args()
-
-    if options.command == "train":
-        train.run(options, train_parser)
-    if options.command == "worker":
-        worker.run(options, worker_parser)
-    elif options.command == "rollout":
-        rollout.run(options, rollout_parser)
-    elif options.command == "envtest":
-        envtest.run(options, envtest_parser)
+    command = next((arg for arg in args if not arg.startswith("-")), None)
+    module = subcommand_parser = None
+    for name, module_name in SUBCOMMANDS.items():
+        if name == command:
+            module = importlib.import_module(module_name)
+            subcommand_parser = module.create_parser(
+                lambda **kwargs: subcommand_group.add_parser(name, **kwargs))
+        else:
+            subcommand_group.add_parser(name, add_help=False)
+    options = parser.parse_args(args)
+
+    if module is not None:
+        module.run(options, subcommand_parser)
     else:
         parser.print_help()
 
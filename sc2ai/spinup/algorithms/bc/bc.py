@@ -0,0 +1,123 @@
+import numpy as np
+import torch
+from torch.distributions.categorical import Categorical
+from torch.optim import Adam
+import time
+import sc2ai.spinup.algorithms.ppo.core as core
+import sc2ai.spinup.algorithms.ppo.sc2_nets as sc2_nets
+from sc2ai.data import TrajectoryDataset, Prefetcher
+from sc2ai.envs import env_spaces
+from sc2ai.spinup.utils.logx import EpochLogger
+from sc2ai.spinup.utils.mpi_pytorch import setup_pytorch_for_mpi, sync_params, mpi_avg_grads
+from sc2ai.spinup.utils.mpi_tools import mpi_fork, proc_id, num_procs
+
+
+def bc(data_dir, map_name, actor_critic=sc2_nets.SC2AtariNetActorCritic, ac_kwargs=dict(), seed=0,
+       steps_per_epoch=1000, epochs=100, batch_size=64, lr=3e-4, ent_coeff=0.0, num_workers=2, prefetch_depth=4,
+       logger_kwargs=dict(), save_freq=10, device=torch.device("cpu")):
+    """Behaviour cloning of recorded trajectories, e.g. of a scripted agent, to pretrain an actor-critic.
+
+    The policy maximizes the log-likelihood of the recorded actions. When the trajectories include
+    the ``available_actions`` of every step, unavailable action types are masked out of the
+    action-type distribution. Minibatches are sampled from memory-mapped shards by background
+    workers, and the saved model can be loaded as the starting point of :func:`ppo`.
+
+    Args:
+        data_dir (str): a trajectory directory written by :class:`sc2ai.data.TrajectoryWriter`.
+        map_name (str): the map the trajectories were recorded on, which defines the spaces of the network.
+        steps_per_epoch (int): gradient steps per epoch.
+        batch_size (int): steps per minibatch and process.
+        ent_coeff (float): the weight of an entropy bonus.
+        num_workers (int): the number of threads sampling minibatches.
+        prefetch_depth (int): the number of minibatches sampled ahead.
+    """
+    setup_pytorch_for_mpi()
+
+    logger = EpochLogger(**logger_kwargs)
+    logger.save_config(locals())
+
+    seed += 10000 * proc_id()
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+
+    spaces = env_spaces(map_name)
+    obs_key = getattr(actor_critic, 'observation_key', 'feature_screen')
+    ac = actor_critic(spaces.observation_space, action_spec=spaces.action_spec, action_mask=spaces.action_mask,
+                      device=device, **ac_kwargs)
+    sync_params(ac)
+    logger.log('\nNumber of parameters: \t pi: %d, \t v: %d\n' % tuple(core.count_vars(m) for m in [ac.pi, ac.v]))
+
+    dataset = TrajectoryDataset(data_dir)
+    logger.log('Loaded %d steps of %d episodes from %s' % (len(dataset), len(dataset.episode_lengths), data_dir))
+    obs_column = 'obs.' + obs_key
+    masked = 'available_actions' in dataset.columns
+    prefetcher = Prefetcher(dataset, batch_size, num_workers=num_workers, depth=prefetch_depth, seed=seed,
+                            device=device)
+
+    def compute_loss(data):
+        obs = data[obs_column].to(torch.float32)
+        act = data['action'].reshape(len(obs), -1).long()
+        pis = ac.pi.distributions(obs)
+        if masked:
+            available = data['available_actions'].to(torch.bool)
+            pis[0] = Categorical(logits=pis[0].logits.masked_fill(~available, float('-inf')))
+        logp = ac.pi.log_prob_from_distributions(pis, act)
+        ent = sum((pi[0].entropy() + pi[1].entropy()) if isinstance(pi, tuple) else pi.entropy() for pi in pis)
+        accuracy = (pis[0].logits.argmax(-1) == act[:, 0]).to(torch.float32).mean()
+        return -logp.mean(), ent.mean(), accuracy
+
+    optimizer = Adam(ac.parameters(), lr=lr)
+    logger.setup_pytorch_saver(ac)
+
+    start_time = time.time()
+    try:
+        for epoch in range(epochs):
+            for _ in range(steps_per_epoch):
+                loss, ent, accuracy = compute_loss(prefetcher.next())
+                optimizer.zero_grad()
+                (loss - ent_coeff * ent).backward()
+                mpi_avg_grads(ac)
+                optimizer.step()
+                logger.store(LossBC=loss.item(), Entropy=ent.item(), ActAccuracy=accuracy.item())
+
+            if (epoch % save_freq == 0) or (epoch == epochs - 1):
+                logger.save_state({}, epoch)
+
+            logger.log_tabular('Epoch', epoch)
+            logger.log_tabular('LossBC', average_only=True)
+            logger.log_tabular('Entropy', average_only=True)
+            logger.log_tabular('ActAccuracy', average_only=True)
+            logger.log_tabular('TotalGradSteps', (epoch + 1) * steps_per_epoch)
+            logger.log_tabular('TotalSamples', (epoch + 1) * steps_per_epoch * batch_size * num_procs())
+            logger.log_tabular('Time', time.time() - start_time)
+            logger.dump_tabular()
+    finally:
+        prefetcher.close()
+        logger.close()
+    return ac
+
+
+if __name__ == '__main__':
+    import argparse
+    from absl import flags
+    flags.FLAGS.mark_as_parsed()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('data_dir', type=str)
+    parser.add_argument('--map-name', type=str, default='MoveToBeacon')
+    parser.add_argument('--seed', '-s', type=int, default=0)
+    parser.add_argument('--cpu', type=int, default=1)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--exp_name', type=str, default='bc_sc2')
+    args = parser.parse_args()
+
+    mpi_fork(args.cpu)  # run parallel code with mpi
+
+    from sc2ai.spinup.utils.run_utils import setup_logger_kwargs
+    logger_kwargs = setup_logger_kwargs(args.exp_name, args.seed)
+    device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+
+    bc(args.data_dir, args.map_name, seed=args.seed, steps_per_epoch=args.steps, epochs=args.epochs,
+       batch_size=args.batch_size, logger_kwargs=logger_kwargs, device=device)
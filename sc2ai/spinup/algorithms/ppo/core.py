@@ -44,6 +44,98 @@ def discount_cumsum(x, discount):
     return scipy.signal.lfilter([1], [1, float(-discount)], x[::-1], axis=0)[::-1]
 
 
+def discount_cumsum_segments(x, discount, ends):
+    """
+    discounted cumulative sums of vectors restarting after every segment end, in one pass.
+
+    input:
+        vector x,
+        [x0,
+         x1,
+         x2]
+        boolean vector ends, e.g. [True, False, True]. The last element always ends a segment.
+
+    output:
+        [x0,
+         x1 + discount * x2,
+         x2]
+
+    x and ends may also have a shape of (T, N), for N independent sequences along the first axis.
+    The sums over the whole sequences are computed with a single lfilter call, and the tail after
+    each segment end is subtracted: y_t = z_t - discount^(s + 1 - t) * z_(s + 1), where s is the
+    end of the segment containing t.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    ends = np.array(ends, dtype=bool)
+    ends[-1] = True
+    steps = np.arange(n).reshape((n,) + (1,) * (x.ndim - 1))
+    segment_end = np.minimum.accumulate(np.where(ends, steps, n)[::-1], axis=0)[::-1]
+    z = np.concatenate([discount_cumsum(x, discount), np.zeros((1,) + x.shape[1:])])
+    next_start = segment_end + 1
+    return z[:-1] - np.power(float(discount), next_start - steps) * np.take_along_axis(z, next_start, axis=0)
+
+
+def gae_numpy(rewards, values, terminals, truncations, bootstrap_values, gamma=0.99, lam=0.95):
+    """
+    GAE-Lambda advantages and rewards-to-go of (T,) or (T, N) arrays, with numpy.
+
+    Step t ends its episode if terminals[t] (zero-bootstrapped) or truncations[t] (bootstrapped
+    from bootstrap_values[t], the value of the next observation). The last step of every sequence
+    is always treated as an episode end.
+
+    Returns:
+        A tuple of the advantages and returns, both float64 arrays shaped like rewards.
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    terminals = np.asarray(terminals, dtype=bool)
+    ends = terminals | np.asarray(truncations, dtype=bool)
+    ends[-1] = True
+    bootstrap_values = np.where(terminals, 0.0, np.asarray(bootstrap_values, dtype=np.float64))
+    next_values = np.concatenate([values[1:], np.zeros_like(values[:1])])
+    next_values = np.where(ends, bootstrap_values, next_values)
+    deltas = rewards + gamma * next_values - values
+    advantages = discount_cumsum_segments(deltas, gamma * lam, ends)
+    returns = discount_cumsum_segments(rewards + gamma * np.where(ends, bootstrap_values, 0.0), gamma, ends)
+    return advantages, returns
+
+
+def gae_torch(rewards, values, terminals, truncations, bootstrap_values, gamma=0.99, lam=0.95):
+    """
+    GAE-Lambda advantages and rewards-to-go of (T,) or (T, N) tensors, with torch on their device.
+
+    Same semantics as gae_numpy. A single reverse loop over T computes both outputs, each step
+    vectorized over the N sequences.
+    """
+    terminals = terminals.bool()
+    ends = terminals | truncations.bool()
+    ends[-1] = True
+    not_ends = (~ends).to(values.dtype)
+    bootstrap_values = bootstrap_values.to(values.dtype).masked_fill(terminals, 0.0)
+    advantages = torch.empty_like(values)
+    returns = torch.empty_like(values)
+    next_value = torch.zeros_like(values[0])
+    next_advantage = torch.zeros_like(values[0])
+    next_return = torch.zeros_like(values[0])
+    for t in range(len(values) - 1, -1, -1):
+        next_value = torch.where(ends[t], bootstrap_values[t], next_value)
+        delta = rewards[t] + gamma * next_value - values[t]
+        next_advantage = delta + gamma * lam * not_ends[t] * next_advantage
+        next_return = rewards[t] + gamma * torch.where(ends[t], bootstrap_values[t], next_return)
+        advantages[t] = next_advantage
+        returns[t] = next_return
+        next_value = values[t]
+    return advantages, returns
+
+
+def compute_gae(rewards, values, terminals, truncations, bootstrap_values, gamma=0.99, lam=0.95):
+    """GAE-Lambda advantages and rewards-to-go, with torch for tensors and numpy otherwise."""
+    if isinstance(values, torch.Tensor):
+        return gae_torch(rewards, values, terminals, truncations, bootstrap_values, gamma, lam)
+    return gae_numpy(rewards, values, terminals, truncations, bootstrap_values, gamma, lam)
+
+
 class Actor(nn.Module):
 
     def _distribution(self, obs):
@@ -1,18 +1,34 @@
-import sys
 import numpy as np
 import torch
 from torch import Tensor
 from torch.optim import Adam
 import gym
+import os
+import os.path as osp
 import time
 import sc2ai.spinup.algorithms.ppo.core as core
 import sc2ai.spinup.algorithms.ppo.sc2_nets as sc2_nets
 from sc2ai.spinup.utils.logx import EpochLogger
 from sc2ai.spinup.utils.mpi_pytorch import setup_pytorch_for_mpi, sync_params, mpi_avg_grads
-from sc2ai.spinup.utils.mpi_tools import mpi_fork, mpi_avg, proc_id, mpi_statistics_scalar, num_procs
+from sc2ai.spinup.utils.mpi_tools import mpi_fork, mpi_avg, mpi_sum, proc_id, mpi_statistics_scalar, num_procs, \
+    broadcast_object
+from sc2ai.spinup.utils.normalization import ReturnNormalizer, ChannelNormalizer, sync_normalizers
+from sc2ai.spinup.utils.checkpoint import Checkpointer, rng_state, set_rng_state
+from sc2ai.spinup.utils.metrics import Progress
+from sc2ai.profiler import profiler
+
+# Timers reported every epoch when profiling, as Time/<name> in seconds per process.
+PROFILE_TIMERS = ('ppo.ac_step', 'ppo.env_step', 'env.transform_action', 'env.sc2_step', 'env.reward',
+                  'env.transform_observation', 'ppo.compute_advantages', 'ppo.forward', 'ppo.backward',
+                  'ppo.mpi_avg_grads', 'ppo.optimizer_step', 'ppo.checkpoint', 'checkpoint.write')
 
 
 class PPOBuffer:
+    """Stores transitions with their episode boundaries, and computes GAE advantages for all of them in get().
+
+    Every transition records whether it ended its episode as terminal, or as truncated (time limit,
+    epoch cutoff, crashed game) together with the value of the next observation to bootstrap from.
+    """
     def __init__(self, obs_dim, act_dim, size, gamma=0.99, lam=0.95, device=torch.device('cpu')):
         self.obs_buf = np.zeros(core.combined_shape(size, obs_dim), dtype=np.float32)
         self.act_buf = np.zeros(core.combined_shape(size, act_dim), dtype=np.float32)
@@ -21,45 +37,124 @@ class PPOBuffer:
         self.ret_buf = np.zeros(size, dtype=np.float32)
         self.val_buf = np.zeros(size, dtype=np.float32)
         self.logp_buf = np.zeros(size, dtype=np.float32)
+        self.term_buf = np.zeros(size, dtype=bool)
+        self.trunc_buf = np.zeros(size, dtype=bool)
+        self.boot_buf = np.zeros(size, dtype=np.float32)
         self.gamma, self.lam = gamma, lam
-        self.ptr, self.path_start_idx, self.max_size = 0, 0, size
+        self.ptr, self.max_size = 0, size
         self.device = device
 
-    def store(self, obs, act, rew, val, logp):
+    def store(self, obs, act, rew, val, logp, terminal=False, truncated=False, bootstrap_val=0):
         assert self.ptr < self.max_size
         self.obs_buf[self.ptr] = obs
         self.act_buf[self.ptr] = act
-        self.rew_buf[self.ptr] = rew
-        self.val_buf[self.ptr] = val
-        self.logp_buf[self.ptr] = logp
+        # Values of a single step may come as arrays of size 1, e.g. from ac.step on a batch of one.
+        self.rew_buf[self.ptr] = np.asarray(rew).item()
+        self.val_buf[self.ptr] = np.asarray(val).item()
+        self.logp_buf[self.ptr] = np.asarray(logp).item()
+        self.term_buf[self.ptr] = terminal
+        self.trunc_buf[self.ptr] = truncated and not terminal
+        self.boot_buf[self.ptr] = np.asarray(bootstrap_val).item() if truncated and not terminal else 0
         self.ptr += 1
 
+    def state_dict(self):
+        """The stored transitions, to resume an epoch from a checkpoint."""
+        state = {k: v for k, v in vars(self).items() if k.endswith('_buf')}
+        state['ptr'] = self.ptr
+        return state
+
+    def load_state_dict(self, state_dict):
+        for k, v in state_dict.items():
+            if k == 'ptr':
+                self.ptr = v
+            else:
+                getattr(self, k)[...] = v
+
     def finish_path(self, last_val=0):
-        path_slice = slice(self.path_start_idx, self.ptr)
-        rews = np.append(self.rew_buf[path_slice], last_val)
-        vals = np.append(self.val_buf[path_slice], last_val)
-        deltas = rews[:-1] + self.gamma * vals[1:] - vals[:-1]
-        self.adv_buf[path_slice] = core.discount_cumsum(deltas, self.gamma * self.lam)
-        self.ret_buf[path_slice] = core.discount_cumsum(rews, self.gamma)[:-1]
-        self.path_start_idx = self.ptr
+        """Ends the episode of the last stored transition, bootstrapping from last_val (0 for terminal states)."""
+        self.trunc_buf[self.ptr - 1] = True
+        self.boot_buf[self.ptr - 1] = last_val
+
+    def compute_advantages(self):
+        """Computes GAE-Lambda advantages and rewards-to-go over the whole buffer in one backward pass."""
+        self.adv_buf[:], self.ret_buf[:] = core.gae_numpy(self.rew_buf, self.val_buf, self.term_buf, self.trunc_buf,
+                                                          self.boot_buf, self.gamma, self.lam)
 
     def get(self):
         assert self.ptr == self.max_size
-        self.ptr, self.path_start_idx = 0, 0
+        if not (self.term_buf[-1] or self.trunc_buf[-1]):
+            print('Warning: the last transition has no bootstrap value, treating it as terminal.', flush=True)
+        self.compute_advantages()
+        self.ptr = 0
+        self.term_buf[:] = False
+        self.trunc_buf[:] = False
+        self.boot_buf[:] = 0
         adv_mean, adv_std = mpi_statistics_scalar(self.adv_buf)
         self.adv_buf = (self.adv_buf - adv_mean) / adv_std
         data = dict(obs=self.obs_buf, act=self.act_buf, ret=self.ret_buf, adv=self.adv_buf, logp=self.logp_buf)
         return {k: torch.as_tensor(v, device=self.device, dtype=torch.float32) for k, v in data.items()}
 
 
+class RecurrentPPOBuffer(PPOBuffer):
+    """A PPOBuffer returning fixed-length sequence chunks, with the recurrent state at the start of every chunk.
+
+    The buffer is split into chunks of chunk_len steps, trained with the loss on exactly those steps.
+    Each chunk is read as a window of chunk_len + burn_in steps ending at the chunk's end (shifted to
+    stay inside the buffer), so the first burn_in steps only warm up the recurrent state. Recurrent
+    states are only stored at the window starts.
+    """
+    def __init__(self, obs_dim, act_dim, size, state_size, chunk_len=32, burn_in=0, gamma=0.99, lam=0.95,
+                 device=torch.device('cpu')):
+        super().__init__(obs_dim, act_dim, size, gamma, lam, device)
+        self.chunk_len, self.burn_in = chunk_len, burn_in
+        window = chunk_len + burn_in
+        assert size >= window, "The buffer must hold at least one chunk and its burn-in."
+        chunk_starts = np.arange(0, size, chunk_len)
+        window_starts = np.clip(chunk_starts - burn_in, 0, size - window)
+        self.window_indices = window_starts[:, np.newaxis] + np.arange(window)
+        # Steps of a window whose loss is computed, i.e. the steps of its own chunk.
+        chunk_steps = np.arange(window) + window_starts[:, np.newaxis] - chunk_starts[:, np.newaxis]
+        self.loss_mask = ((chunk_steps >= 0) & (chunk_steps < chunk_len)).astype(np.float32)
+        unique_starts, self.window_state_index = np.unique(window_starts, return_inverse=True)
+        self.state_slot = np.full(size, -1, dtype=np.int64)
+        self.state_slot[unique_starts] = np.arange(len(unique_starts))
+        self.h_buf = np.zeros((len(unique_starts), state_size), dtype=np.float32)
+        self.c_buf = np.zeros((len(unique_starts), state_size), dtype=np.float32)
+        self.start_buf = np.zeros(size, dtype=bool)
+
+    def store(self, obs, act, rew, val, logp, terminal=False, truncated=False, bootstrap_val=0, state=None,
+              start=False):
+        slot = self.state_slot[self.ptr]
+        if slot >= 0:
+            self.h_buf[slot] = state[0].reshape(-1).cpu().numpy()
+            self.c_buf[slot] = state[1].reshape(-1).cpu().numpy()
+        self.start_buf[self.ptr] = start
+        super().store(obs, act, rew, val, logp, terminal, truncated, bootstrap_val)
+
+    def get(self):
+        data = super().get()
+        index = torch.as_tensor(self.window_indices, device=self.device)
+        data = {k: v[index] for k, v in data.items()}
+        data['start'] = torch.as_tensor(self.start_buf[self.window_indices], device=self.device)
+        data['mask'] = torch.as_tensor(self.loss_mask, device=self.device)
+        data['h'] = torch.as_tensor(self.h_buf[self.window_state_index], device=self.device).unsqueeze(0)
+        data['c'] = torch.as_tensor(self.c_buf[self.window_state_index], device=self.device).unsqueeze(0)
+        self.start_buf[:] = False
+        return data
+
+
 def ppo(env_fn, actor_critic=sc2_nets.SC2AtariNetActorCritic, ac_kwargs=dict(), seed=0, steps_per_epoch=10000,
         epochs=1000000, gamma=0.99, clip_ratio=0.2, lr=3e-4, vf_coeff=0.5, ent_coeff=0.01, train_iters=10, lam=0.97,
-        max_ep_len=1000, target_kl=0.03, batch_size=64, logger_kwargs=dict(), save_freq=100, device=torch.device("cpu")):
+        max_ep_len=1000, target_kl=0.03, batch_size=64, logger_kwargs=dict(), save_freq=100, device=torch.device("cpu"),
+        normalize_returns=False, normalize_channels=None, chunk_len=32, burn_in=0,
+        resume=False, keep_last=3, keep_best=3, progress_interval=10.0, profile=False, trace=False):
     setup_pytorch_for_mpi()
+    if profile or trace:
+        profiler.enable(trace=trace)
 
     print("device - ", device)
 
-    logger = EpochLogger(**logger_kwargs)
+    logger = EpochLogger(resume=resume, **logger_kwargs)
     logger.save_config(locals())
 
     seed += 10000 * proc_id()
@@ -68,12 +163,21 @@ def ppo(env_fn, actor_critic=sc2_nets.SC2AtariNetActorCritic, ac_kwargs=dict(),
 
     env = env_fn()
     # Later change this ---- This depends on the environment and the network structure
+    obs_key = getattr(actor_critic, 'observation_key', 'feature_screen')
     obs_space = env.observation_gym_space
-    obs_dim = obs_space['feature_screen'].shape
+    obs_dim = obs_space[obs_key].shape
     act_dim = env.action_gym_space.nvec.shape
     # ----------------------
     print("obs_dim, act_dim = ", obs_dim, act_dim)
 
+    # Statistics are synchronized across ranks once per epoch, and saved with the state.
+    ret_norm = ReturnNormalizer(gamma) if normalize_returns else None
+    obs_norm = ChannelNormalizer(obs_dim[0], normalize_channels) if normalize_channels else None
+    # Normalized step and bootstrap observations are written to their own reused buffers, as the
+    # bootstrap observation is normalized before the step observation is stored.
+    if obs_norm is not None:
+        norm_obs, norm_last_obs = np.zeros(obs_dim, dtype=np.float32), np.zeros(obs_dim, dtype=np.float32)
+
     action_spec, action_mask = env.action_set.get_action_spec_and_action_mask()
     ac = actor_critic(env.observation_gym_space,
                       action_spec=action_spec, action_mask=action_mask, device=device, **ac_kwargs)
@@ -84,7 +188,14 @@ def ppo(env_fn, actor_critic=sc2_nets.SC2AtariNetActorCritic, ac_kwargs=dict(),
     logger.log('\nNumber of parameters: \t pi: %d, \t v: %d\n' % var_counts)
 
     local_steps_per_epoch = int(steps_per_epoch / num_procs())
-    buf = PPOBuffer(obs_dim, act_dim, local_steps_per_epoch, gamma, lam, device)
+    # Recurrent actor-critics train on chunks of chunk_len steps, batched to about batch_size steps.
+    recurrent = getattr(ac, 'recurrent', False)
+    if recurrent:
+        buf = RecurrentPPOBuffer(obs_dim, act_dim, local_steps_per_epoch, ac.state_size, chunk_len, burn_in,
+                                 gamma, lam, device)
+        batch_size = max(1, batch_size // chunk_len)
+    else:
+        buf = PPOBuffer(obs_dim, act_dim, local_steps_per_epoch, gamma, lam, device)
 
     def compute_loss_pi(data, start, end):
         obs, act, adv, logp_old = data['obs'][start:end], data['act'][start:end], \
@@ -112,41 +223,92 @@ def ppo(env_fn, actor_critic=sc2_nets.SC2AtariNetActorCritic, ac_kwargs=dict(),
         obs, ret = data['obs'][start:end], data['ret'][start:end]
         return ((ac.v(obs) - ret) ** 2).mean()
 
+    def compute_loss_recurrent(data, start, end):
+        """The policy and value losses of chunks start:end, both computed from one pass over the sequences."""
+        state = (data['h'][:, start:end], data['c'][:, start:end])
+        pis, logp, v = ac.evaluate(data['obs'][start:end], data['act'][start:end], state, data['start'][start:end])
+        adv, logp_old = data['adv'][start:end].reshape(-1), data['logp'][start:end].reshape(-1)
+        ret, mask = data['ret'][start:end].reshape(-1), data['mask'][start:end].reshape(-1)
+        count = mask.sum()
+
+        ratio = torch.exp(logp - logp_old)
+        clip_adv = torch.clamp(ratio, 1 - clip_ratio, 1 + clip_ratio) * adv
+        loss_pi = -(torch.min(ratio * adv, clip_adv) * mask).sum() / count
+        ent = 0
+        for pi in pis:
+            if isinstance(pi, tuple):
+                ent += ((pi[0].entropy() + pi[1].entropy()) * mask).sum() / count
+            else:
+                ent += (pi.entropy() * mask).sum() / count
+        approx_kl = ((logp_old - logp) * mask).sum().item() / count.item()
+        clipped = ratio.gt(1 + clip_ratio) | ratio.lt(1 - clip_ratio)
+        clipfrac = (clipped.to(torch.float32) * mask).sum().item() / count.item()
+        loss_v = (((v - ret) ** 2) * mask).sum() / count
+        return loss_pi, ent, dict(kl=approx_kl, ent=ent.item(), cf=clipfrac), loss_v
+
+    def compute_losses(data, start, end):
+        if recurrent:
+            return compute_loss_recurrent(data, start, end)
+        loss_pi, ent, pi_info = compute_loss_pi(data, start, end)
+        return loss_pi, ent, pi_info, compute_loss_v(data, start, end)
+
     optimizer = Adam(ac.parameters(), lr=lr)
     logger.setup_pytorch_saver(ac)
 
+    # Checkpoints are taken after collecting an epoch, so a resumed run starts with that epoch's update.
+    # Only rank 0 creates a default log directory, so the other ranks take its path.
+    output_dir = broadcast_object(logger_kwargs.get('output_dir') or logger.output_dir)
+    checkpointer = Checkpointer(output_dir, keep_last, keep_best)
+    start_epoch, resumed_epoch = 0, None
+    checkpoint = checkpointer.load(map_location=device) if resume else None
+    if checkpoint is not None:
+        ac.load_state_dict(checkpoint['ac'])
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        for name, normalizer in (('returns', ret_norm), ('observations', obs_norm)):
+            if normalizer is not None and name in checkpoint['normalization']:
+                normalizer.load_state_dict(checkpoint['normalization'][name])
+        set_rng_state(checkpoint['rng'])
+        buf.load_state_dict(checkpoint['buffer'])
+        logger.epoch_dict.update(checkpoint['logger'])
+        logger.rewind(checkpoint.get('row_index', checkpoint['epoch']))
+        start_epoch = resumed_epoch = checkpoint['epoch']
+        logger.log('Resumed from the checkpoint of epoch %d' % resumed_epoch)
+
     def update():
-        data = buf.get()
+        with profiler.timer('ppo.compute_advantages'):
+            data = buf.get()
 
-        pi_l_old, ent_old, pi_info_old = compute_loss_pi(data, 0, len(data['obs']))
+        with torch.no_grad():
+            pi_l_old, ent_old, pi_info_old, v_l_old = compute_losses(data, 0, len(data['obs']))
         pi_l_old = pi_l_old.item()
         ent_old = ent_old.item()
-        v_l_old = compute_loss_v(data, 0, len(data['obs'])).item()
+        v_l_old = v_l_old.item()
 
         # Change this part to combined batch training
 
+        data_length = len(data['obs'])
+        update_progress.reset(train_iters * (data_length // batch_size))
         for i in range(train_iters):
             # do mini batch training instead of full batch
-            print("training pi and v ...")
-            sys.stdout.flush()
-            data_length = len(data['obs'])
             for j in range(data_length // batch_size):
-                print("doing batch {}".format(j))
-                sys.stdout.flush()
+                update_progress.update()
                 start = batch_size * j
                 end = batch_size * (j + 1)
                 if end > data_length:
                     end = data_length
                 optimizer.zero_grad()
-                loss_pi, entropy, pi_info = compute_loss_pi(data, start, end)
-                loss_v = compute_loss_v(data, start, end)
+                with profiler.timer('ppo.forward'):
+                    loss_pi, entropy, pi_info, loss_v = compute_losses(data, start, end)
                 #kl = mpi_avg(pi_info['kl'])
                 #if kl > 1.5 * target_kl:
                 #    logger.log('Early stopping at step %d due to reaching max kl.' % i)
                 #    break
-                (loss_pi + vf_coeff * loss_v - ent_coeff * entropy).backward()
-                mpi_avg_grads(ac)
-                optimizer.step()
+                with profiler.timer('ppo.backward'):
+                    (loss_pi + vf_coeff * loss_v - ent_coeff * entropy).backward()
+                with profiler.timer('ppo.mpi_avg_grads'):
+                    mpi_avg_grads(ac)
+                with profiler.timer('ppo.optimizer_step'):
+                    optimizer.step()
 
         logger.store(StopIter=i)
         kl, ent, cf = pi_info['kl'], pi_info_old['ent'], pi_info['cf']
@@ -155,11 +317,22 @@ def ppo(env_fn, actor_critic=sc2_nets.SC2AtariNetActorCritic, ac_kwargs=dict(),
 
     start_time = time.time()
     o, ep_ret, ep_len = env.reset(), 0, 0
-
-    for epoch in range(epochs):
-        for t in range(local_steps_per_epoch):
-            o = o['feature_screen']
-            a, v, logp = ac.step(torch.as_tensor(o, dtype=torch.float32).to(device).unsqueeze(0))
+    state, ep_start = (ac.initial_state(), True) if recurrent else (None, False)
+
+    collect_progress = Progress('Collecting', interval=progress_interval, enabled=proc_id() == 0)
+    update_progress = Progress('Updating', interval=progress_interval, enabled=proc_id() == 0)
+    for epoch in range(start_epoch, epochs):
+        collect_progress.reset(local_steps_per_epoch)
+        for t in range(0 if epoch == resumed_epoch else local_steps_per_epoch):
+            o = o[obs_key]
+            if obs_norm is not None:
+                o = obs_norm(o, out=norm_obs)
+            with profiler.timer('ppo.ac_step'):
+                if recurrent:
+                    a, v, logp, next_state = ac.step(torch.as_tensor(o, dtype=torch.float32).to(device).unsqueeze(0),
+                                                     state)
+                else:
+                    a, v, logp = ac.step(torch.as_tensor(o, dtype=torch.float32).to(device).unsqueeze(0))
 
             #print("a v logp -- ", a, v, logp)
             #print(o.shape)
@@ -169,46 +342,65 @@ def ppo(env_fn, actor_critic=sc2_nets.SC2AtariNetActorCritic, ac_kwargs=dict(),
             #        print("{:3.1f} ".format((o[3, i, j])), end='')
             #    print()
 
-            print(".", end='')
-            sys.stdout.flush()
+            collect_progress.update()
 
-            next_o, r, d, _ = env.step(a)
+            with profiler.timer('ppo.env_step'):
+                next_o, r, d, info = env.step(a)
             ep_ret += r
             ep_len += 1
 
             #print(a, r, v, logp)
 
-            buf.store(o, a, r, v, logp)
+            # Only terminal states are zero-bootstrapped, truncated episodes bootstrap from the next value.
+            env_truncated = d and info.get('truncated', False)
+            terminal = d and not env_truncated
+            timeout = ep_len == max_ep_len
+            epoch_ended = t == local_steps_per_epoch - 1
+            truncated = not terminal and (env_truncated or timeout or epoch_ended)
+            last_v = 0
+            if truncated:
+                last_o = next_o[obs_key]
+                if obs_norm is not None:
+                    last_o = obs_norm(last_o, update=False, out=norm_last_obs)
+                last_o = torch.as_tensor(last_o, dtype=torch.float32).to(device).unsqueeze(0)
+                last_v = ac.step(last_o, next_state)[1] if recurrent else ac.step(last_o)[1]
+
+            buf_r = r if ret_norm is None else ret_norm(r, terminal or truncated)
+            if recurrent:
+                buf.store(o, a, buf_r, v, logp, terminal=terminal, truncated=truncated, bootstrap_val=last_v,
+                          state=state, start=ep_start)
+                state, ep_start = next_state, False
+            else:
+                buf.store(o, a, buf_r, v, logp, terminal=terminal, truncated=truncated, bootstrap_val=last_v)
             logger.store(VVals=v)
 
             o = next_o
 
-            timeout = ep_len == max_ep_len
-            terminal = d or timeout
-            epoch_ended = t == local_steps_per_epoch - 1
-
-            if terminal or epoch_ended:
-                print("episode ended {}".format(t))
-                if epoch_ended and not terminal:
+            if terminal or truncated:
+                if epoch_ended and not (d or timeout):
                     print('Warning: trajectory cut off by epoch at %d steps.' % ep_len, flush=True)
-                if timeout or epoch_ended:
-                    o = o['feature_screen']
-                    _, v, _ = ac.step(torch.as_tensor(o, dtype=torch.float32).to(device).unsqueeze(0))
-                else:
-                    v = 0
-                buf.finish_path(v)
-                if terminal:
+                if d or timeout:
                     logger.store(EpRet=ep_ret, EpLen=ep_len)
                 o, ep_ret, ep_len = env.reset(), 0, 0
+                if recurrent:
+                    state, ep_start = ac.initial_state(), True
+
+        normalizers = {name: normalizer for name, normalizer in (('returns', ret_norm), ('observations', obs_norm))
+                       if normalizer is not None}
+        sync_normalizers(list(normalizers.values()))
+        normalization = {name: normalizer.state_dict() for name, normalizer in normalizers.items()}
+
+        if epoch != resumed_epoch and ((epoch % save_freq == 0) or (epoch == epochs - 1)):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ep_ret_mean = mpi_statistics_scalar(logger.epoch_dict.get('EpRet', []))[0]
+            with profiler.timer('ppo.checkpoint'):
+                checkpointer.save(epoch, shared=dict(ac=ac, optimizer=optimizer, normalization=normalization,
+                                                     row_index=logger.row_index),
+                                  local=dict(rng=rng_state(), buffer=buf.state_dict(), logger=logger.epoch_dict),
+                                  metric=ep_ret_mean)
+                checkpointer.save_model(ac, epoch)
 
-        if (epoch % save_freq == 0) or (epoch == epochs - 1):
-            logger.save_state({'env': env}, epoch)
-
-        print("update started....")
-        sys.stdout.flush()
         update()
-        print("update ended....")
-        sys.stdout.flush()
 
         logger.log_tabular('Epoch', epoch)
         logger.log_tabular('EpRet', with_min_and_max=True)
@@ -224,7 +416,22 @@ def ppo(env_fn, actor_critic=sc2_nets.SC2AtariNetActorCritic, ac_kwargs=dict(),
         logger.log_tabular('ClipFrac', average_only=True)
         logger.log_tabular('StopIter', average_only=True)
         logger.log_tabular('Time', time.time()-start_time)
+        if hasattr(env, 'metrics'):
+            # Failures of the game since the start, summed over processes, e.g. of a SupervisedSC2Env.
+            env_metrics = env.metrics
+            for key in sorted(env_metrics):
+                logger.log_tabular('SC2' + key.capitalize(), mpi_sum(env_metrics[key]))
+        if profiler.enabled:
+            for name, seconds in profiler.epoch_stats(PROFILE_TIMERS).items():
+                logger.store(**{'Time/' + name: seconds})
+                logger.log_tabular('Time/' + name, average_only=True)
+        if profiler.trace:
+            trace_dir = osp.join(output_dir, 'traces')
+            os.makedirs(trace_dir, exist_ok=True)
+            profiler.export_trace(osp.join(trace_dir, 'epoch%d_rank%d.json' % (epoch, proc_id())))
         logger.dump_tabular()
+    checkpointer.close()
+    logger.close()
 
 
 if __name__ == '__main__':
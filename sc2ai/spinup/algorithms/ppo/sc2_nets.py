@@ -38,6 +38,10 @@ class SC2Actor(nn.Module):
             else:
                 raise Exception("Such ActionVectorType is not defined.")
         print("action register-----------------------------")
+        # logit_nets is a plain list, so the heads are registered here to be trained and saved.
+        self._logit_modules = nn.ModuleList([net for nets in self.logit_nets
+                                             for net in (nets if isinstance(nets, tuple) else (nets,))])
+        self._action_mask_tensor = torch.as_tensor(np.asarray(action_mask), device=device, dtype=torch.int32)
 
     def distributions(self, obs):
         distributions = []
@@ -55,10 +59,7 @@ class SC2Actor(nn.Module):
 
     def log_prob_from_distributions(self, pis, acts):
         log_probs = list()
-        masks = list()
-        for i, act in enumerate(acts):
-            masks.append(self._action_mask[int(act[0].item())])
-        masks = torch.tensor(masks, device=self.device, dtype=torch.int32)
+        masks = self._action_mask_tensor[acts[:, 0].long()]
 
         for i, distribution in enumerate(pis):
             action_tuple = self._action_spec[i]
@@ -80,12 +81,8 @@ class SC2Actor(nn.Module):
                 a_vector.append(distribution[0].sample() * xy_size + distribution[1].sample())
             else:
                 a_vector.append(distribution.sample())
-        act_id = a_vector[0].item()
-        #print(self._action_mask)
-        #print(torch.stack(a_vector, 1),
-        #      torch.tensor(self._action_mask[act_id], device=self.device, dtype=torch.int32).unsqueeze(0))
-        return torch.mul(torch.stack(a_vector, 1),
-                         torch.tensor(self._action_mask[act_id], device=self.device, dtype=torch.int32).unsqueeze(0))
+        # Arguments the sampled action types do not take are zeroed, for every row of the batch.
+        return torch.mul(torch.stack(a_vector, 1), self._action_mask_tensor[a_vector[0].long()])
 
     def forward(self, obs, act=None):
         pis = self.distributions(obs)
@@ -106,6 +103,8 @@ class SC2Critic(nn.Module):
 
 
 class SC2AtariNetActorCritic(nn.Module):
+    observation_key = 'feature_screen'
+
     def __init__(self, observation_space, action_spec=None, action_mask=None, hidden_units=256, activation=nn.ReLU,
                  device=torch.device('cpu')):
         super().__init__()
@@ -146,6 +145,72 @@ class SC2AtariNetActorCritic(nn.Module):
         return self.step(obs)[0]
 
 
+class SC2EntityEncoder(nn.Module):
+    """Encodes a fixed-size unit list into a single feature vector.
+
+    The input is the stacked output of :class:`sc2ai.envs.observations.UnitListCategory`, whose
+    last column is the validity mask. Every unit is embedded by a shared MLP, optionally mixed by
+    a transformer encoder, and pooled with a masked mean and max (DeepSets).
+
+    Args:
+        num_fields (int): number of unit fields, excluding the mask column.
+        hidden_units (int): size of the output feature vector.
+        embed_units (int): size of the per-unit embedding.
+        encoder (str): either ``deepsets`` or ``transformer``.
+        num_heads (int): number of attention heads of the transformer encoder.
+        num_layers (int): number of transformer encoder layers.
+        activation: activation module class.
+    """
+    def __init__(self, num_fields, hidden_units, embed_units=64, encoder='deepsets', num_heads=4, num_layers=2,
+                 activation=nn.ReLU):
+        super().__init__()
+        self.embed = mlp([num_fields, embed_units, embed_units], activation, activation)
+        if encoder == 'transformer':
+            layer = nn.TransformerEncoderLayer(embed_units, num_heads, dim_feedforward=2 * embed_units, dropout=0.0)
+            self.transformer = nn.TransformerEncoder(layer, num_layers)
+        elif encoder == 'deepsets':
+            self.transformer = None
+        else:
+            raise Exception("Such entity encoder is not defined.")
+        self.output = nn.Sequential(nn.Linear(2 * embed_units, hidden_units), activation())
+
+    def forward(self, obs):
+        units, valid = obs[..., :-1], obs[..., -1] > 0.5
+        x = self.embed(units)
+        has_units = valid.any(1)
+        if self.transformer is not None:
+            padding = ~valid
+            # A fully padded row makes attention return NaNs, so the (zero-filled) first slot is kept visible.
+            padding[:, 0] &= has_units
+            x = self.transformer(x.transpose(0, 1), src_key_padding_mask=padding).transpose(0, 1)
+        mask = valid.unsqueeze(-1).to(x.dtype)
+        mean = (x * mask).sum(1) / mask.sum(1).clamp(min=1.0)
+        peak = x.masked_fill(~valid.unsqueeze(-1), float('-inf')).max(1)[0]
+        peak = torch.where(has_units.unsqueeze(-1), peak, torch.zeros_like(peak))
+        return self.output(torch.cat([mean, peak], -1))
+
+
+class SC2EntityActorCritic(SC2AtariNetActorCritic):
+    """An actor-critic whose trunk reads the unit list instead of the feature screen.
+
+    Expects the observation set to contain a stacked
+    :class:`sc2ai.envs.observations.UnitListCategory` named ``raw_units``.
+    """
+    observation_key = 'raw_units'
+
+    def __init__(self, observation_space, action_spec=None, action_mask=None, hidden_units=256, activation=nn.ReLU,
+                 device=torch.device('cpu'), encoder='deepsets', embed_units=64, num_heads=4, num_layers=2):
+        self._encoder_kwargs = dict(embed_units=embed_units, encoder=encoder, num_heads=num_heads,
+                                    num_layers=num_layers)
+        super().__init__(observation_space, action_spec=action_spec, action_mask=action_mask,
+                         hidden_units=hidden_units, activation=activation, device=device)
+
+    def _build_sequential_layers(self, observation_space, hidden_units, activation, device):
+        num_fields = observation_space[self.observation_key].shape[-1] - 1
+        self.encoder = SC2EntityEncoder(num_fields, hidden_units, activation=activation, **self._encoder_kwargs)
+        return self.encoder.to(device)
+
+
 class SC2FullyConvActor(nn.Module):
     def __init__(self, previous_modules, hidden_units, action_spec, device):
         super().__init__()
@@ -179,4 +244,74 @@ class SC2FullyConvActorCritic(SC2AtariNetActorCritic):
     def _build_sequential_layers(self, hidden_units, activation, device):
         pass
 
-# class SC2FullyConvLSTMActorCritic(nn.Module):
+class SC2LSTMActorCritic(SC2AtariNetActorCritic):
+    """A recurrent actor-critic: the Atari-net trunk feeds an LSTM, whose output feeds the policy and value heads.
+
+    Sequences are trained as ``(N, W)`` chunks. The trunk encodes all ``N * W`` frames in one batch and
+    the LSTM runs over the chunk in as few calls as possible, splitting it only at the time steps
+    where some episode restarts and zeroing the state of those rows.
+    """
+    recurrent = True
+
+    def __init__(self, observation_space, action_spec=None, action_mask=None, hidden_units=256, activation=nn.ReLU,
+                 device=torch.device('cpu'), lstm_units=256):
+        self.state_size = lstm_units
+        super().__init__(observation_space, action_spec=action_spec, action_mask=action_mask,
+                         hidden_units=hidden_units, activation=activation, device=device)
+
+    def _build_policy(self, convs_sequence, hidden_units, action_spec, action_mask):
+        self.encoder = convs_sequence
+        self.lstm = nn.LSTM(hidden_units, self.state_size).to(self.device)
+        self.pi = SC2Actor(nn.Identity(), self.state_size, action_spec, action_mask, self.device)
+        self.pi.to(device=self.device)
+
+    def _build_critic(self, convs_sequence, hidden_units):
+        self.v = SC2Critic(nn.Identity(), self.state_size, self.device)
+        self.v.to(device=self.device)
+
+    def initial_state(self, batch_size=1):
+        zeros = torch.zeros(1, batch_size, self.state_size, device=self.device)
+        return zeros, zeros.clone()
+
+    def features(self, obs, state, starts):
+        """Runs the trunk and the LSTM over chunks of observations.
+
+        Args:
+            obs: a tensor of shape ``(N, W, ...)``.
+            state: the ``(h, c)`` LSTM state before the first step, each of shape ``(1, N, state_size)``.
+            starts: a boolean tensor of shape ``(N, W)``, true where an episode starts and the state is reset.
+
+        Returns:
+            The features of shape ``(N * W, state_size)`` and the state after the last step.
+        """
+        n, w = obs.shape[:2]
+        x = self.encoder(obs.reshape(n * w, *obs.shape[2:])).reshape(n, w, -1).transpose(0, 1)
+        h, c = state
+        reset_steps = torch.nonzero(starts.any(0)).flatten().tolist()
+        boundaries = sorted(set([0] + reset_steps))
+        outputs = []
+        for begin, end in zip(boundaries, boundaries[1:] + [w]):
+            keep = (~starts[:, begin]).to(x.dtype).view(1, n, 1)
+            output, (h, c) = self.lstm(x[begin:end], (h * keep, c * keep))
+            outputs.append(output)
+        return torch.cat(outputs).transpose(0, 1).reshape(n * w, -1), (h, c)
+
+    def evaluate(self, obs, act, state, starts):
+        """Returns the distributions, log probabilities of act and values of ``(N, W)`` chunks, flattened to N * W."""
+        features, _ = self.features(obs, state, starts)
+        pis, logp = self.pi(features, act.reshape(features.shape[0], -1))
+        return pis, logp, self.v(features)
+
+    def step(self, obs, state):
+        with torch.no_grad():
+            starts = torch.zeros(obs.shape[0], 1, dtype=torch.bool, device=obs.device)
+            features, state = self.features(obs.unsqueeze(1), state, starts)
+            pis = self.pi.distributions(features)
+            a = self.pi.sample(pis)
+            logp_a = self.pi.log_prob_from_distributions(pis, a)
+            v = self.v(features)
+        return a.cpu().numpy(), v.cpu().numpy(), logp_a.cpu().numpy(), state
+
+    def act(self, obs, state):
+        a, _, _, state = self.step(obs, state)
+        return a, state
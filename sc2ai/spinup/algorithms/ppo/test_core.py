@@ -0,0 +1,30 @@
+import numpy as np
+import torch
+from .core import discount_cumsum, discount_cumsum_segments, gae_numpy, gae_torch
+
+
+class TestDiscountCumsumSegments:
+    def test_matches_per_segment_sums(self):
+        x = np.random.RandomState(0).randn(50)
+        ends = np.zeros(50, dtype=bool)
+        ends[[9, 10, 31]] = True
+        expected = np.concatenate([discount_cumsum(x[start:end], 0.9)
+                                   for start, end in [(0, 10), (10, 11), (11, 32), (32, 50)]])
+        np.testing.assert_allclose(discount_cumsum_segments(x, 0.9, ends), expected, rtol=1e-10, atol=1e-10)
+
+
+class TestGAE:
+    def test_torch_matches_numpy(self):
+        rng = np.random.RandomState(0)
+        shape = (40, 3)
+        rewards, values, bootstrap_values = rng.randn(*shape), rng.randn(*shape), rng.randn(*shape)
+        terminals, truncations = rng.rand(*shape) < 0.1, rng.rand(*shape) < 0.1
+        advantages, returns = gae_numpy(rewards, values, terminals, truncations, bootstrap_values, 0.99, 0.95)
+        torch_advantages, torch_returns = gae_torch(*[torch.as_tensor(array) for array in (
+            rewards, values, terminals, truncations, bootstrap_values)], 0.99, 0.95)
+        np.testing.assert_allclose(torch_advantages.numpy(), advantages, rtol=1e-8, atol=1e-8)
+        np.testing.assert_allclose(torch_returns.numpy(), returns, rtol=1e-8, atol=1e-8)
+        # every column matches its own one-dimensional computation
+        column_advantages, _ = gae_numpy(rewards[:, 1], values[:, 1], terminals[:, 1], truncations[:, 1],
+                                         bootstrap_values[:, 1], 0.99, 0.95)
+        np.testing.assert_allclose(advantages[:, 1], column_advantages, rtol=1e-10, atol=1e-10)
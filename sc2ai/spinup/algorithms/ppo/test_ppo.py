@@ -0,0 +1,57 @@
+import numpy as np
+import torch
+from .ppo import PPOBuffer, RecurrentPPOBuffer
+
+
+def make_buffer(size=10, chunk_len=4, burn_in=2, starts=()):
+    """Fills a buffer whose observation, and the hidden state stored with it, is the index of the step."""
+    buf = RecurrentPPOBuffer((1,), (1,), size, state_size=2, chunk_len=chunk_len, burn_in=burn_in)
+    for t in range(size):
+        state = (torch.full((1, 1, 2), float(t)), torch.full((1, 1, 2), -float(t)))
+        buf.store(np.array([t]), np.array([0]), 1.0, 0.0, 0.0, state=state, start=t in starts,
+                  terminal=t == size - 1)
+    return buf
+
+
+class TestPPOBuffer:
+    def test_store_single_element_arrays(self):
+        # ac.step on a batch of one returns values and log probabilities of shape (1,).
+        buf = PPOBuffer((1,), (1,), 2)
+        buf.store(np.array([0]), np.array([1]), np.float32(1.0), np.array([0.5]), np.array([-0.1]))
+        buf.store(np.array([1]), np.array([1]), 2.0, np.array([0.25]), np.array([-0.2]), truncated=True,
+                  bootstrap_val=np.array([0.75]))
+        assert buf.val_buf.tolist() == [0.5, 0.25] and np.allclose(buf.logp_buf, [-0.1, -0.2])
+        assert buf.boot_buf.tolist() == [0.0, 0.75] and buf.trunc_buf.tolist() == [False, True]
+
+
+class TestRecurrentPPOBuffer:
+    def test_windows_and_loss_mask(self):
+        buf = make_buffer()
+        # Chunks start at 0, 4 and 8; windows of 6 steps are shifted to stay inside the buffer.
+        assert buf.window_indices[:, 0].tolist() == [0, 2, 4]
+        assert buf.loss_mask.tolist() == [[1, 1, 1, 1, 0, 0], [0, 0, 1, 1, 1, 1], [0, 0, 0, 0, 1, 1]]
+        # Every step is in the loss of exactly one window.
+        counts = np.bincount(buf.window_indices.ravel(), weights=buf.loss_mask.ravel(), minlength=10)
+        assert counts.tolist() == [1] * 10
+
+    def test_no_burn_in(self):
+        buf = make_buffer(size=8, chunk_len=4, burn_in=0)
+        assert buf.window_indices.tolist() == [[0, 1, 2, 3], [4, 5, 6, 7]]
+        assert (buf.loss_mask == 1).all()
+
+    def test_states_and_starts(self):
+        buf = make_buffer(starts=(0, 3, 7))
+        data = buf.get()
+        assert data['obs'].shape == (3, 6, 1) and data['mask'].shape == (3, 6)
+        assert data['obs'][:, :, 0].tolist() == buf.window_indices.tolist()
+        # Every window starts from the state stored at its first step.
+        assert data['h'].shape == (1, 3, 2)
+        assert data['h'][0, :, 0].tolist() == [0, 2, 4] and data['c'][0, :, 0].tolist() == [0, -2, -4]
+        assert data['start'].tolist() == [[t in (0, 3, 7) for t in window] for window in buf.window_indices]
+        # Start flags are cleared for the next epoch.
+        assert not buf.start_buf.any()
+
+    def test_states_are_stored_at_window_starts_only(self):
+        buf = make_buffer(size=12, chunk_len=4, burn_in=0)
+        assert np.flatnonzero(buf.state_slot >= 0).tolist() == [0, 4, 8]
+        assert buf.h_buf[:, 0].tolist() == [0, 4, 8]
@@ -0,0 +1,67 @@
+import numpy as np
+import torch
+from sc2ai.envs import env_spaces, make_sc2env
+from .sc2_nets import SC2EntityActorCritic, SC2EntityEncoder, SC2LSTMActorCritic
+
+
+class TestSC2EntityEncoder:
+    def test_forward_shape(self):
+        obs = torch.randn(3, 8, 6)
+        obs[..., -1] = (torch.arange(8) < torch.tensor([[0], [3], [8]])).float()
+        for encoder in ('deepsets', 'transformer'):
+            features = SC2EntityEncoder(5, 32, embed_units=16, encoder=encoder)(obs)
+            assert features.shape == (3, 32) and torch.isfinite(features).all()
+
+    def test_ignores_padding(self):
+        encoder = SC2EntityEncoder(5, 32, embed_units=16)
+        obs = torch.randn(1, 8, 6)
+        obs[..., -1] = (torch.arange(8) < 3).float()
+        padded = obs.clone()
+        padded[:, 3:, :-1] = torch.randn(1, 5, 5)
+        assert torch.allclose(encoder(obs), encoder(padded))
+
+    def test_actor_critic_on_minigame(self):
+        env = make_sc2env(map="DefeatRoaches", unit_list=True)
+        action_spec, action_mask = env.action_set.get_action_spec_and_action_mask()
+        ac = SC2EntityActorCritic(env.observation_gym_space, action_spec=action_spec, action_mask=action_mask,
+                                  hidden_units=32, embed_units=16)
+        obs = torch.as_tensor(env.observation_gym_space['raw_units'].sample()[np.newaxis])
+        obs[..., -1] = 1.0
+        a, v, logp = ac.step(obs)
+        assert a.shape == (1, len(env.action_gym_space.nvec)) and v.shape == (1,) and logp.shape == (1,)
+
+
+def make_lstm_actor_critic():
+    torch.manual_seed(0)
+    spaces = env_spaces("MoveToBeacon")
+    return SC2LSTMActorCritic(spaces.observation_space, action_spec=spaces.action_spec,
+                              action_mask=spaces.action_mask, hidden_units=16, lstm_units=8)
+
+
+class TestSC2LSTMActorCritic:
+    def test_chunks_match_steps_with_resets(self):
+        ac = make_lstm_actor_critic()
+        obs = torch.rand(2, 6, 2, 84, 84)
+        starts = torch.zeros(2, 6, dtype=torch.bool)
+        starts[0, 3] = starts[1, 1] = starts[1, 4] = True
+        state = (torch.randn(1, 2, 8), torch.randn(1, 2, 8))
+        features, (h, c) = ac.features(obs, state, starts)
+        assert features.shape == (12, 8)
+
+        # One step at a time, resetting the state where an episode starts, as collection does.
+        for row in range(2):
+            row_state = (state[0][:, row:row + 1], state[1][:, row:row + 1])
+            for t in range(6):
+                if starts[row, t]:
+                    row_state = ac.initial_state()
+                step_features, row_state = ac.features(obs[row:row + 1, t:t + 1], row_state,
+                                                       torch.zeros(1, 1, dtype=torch.bool))
+                assert torch.allclose(step_features[0], features[row * 6 + t], atol=1e-5)
+            assert torch.allclose(row_state[0][0, 0], h[0, row], atol=1e-5)
+            assert torch.allclose(row_state[1][0, 0], c[0, row], atol=1e-5)
+
+    def test_step_and_act(self):
+        ac = make_lstm_actor_critic()
+        a, v, logp, state = ac.step(torch.rand(3, 2, 84, 84), ac.initial_state(3))
+        assert a.shape == (3, 3) and v.shape == (3,) and logp.shape == (3,)
+        assert state[0].shape == (1, 3, 8) and state[0].abs().sum() > 0
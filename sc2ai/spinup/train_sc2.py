@@ -1,10 +1,6 @@
 import argparse
-from sc2ai.spinup.algorithms.ppo.ppo import ppo
-from sc2ai.spinup.algorithms.ppo.sc2_nets import SC2AtariNetActorCritic
 from sc2ai.spinup.utils.mpi_tools import mpi_fork
-from sc2ai.envs import make_sc2env
 from absl import flags
-import torch
 
 
 if __name__ == '__main__':
@@ -20,10 +16,18 @@ if __name__ == '__main__':
     parser.add_argument('--steps', type=int, default=1000)
     parser.add_argument('--epochs', type=int, default=10)
     parser.add_argument('--exp_name', type=str, default='ppo_sc2')
+    parser.add_argument('--entity', action='store_true',
+                        help='train SC2EntityActorCritic on the unit list, for DefeatRoaches or DefeatZerglingsAndBanelings')
     args = parser.parse_args()
 
     mpi_fork(args.cpu)  # run parallel code with mpi
 
+    # Heavy imports happen after forking, so the launching process never pays for them.
+    import torch
+    from sc2ai.spinup.algorithms.ppo.ppo import ppo
+    from sc2ai.spinup.algorithms.ppo.sc2_nets import SC2AtariNetActorCritic, SC2EntityActorCritic
+    from sc2ai.envs import make_sc2env
+    from sc2ai.envs.supervisor import SupervisedSC2Env
     from sc2ai.spinup.utils.run_utils import setup_logger_kwargs
     logger_kwargs = setup_logger_kwargs(args.exp_name, args.seed)
 
@@ -34,7 +38,9 @@ if __name__ == '__main__':
     device = torch.device(dev)
     print("device - ", dev, device)
 
-    ppo(lambda: make_sc2env(map=args.map_name), actor_critic=SC2AtariNetActorCritic,
+    env_kwargs = dict(unit_list=True) if args.entity else dict()
+    ppo(lambda: SupervisedSC2Env(lambda: make_sc2env(map=args.map_name, **env_kwargs)),
+        actor_critic=SC2EntityActorCritic if args.entity else SC2AtariNetActorCritic,
         ac_kwargs=dict(), # hidden_sizes=[args.hid]*args.l
         seed=args.seed, steps_per_epoch=args.steps, epochs=args.epochs,
         logger_kwargs=logger_kwargs, device=device)
\ No newline at end of file
@@ -0,0 +1,227 @@
+"""Non-blocking checkpoints of training state, written by a background thread."""
+import atexit
+import copy
+import json
+import os
+import os.path as osp
+import queue
+import random
+import shutil
+import threading
+import warnings
+import numpy as np
+import torch
+from sc2ai.profiler import profiler
+from sc2ai.spinup.utils.mpi_tools import proc_id
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def rng_state():
+    """Returns the states of the python, numpy and torch random number generators."""
+    state = dict(python=random.getstate(), numpy=np.random.get_state(), torch=torch.get_rng_state())
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    """Restores random number generator states returned by :func:`rng_state`."""
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+
+def snapshot(value):
+    """Copies a state into host memory, so training can go on while the copy is written.
+
+    Objects with a ``state_dict`` method, e.g. modules, optimizers and normalizers, are replaced by
+    their state dicts. Tensors are copied to the CPU and arrays are copied.
+    """
+    if hasattr(value, 'state_dict') and callable(value.state_dict):
+        value = value.state_dict()
+    if isinstance(value, torch.Tensor):
+        return value.detach().to('cpu', copy=True)
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, dict):
+        return type(value)((key, snapshot(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)) and not hasattr(value, '_fields'):
+        return type(value)(snapshot(item) for item in value)
+    return copy.deepcopy(value)
+
+
+def _atomic_save(obj, path):
+    tmp_path = path + '.tmp'
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class Checkpointer:
+    """Saves training state without blocking training, keeping the last and the best checkpoints.
+
+    :meth:`save` snapshots the given state into host memory and queues it; a background thread writes
+    it to a temporary file and renames it into place, so a checkpoint file is always complete. At most
+    one snapshot waits to be written, so a save only blocks when the previous one is still pending.
+
+    State is split into ``shared`` state, identical on every MPI rank (models, optimizers,
+    synchronized normalizers) and written by rank 0, and ``local`` state of every rank (random number
+    generators, rollout buffers). The checkpoint of an epoch is the directory
+    ``checkpoints/epoch{epoch}`` with ``shared.pt`` and ``rank{r}.pt``. The last ``keep_last`` checkpoints
+    and the ``keep_best`` checkpoints with the highest metric, e.g. the average episode return, are kept.
+    Only what is passed is saved; environments never are.
+
+    Args:
+        output_dir (str): the experiment directory.
+        keep_last (int): the number of most recent checkpoints to keep.
+        keep_best (int): the number of best checkpoints to keep.
+    """
+
+    def __init__(self, output_dir, keep_last=3, keep_best=3):
+        self._directory = osp.join(output_dir, 'checkpoints')
+        self._model_directory = osp.join(output_dir, 'pyt_save')
+        self._keep_last = keep_last
+        self._keep_best = keep_best
+        self._rank = proc_id()
+        os.makedirs(self._directory, exist_ok=True)
+        self._entries = self._read_manifest()
+        self._queue = queue.Queue(maxsize=1)
+        self._error = None
+        self._thread = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _read_manifest(self):
+        path = osp.join(self._directory, MANIFEST_FILE)
+        if not osp.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        path = osp.join(self._directory, MANIFEST_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._entries, f, indent=1)
+        os.replace(path + '.tmp', path)
+
+    def _epoch_directory(self, epoch):
+        return osp.join(self._directory, 'epoch%06d' % epoch)
+
+    def _write_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            try:
+                with profiler.timer('checkpoint.write'):
+                    job()
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _submit(self, job):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise Exception("Writing a checkpoint failed.") from error
+        self._queue.put(job)
+
+    def save(self, epoch, shared=None, local=None, metric=None):
+        """Snapshots state and writes it in the background.
+
+        Args:
+            epoch (int): the epoch the state belongs to.
+            shared (dict): state identical on all ranks, only written by rank 0.
+            local (dict): state of this rank.
+            metric (float): the value ranking checkpoints, identical on all ranks, or None.
+        """
+        shared = snapshot(shared or {}) if self._rank == 0 else None
+        local = snapshot(local or {})
+        metric = None if metric is None or not np.isfinite(metric) else float(metric)
+        self._submit(lambda: self._write(epoch, shared, local, metric))
+
+    def save_model(self, model, epoch=None):
+        """Writes a copy of a whole module to ``pyt_save/model{epoch}.pt`` in the background, on rank 0 only."""
+        if self._rank != 0:
+            return
+        model = copy.deepcopy(model).to('cpu')
+        fname = 'model' + ('%d' % epoch if epoch is not None else '') + '.pt'
+
+        def write():
+            os.makedirs(self._model_directory, exist_ok=True)
+            _atomic_save(model, osp.join(self._model_directory, fname))
+        self._submit(write)
+
+    def _write(self, epoch, shared, local, metric):
+        directory = self._epoch_directory(epoch)
+        os.makedirs(directory, exist_ok=True)
+        _atomic_save(dict(local, epoch=epoch), osp.join(directory, 'rank%d.pt' % self._rank))
+        self._entries = [entry for entry in self._entries if entry['epoch'] != epoch]
+        if shared is not None:
+            _atomic_save(dict(shared, epoch=epoch), osp.join(directory, 'shared.pt'))
+        self._entries.append(dict(epoch=epoch, metric=metric))
+        self._prune()
+        if self._rank == 0:
+            self._write_manifest()
+
+    def _prune(self):
+        """Removes checkpoints that are neither among the last nor among the best; every rank removes its own files."""
+        keep = {entry['epoch'] for entry in sorted(self._entries, key=lambda e: e['epoch'])[-self._keep_last:]} \
+            if self._keep_last > 0 else set()
+        ranked = sorted((entry for entry in self._entries if entry['metric'] is not None),
+                        key=lambda e: e['metric'], reverse=True)
+        keep.update(entry['epoch'] for entry in ranked[:self._keep_best])
+        for entry in [entry for entry in self._entries if entry['epoch'] not in keep]:
+            directory = self._epoch_directory(entry['epoch'])
+            names = ['rank%d.pt' % self._rank] + (['shared.pt'] if self._rank == 0 else [])
+            for name in names:
+                if osp.exists(osp.join(directory, name)):
+                    os.remove(osp.join(directory, name))
+            if self._rank == 0:
+                shutil.rmtree(directory, ignore_errors=True)
+        self._entries = [entry for entry in self._entries if entry['epoch'] in keep]
+
+    @property
+    def epochs(self):
+        """The epochs of the kept checkpoints, in increasing order."""
+        return sorted(entry['epoch'] for entry in self._entries)
+
+    @property
+    def best_epoch(self):
+        ranked = [entry for entry in self._entries if entry['metric'] is not None]
+        return max(ranked, key=lambda e: e['metric'])['epoch'] if ranked else None
+
+    def wait(self):
+        """Blocks until every queued checkpoint is written."""
+        self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise Exception("Writing a checkpoint failed.") from error
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def load(self, epoch=None, map_location=None):
+        """Loads the shared and this rank's local state of a checkpoint, by default the latest one.
+
+        Returns:
+            A dict of the saved state and its ``epoch``, or None if there is no checkpoint.
+        """
+        self.wait()
+        if epoch is None:
+            if not self._entries:
+                return None
+            epoch = max(entry['epoch'] for entry in self._entries)
+        directory = self._epoch_directory(epoch)
+        state = {}
+        for name in ('shared.pt', 'rank%d.pt' % self._rank):
+            if osp.exists(osp.join(directory, name)):
+                state.update(torch.load(osp.join(directory, name), map_location=map_location, weights_only=False))
+        return state
@@ -1,5 +1,6 @@
 import json
 import joblib  # https://joblib.readthedocs.io/en/latest/
+import pickle
 import shutil
 import numpy as np
 import torch
@@ -10,6 +11,7 @@ import os
 import warnings
 from sc2ai.spinup.utils.mpi_tools import proc_id, mpi_statistics_scalar
 from sc2ai.spinup.utils.serialization_utils import convert_json
+from sc2ai.spinup.utils.metrics import MetricsWriter, TSVSink, ColumnarSink, TensorBoardSink, STORE
 
 
 color2num = dict(
@@ -37,23 +39,58 @@ def colorize(string, color, bold=False, highlight=False):
 
 
 class Logger:
-    def __init__(self, output_dir=None, output_fname='progress.txt', exp_name=None):
+    """Logs tabular rows of metrics, once per epoch, to the console and to metrics sinks.
+
+    Rows are written by a :class:`MetricsWriter` on a background thread. By default, ``progress.txt``
+    holds tab-separated rows, ``progress.bin`` a columnar copy readable with
+    :func:`sc2ai.spinup.utils.metrics.read_columnar`, and ``tb`` a TensorBoard event file.
+
+    Args:
+        output_dir (str): the experiment directory.
+        output_fname (str): the name of the tab-separated file.
+        exp_name (str): the experiment name, saved with the config.
+        sinks (list): the metrics sinks of rank 0, or None for the default ones.
+        resume (bool): whether the default sinks add to the files of a previous run instead of
+            replacing them. :meth:`rewind` then continues from the row of the resumed checkpoint.
+    """
+
+    def __init__(self, output_dir=None, output_fname='progress.txt', exp_name=None, sinks=None, resume=False):
         if proc_id() == 0:
-            self.output_dir = output_dir or "/tmp/experiments/%i" % self.output_dir
+            self.output_dir = output_dir or "/tmp/experiments/%i" % int(time.time())
             if osp.exists(self.output_dir):
                 print("Warning: Log dir %s already exists! Storing info there anyway." % self.output_dir)
             else:
                 os.makedirs(self.output_dir)
-            self.output_file = open(osp.join(self.output_dir, output_fname), 'w')
-            atexit.register(self.output_file.close)
-            print(colorize("Logging data to %s" % self.output_file.name, 'green', bold=True))
+            if sinks is None:
+                sinks = [TSVSink(osp.join(self.output_dir, output_fname), append=resume),
+                         ColumnarSink(osp.join(self.output_dir, osp.splitext(output_fname)[0] + '.bin'),
+                                      append=resume),
+                         TensorBoardSink(osp.join(self.output_dir, 'tb'))]
+            self.metrics = MetricsWriter(sinks)
+            atexit.register(self.close)
+            print(colorize("Logging data to %s" % osp.join(self.output_dir, output_fname), 'green', bold=True))
         else:
             self.output_dir = None
-            self.output_file = None
+            self.metrics = None
         self.first_row = True
         self.log_headers = []
         self.log_current_row = {}
         self.exp_name = exp_name
+        self.row_index = 0
+
+    def close(self):
+        """Writes the queued metrics and closes the sinks."""
+        if self.metrics is not None:
+            self.metrics.close()
+
+    def rewind(self, row_index):
+        """Continues logging from ``row_index``, dropping the rows from there on that the sinks hold.
+
+        Used when resuming, as rows logged after the checkpoint of a previous run are logged again.
+        """
+        self.row_index = row_index
+        if self.metrics is not None:
+            self.metrics.truncate(row_index)
 
     def log(self, msg, color='green'):
         if proc_id() == 0:
@@ -84,7 +121,15 @@ class Logger:
             try:
                 joblib.dump(state_dict, osp.join(self.output_dir, fname))
             except:
-                self.log("Warning: could not pickle state_dict", color='red')
+                # Save what can be pickled, e.g. normalization statistics next to an env that cannot be.
+                picklable = {}
+                for key, value in state_dict.items():
+                    try:
+                        pickle.dumps(value)
+                        picklable[key] = value
+                    except:
+                        self.log("Warning: could not pickle %s in state_dict" % key, color='red')
+                joblib.dump(picklable, osp.join(self.output_dir, fname))
             # place holder for tensorflow
             if hasattr(self, 'pytorch_saver_elements'):
                 self._pytorch_simple_save(itr)
@@ -107,26 +152,22 @@ class Logger:
 
     def dump_tabular(self):
         if proc_id() == 0:
-            vals = []
             key_lens = [len(key) for key in self.log_headers]
             max_key_len = max(15, max(key_lens))
             keystr = '%' + '%d' % max_key_len
             fmt = "| " + keystr + "s | %15s |"
             n_slashes = 22 + max_key_len
-            print("-" * n_slashes)
-            for key in self.log_headers:
-                val = self.log_current_row.get(key, "")
+            row = {key: self.log_current_row.get(key, "") for key in self.log_headers}
+            lines = ["-" * n_slashes]
+            for key, val in row.items():
                 valstr = "%8.3g" % val if hasattr(val, '__float__') else val
-                print(fmt % (key, valstr))
-                vals.append(val)
-            print("-" * n_slashes, flush=True)
-            if self.output_file is not None:
-                if self.first_row:
-                    self.output_file.write("\t".join(self.log_headers) + "\n")
-                self.output_file.write("\t".join(map(str, vals)) + "\n")
-                self.output_file.flush()
+                lines.append(fmt % (key, valstr))
+            lines.append("-" * n_slashes)
+            print("\n".join(lines), flush=True)
+            self.metrics.write(self.row_index, row)
         self.log_current_row.clear()
         self.first_row = False
+        self.row_index += 1
 
 
 class EpochLogger(Logger):
@@ -135,6 +176,8 @@ class EpochLogger(Logger):
         self.epoch_dict = dict()
 
     def store(self, **kwargs):
+        if self.metrics is not None:
+            self.metrics.write(self.row_index, kwargs, stream=STORE)
         for k, v in kwargs.items():
             if not(k in self.epoch_dict.keys()):
                 self.epoch_dict[k] = []
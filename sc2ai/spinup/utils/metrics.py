@@ -0,0 +1,428 @@
+"""Buffered metrics written by a background thread to pluggable sinks, and rate-limited progress reports.
+
+Training code pushes metrics into an in-memory queue with :meth:`MetricsWriter.write`, which costs
+no more than a queue insertion; formatting, conversion and file I/O happen on the writer thread.
+Rows belong to a stream: ``epoch`` rows are the tabular rows of :meth:`Logger.dump_tabular`, and
+``store`` rows are the raw values of :meth:`EpochLogger.store`.
+"""
+import itertools
+import json
+import os
+import os.path as osp
+import queue
+import socket
+import struct
+import threading
+import time
+import numpy as np
+
+EPOCH = 'epoch'
+STORE = 'store'
+
+_FLUSH = object()
+_CLOSE = object()
+_TRUNCATE = object()
+
+
+def _to_float(value):
+    """Reduces a metric to a float, averaging arrays, or returns None if it is not numeric."""
+    try:
+        value = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if value.size == 0:
+        return None
+    return float(value.mean()) if value.ndim else float(value)
+
+
+class MetricsSink:
+    """The base class of sinks, receiving rows of the streams listed in ``streams`` on the writer thread."""
+
+    streams = (EPOCH,)
+
+    def write(self, stream, step, metrics):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def truncate(self, step):
+        """Drops the written rows from ``step`` on, e.g. those logged after the checkpoint a run resumes from."""
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class TSVSink(MetricsSink):
+    """Writes epoch rows as tab-separated text, with the columns of the first row, e.g. ``progress.txt``.
+
+    Args:
+        path (str): the output file.
+        append (bool): whether to add rows to an existing file, keeping its columns, e.g. when resuming.
+    """
+
+    def __init__(self, path, append=False):
+        self._headers = None
+        if append and osp.exists(path) and osp.getsize(path) > 0:
+            with open(path) as f:
+                self._headers = f.readline().rstrip("\n").split("\t")
+        self._file = open(path, 'a' if append else 'w')
+
+    def write(self, stream, step, metrics):
+        if self._headers is None:
+            self._headers = list(metrics)
+            self._file.write("\t".join(self._headers) + "\n")
+        self._file.write("\t".join(str(metrics.get(key, "")) for key in self._headers) + "\n")
+        self._file.flush()
+
+    def flush(self):
+        self._file.flush()
+
+    def truncate(self, step):
+        # Rows are numbered by their line, below the header.
+        self._file.flush()
+        with open(self._file.name) as f:
+            lines = f.readlines()[:1 + step]
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.writelines(lines)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ColumnarSink(MetricsSink):
+    """Writes rows to a binary columnar file, readable with :func:`read_columnar`.
+
+    The file starts with :attr:`MAGIC` and holds a sequence of blocks. Every block is a little-endian
+    uint32 header length, a JSON header with the ``stream``, ``keys`` and number of ``rows``, the
+    int64 steps of the rows, then one float64 column per key. Rows are buffered per stream and
+    written as one block per stream whenever an epoch row arrives. Non-numeric values and keys
+    missing from a row are stored as NaN, arrays as their mean.
+
+    Args:
+        path (str): the output file.
+        streams (tuple): the streams to record.
+        append (bool): whether to add blocks to an existing file, e.g. when resuming. A block left
+            incomplete by an interrupted run is dropped.
+    """
+
+    MAGIC = b'SC2METRICS\x00\x01'
+
+    def __init__(self, path, streams=(EPOCH, STORE), append=False):
+        self.streams = tuple(streams)
+        self._rows = {stream: [] for stream in self.streams}
+        if append and osp.exists(path) and osp.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if not data.startswith(self.MAGIC):
+                raise Exception("{} is not a columnar metrics file.".format(path))
+            end = len(self.MAGIC)
+            for end, _, _, _ in _read_blocks(data):
+                pass
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, 'w+b')
+            self._file.write(self.MAGIC)
+
+    def write(self, stream, step, metrics):
+        self._rows[stream].append((step, metrics))
+        if stream == EPOCH:
+            self.flush()
+
+    def flush(self):
+        for stream, rows in self._rows.items():
+            if rows:
+                self._write_block(stream, rows)
+                rows.clear()
+        self._file.flush()
+
+    def _write_block(self, stream, rows):
+        keys = list(dict.fromkeys(key for _, metrics in rows for key in metrics))
+        columns = np.full((len(keys), len(rows)), np.nan)
+        for i, (_, metrics) in enumerate(rows):
+            for j, key in enumerate(keys):
+                if key in metrics:
+                    value = _to_float(metrics[key])
+                    if value is not None:
+                        columns[j, i] = value
+        self._write_columns(stream, keys, [step for step, _ in rows], columns)
+
+    def _write_columns(self, stream, keys, steps, columns):
+        header = json.dumps(dict(stream=stream, keys=keys, rows=len(steps))).encode()
+        self._file.write(struct.pack('<I', len(header)))
+        self._file.write(header)
+        self._file.write(np.asarray(steps, dtype='<i8').tobytes())
+        self._file.write(np.asarray(columns).astype('<f8').tobytes())
+
+    def truncate(self, step):
+        self.flush()
+        self._file.seek(0)
+        data = self._file.read()
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(self.MAGIC)
+        for _, header, steps, columns in _read_blocks(data):
+            keep = steps < step
+            if keep.any():
+                self._write_columns(header['stream'], header['keys'], steps[keep], columns[:, keep])
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def _read_blocks(data):
+    """Yields the end offset, header, steps and columns of every complete block of a columnar file."""
+    offset = len(ColumnarSink.MAGIC)
+    while offset + 4 <= len(data):
+        header_length, = struct.unpack_from('<I', data, offset)
+        if offset + 4 + header_length > len(data):
+            return
+        header = json.loads(data[offset + 4:offset + 4 + header_length])
+        offset += 4 + header_length
+        rows, num_keys = header['rows'], len(header['keys'])
+        if offset + 8 * rows * (1 + num_keys) > len(data):
+            return  # A block being written.
+        steps = np.frombuffer(data, dtype='<i8', count=rows, offset=offset)
+        columns = np.frombuffer(data, dtype='<f8', count=rows * num_keys, offset=offset + 8 * rows)
+        offset += 8 * rows * (1 + num_keys)
+        yield offset, header, steps, columns.reshape(num_keys, rows)
+
+
+def read_columnar(path, stream=EPOCH):
+    """Reads one stream of a file written by :class:`ColumnarSink`.
+
+    Returns:
+        The int64 steps of the rows and a dict of a float64 column per key, NaN where a row has no value.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(ColumnarSink.MAGIC):
+        raise Exception("{} is not a columnar metrics file.".format(path))
+    blocks = [(steps, header['keys'], columns) for _, header, steps, columns in _read_blocks(data)
+              if header['stream'] == stream]
+    keys = list(dict.fromkeys(key for _, block_keys, _ in blocks for key in block_keys))
+    steps = np.concatenate([block[0] for block in blocks]) if blocks else np.zeros(0, dtype=np.int64)
+    result = {key: np.full(len(steps), np.nan) for key in keys}
+    start = 0
+    for block_steps, block_keys, columns in blocks:
+        for key, column in zip(block_keys, columns):
+            result[key][start:start + len(block_steps)] = column
+        start += len(block_steps)
+    return steps, result
+
+
+def _make_crc32c_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82F63B78 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC32C_TABLE = _make_crc32c_table()
+
+
+def crc32c(data):
+    """The CRC-32C (Castagnoli) checksum of TFRecord framing."""
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc = _CRC32C_TABLE[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def _masked_crc32c(data):
+    crc = crc32c(data)
+    return (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _length_delimited(field, payload):
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+
+# The SessionLog.START status, after which TensorBoard discards earlier events at or after its step.
+_SESSION_START = 1
+
+
+def _event(wall_time, step, file_version=None, scalars=None, session_status=None):
+    """Encodes a ``tensorflow.Event`` protocol buffer with a summary of scalar values, or a session log."""
+    event = struct.pack('<Bd', 1 << 3 | 1, wall_time) + _varint(2 << 3) + _varint(step & 0xFFFFFFFFFFFFFFFF)
+    if file_version is not None:
+        event += _length_delimited(3, file_version.encode())
+    if session_status is not None:
+        event += _length_delimited(7, _varint(1 << 3) + _varint(session_status))
+    if scalars:
+        summary = b''.join(_length_delimited(1, _length_delimited(1, tag.encode()) + struct.pack('<Bf', 2 << 3 | 5, value))
+                           for tag, value in scalars)
+        event += _length_delimited(5, summary)
+    return event
+
+
+_event_file_ids = itertools.count()
+
+
+class TensorBoardSink(MetricsSink):
+    """Writes numeric epoch values as scalar summaries to a TensorBoard event file, without depending on TensorFlow.
+
+    Every sink writes a new event file. Rows of earlier files are dropped by :meth:`truncate`, which
+    writes a session start event that TensorBoard discards the earlier events at or after its step for.
+
+    Args:
+        directory (str): the log directory, e.g. passed to ``tensorboard --logdir``.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fname = 'events.out.tfevents.%010d.%s.%d.%d' % (time.time(), socket.gethostname(), os.getpid(),
+                                                        next(_event_file_ids))
+        self._file = open(osp.join(directory, fname), 'wb')
+        self._write_record(_event(time.time(), 0, file_version='brain.Event:2'))
+
+    def _write_record(self, data):
+        length = struct.pack('<Q', len(data))
+        self._file.write(length + struct.pack('<I', _masked_crc32c(length)) + data +
+                         struct.pack('<I', _masked_crc32c(data)))
+
+    def write(self, stream, step, metrics):
+        scalars = [(key, value) for key, value in ((key, _to_float(value)) for key, value in metrics.items())
+                   if value is not None]
+        self._write_record(_event(time.time(), step, scalars=scalars))
+        self._file.flush()
+
+    def truncate(self, step):
+        self._write_record(_event(time.time(), step, session_status=_SESSION_START))
+        self._file.flush()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class MetricsWriter:
+    """Queues metric rows and writes them to sinks from a background thread.
+
+    Values are converted on the writer thread, so arrays passed to :meth:`write` must not be modified
+    afterwards. An error of a sink is raised by the next call to :meth:`write` or :meth:`flush`.
+
+    Args:
+        sinks (list): the :class:`MetricsSink` instances to write to.
+        max_pending (int): the number of queued rows after which :meth:`write` blocks.
+    """
+
+    def __init__(self, sinks, max_pending=100000):
+        self._sinks = list(sinks)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _CLOSE:
+                    for sink in self._sinks:
+                        sink.close()
+                    return
+                elif item is _FLUSH:
+                    for sink in self._sinks:
+                        sink.flush()
+                elif item[0] is _TRUNCATE:
+                    for sink in self._sinks:
+                        sink.truncate(item[1])
+                else:
+                    stream, step, metrics = item
+                    for sink in self._sinks:
+                        if stream in sink.streams:
+                            sink.write(stream, step, metrics)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise Exception("Writing metrics failed.") from error
+
+    def write(self, step, metrics, stream=EPOCH):
+        """Queues a row of metrics, a dict of names to numbers, arrays or strings."""
+        self._raise_error()
+        self._queue.put((stream, step, metrics))
+
+    def truncate(self, step):
+        """Queues dropping the rows the sinks wrote from ``step`` on."""
+        self._raise_error()
+        self._queue.put((_TRUNCATE, step))
+
+    def flush(self):
+        """Blocks until every queued row is written and the sinks are flushed."""
+        if self._thread.is_alive():
+            self._queue.put(_FLUSH)
+            self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+
+
+class Progress:
+    """Reports the progress of a loop at most once every ``interval`` seconds, instead of on every iteration.
+
+    Args:
+        name (str): the name of the loop.
+        total (int): the number of iterations, or None if unknown.
+        interval (float): the minimum number of seconds between reports.
+        enabled (bool): whether to report, e.g. only on the MPI process of rank 0.
+    """
+
+    def __init__(self, name, total=None, interval=10.0, enabled=True):
+        self.name = name
+        self.interval = interval
+        self.enabled = enabled
+        self.reset(total)
+
+    def reset(self, total=None):
+        self.total = total
+        self.count = 0
+        self._start = time.monotonic()
+        self._next_report = self._start + self.interval
+
+    def update(self, n=1):
+        self.count += n
+        if self.enabled and time.monotonic() >= self._next_report:
+            self.report()
+
+    def report(self):
+        now = time.monotonic()
+        self._next_report = now + self.interval
+        rate = self.count / max(now - self._start, 1e-9)
+        if self.total:
+            print("%s: %d/%d (%.0f%%), %.1f/s" % (self.name, self.count, self.total, 100.0 * self.count / self.total,
+                                                 rate), flush=True)
+        else:
+            print("%s: %d, %.1f/s" % (self.name, self.count, rate), flush=True)
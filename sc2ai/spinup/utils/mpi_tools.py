@@ -3,7 +3,6 @@ import os
 import subprocess
 import sys
 import numpy as np
-from torch.tensor import Tensor
 
 
 def mpi_fork(n, bind_to_core=False):
@@ -52,8 +51,13 @@ def broadcast(x, root=0):
     MPI.COMM_WORLD.Bcast(x, root=root)
 
 
+def broadcast_object(obj, root=0):
+    """Returns the picklable object of the process of rank ``root`` on every process."""
+    return MPI.COMM_WORLD.bcast(obj, root=root)
+
+
 def mpi_op(x, op):
-    if isinstance(x, Tensor) and x.is_cuda:
+    if getattr(x, 'is_cuda', False):  # torch tensors, without importing torch
         x = x.cpu()
     x, scalar = ([x], True) if np.isscalar(x) else (x, False)
     x = np.asarray(x, dtype=np.float32)
@@ -71,7 +75,7 @@ def mpi_avg(x):
 
 
 def mpi_statistics_scalar(x, with_min_and_max=False):
-    if isinstance(x, Tensor) and x.is_cuda:
+    if getattr(x, 'is_cuda', False):
         x = x.cpu()
     x = np.array(x, dtype=np.float32)
     global_sum, global_n = mpi_sum([np.sum(x), len(x)])
@@ -0,0 +1,195 @@
+"""Running normalization statistics of returns and observations, synchronized across MPI ranks."""
+import numpy as np
+from mpi4py import MPI
+from sc2ai.spinup.utils.mpi_tools import allreduce, num_procs
+
+
+class RunningMeanStd:
+    """Running mean and variance, merged once per epoch across MPI ranks.
+
+    Samples are accumulated into preallocated local sums without allocating. :meth:`sync` reduces
+    the local count, sum and sum of squares of every rank, i.e. ``[n, n * mean, M2 + n * mean^2]``,
+    with one float64 allreduce and merges them into the running statistics with Chan's parallel
+    variant of Welford's algorithm. :func:`sync_statistics` does so for several statistics with a
+    single allreduce. Normalization only uses the synchronized statistics, so every rank normalizes
+    identically.
+
+    Args:
+        shape (tuple): the shape of a sample, e.g. ``()`` for scalars or ``(C,)`` for channels.
+        epsilon (float): the initial count, avoiding divisions by zero before the first sync.
+    """
+
+    def __init__(self, shape=(), epsilon=1e-4):
+        self.shape = tuple(shape)
+        self.mean = np.zeros(self.shape, dtype=np.float64)
+        self.var = np.ones(self.shape, dtype=np.float64)
+        self.count = epsilon
+        size = int(np.prod(self.shape))
+        # [count, sums..., sums of squares...], reduced in one call.
+        self._pending = np.zeros(1 + 2 * size, dtype=np.float64)
+        self._pending_sum = self._pending[1:1 + size].reshape(self.shape)
+        self._pending_sumsq = self._pending[1 + size:].reshape(self.shape)
+
+    def update(self, x):
+        """Accumulates a sample."""
+        self._pending[0] += 1
+        self._pending_sum += x
+        self._pending_sumsq += x * x
+
+    def update_sums(self, count, total, total_squares):
+        """Accumulates ``count`` samples given by their sum and sum of squares."""
+        self._pending[0] += count
+        self._pending_sum += total
+        self._pending_sumsq += total_squares
+
+    def sync(self):
+        """Merges the samples of all ranks since the last sync into the running statistics."""
+        sync_statistics([self])
+
+    def _merge(self, reduced):
+        """Merges the reduced ``[count, sums..., sums of squares...]`` of all ranks."""
+        self._pending[:] = 0.0
+        size = int(np.prod(self.shape))
+        batch_count = reduced[0]
+        if batch_count <= 0:
+            return
+        batch_mean = reduced[1:1 + size].reshape(self.shape) / batch_count
+        batch_var = np.maximum(reduced[1 + size:].reshape(self.shape) / batch_count - np.square(batch_mean), 0.0)
+        total_count = self.count + batch_count
+        delta = batch_mean - self.mean
+        m2 = self.var * self.count + batch_var * batch_count + np.square(delta) * self.count * batch_count / total_count
+        self.mean = self.mean + delta * batch_count / total_count
+        self.var = m2 / total_count
+        self.count = total_count
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def state_dict(self):
+        return dict(mean=self.mean.copy(), var=self.var.copy(), count=self.count)
+
+    def load_state_dict(self, state_dict):
+        self.mean = np.asarray(state_dict['mean'], dtype=np.float64).reshape(self.shape)
+        self.var = np.asarray(state_dict['var'], dtype=np.float64).reshape(self.shape)
+        self.count = state_dict['count']
+        self._pending[:] = 0.0
+
+
+def sync_statistics(statistics):
+    """Synchronizes several :class:`RunningMeanStd` with one allreduce of their concatenated pending sums."""
+    if not statistics:
+        return
+    pending = np.concatenate([stats._pending for stats in statistics])
+    if num_procs() > 1:
+        reduced = np.zeros_like(pending)
+        allreduce(pending, reduced, op=MPI.SUM)
+    else:
+        reduced = pending
+    offset = 0
+    for stats in statistics:
+        stats._merge(reduced[offset:offset + len(stats._pending)])
+        offset += len(stats._pending)
+
+
+def sync_normalizers(normalizers):
+    """Synchronizes the statistics of several normalizers with one allreduce."""
+    sync_statistics([normalizer.stats for normalizer in normalizers])
+    for normalizer in normalizers:
+        normalizer.refresh()
+
+
+class ReturnNormalizer:
+    """Scales rewards by the running standard deviation of the discounted return.
+
+    Args:
+        gamma (float): the discount factor of the learner.
+        clip (float): normalized rewards are clipped to ``[-clip, clip]``.
+        epsilon (float): added to the variance.
+    """
+
+    def __init__(self, gamma=0.99, clip=10.0, epsilon=1e-8):
+        self.gamma = gamma
+        self.clip = clip
+        self.epsilon = epsilon
+        self.stats = RunningMeanStd()
+        self._return = 0.0
+
+    def __call__(self, reward, done=False):
+        """Updates the discounted return with a reward and returns the normalized reward."""
+        self._return = self._return * self.gamma + reward
+        self.stats.update(self._return)
+        if done:
+            self._return = 0.0
+        return float(np.clip(reward / np.sqrt(self.stats.var + self.epsilon), -self.clip, self.clip))
+
+    def refresh(self):
+        """Updates what is derived from the statistics, after they changed."""
+        pass
+
+    def sync(self):
+        sync_normalizers([self])
+
+    def state_dict(self):
+        return dict(stats=self.stats.state_dict(), gamma=self.gamma, clip=self.clip)
+
+    def load_state_dict(self, state_dict):
+        self.stats.load_state_dict(state_dict['stats'])
+
+
+class ChannelNormalizer:
+    """Standardizes selected channels of ``(C, H, W)`` observations, e.g. non-binary feature layers.
+
+    Args:
+        num_channels (int): the number of channels of an observation.
+        channels (list): the indices of the channels to normalize.
+        epsilon (float): added to the variance.
+    """
+
+    def __init__(self, num_channels, channels, epsilon=1e-8):
+        self.channels = list(channels)
+        self.epsilon = epsilon
+        self.stats = RunningMeanStd((num_channels,))
+        self._sums = np.zeros(num_channels, dtype=np.float64)
+        self._sums_of_squares = np.zeros(num_channels, dtype=np.float64)
+        self._scale = np.ones(num_channels, dtype=np.float64)
+        self.refresh()
+
+    def refresh(self):
+        """Updates the scales of the channels, after the statistics changed."""
+        np.divide(1.0, np.sqrt(self.stats.var + self.epsilon), out=self._scale)
+
+    def __call__(self, obs, update=True, out=None):
+        """Accumulates the channel statistics of an observation and returns a normalized float32 copy of it.
+
+        The observation itself is left unchanged, as environments may keep it, e.g. as their current observation.
+
+        Args:
+            obs: an observation of shape ``(C, H, W)``.
+            update (bool): whether to accumulate the statistics of the observation.
+            out: a float32 array of the shape of ``obs`` to write the normalized observation to, reused
+                across calls to avoid allocating one per step. A new array is returned if None.
+        """
+        if update:
+            np.sum(obs, axis=(1, 2), out=self._sums)
+            np.einsum('chw,chw->c', obs, obs, out=self._sums_of_squares)
+            self.stats.update_sums(obs.shape[1] * obs.shape[2], self._sums, self._sums_of_squares)
+        if out is None:
+            normalized = np.array(obs, dtype=np.float32)
+        else:
+            normalized = out
+            np.copyto(normalized, obs, casting='unsafe')
+        for channel in self.channels:
+            normalized[channel] -= self.stats.mean[channel]
+            normalized[channel] *= self._scale[channel]
+        return normalized
+
+    def sync(self):
+        sync_normalizers([self])
+
+    def state_dict(self):
+        return dict(stats=self.stats.state_dict(), channels=self.channels)
+
+    def load_state_dict(self, state_dict):
+        self.stats.load_state_dict(state_dict['stats'])
+        self.refresh()
@@ -0,0 +1,221 @@
+"""A pool of opponents for self-play: saved policy snapshots and built-in bots."""
+import os
+import os.path as osp
+import re
+import warnings
+from collections import OrderedDict, namedtuple
+import numpy as np
+import torch
+
+Opponent = namedtuple('Opponent', ('name', 'kind', 'path', 'iteration', 'difficulty'))
+""" An opponent of the pool, either a ``snapshot`` saved by :class:`EpochLogger` or a built-in ``bot``. """
+
+SNAPSHOT = 'snapshot'
+BOT = 'bot'
+
+_MODEL_FILE = re.compile(r'^model(\d*)\.pt$')
+
+
+class OpponentPool:
+    """Samples opponents by prioritized fictitious self-play and serves their actions in batches.
+
+    Snapshots are indexed from checkpoint directories (``model{itr}.pt`` files, as written by
+    :meth:`EpochLogger.save_state`) and loaded on first use. At most ``max_loaded`` models are kept in
+    memory, evicting the least recently used. Results against every opponent are kept in a win-rate
+    table, from which sampling weights are computed: ``hard`` weighting ``(1 - w) ** p`` favours
+    opponents the learner loses to, ``variance`` weighting ``w * (1 - w)`` those of equal strength.
+
+    Recurrent snapshots (models with ``recurrent = True``, such as :class:`SC2LSTMActorCritic`) are
+    called as ``model.act(obs, state)``. Their state is kept per opponent instance, and starts from
+    ``model.initial_state`` when an instance begins an episode or plays another snapshot.
+
+    Args:
+        checkpoint_dirs (list): directories indexed by :meth:`refresh`, either logger output directories
+            or their ``pyt_save`` subdirectories.
+        bot_difficulties (list): names of :class:`sc2_env.Difficulty` levels of built-in bots to include.
+        max_loaded (int): the number of snapshot models kept in memory.
+        weighting (str): ``hard``, ``variance`` or ``uniform``.
+        p (float): the exponent of ``hard`` weighting.
+        prior_games (float): win rates start at 0.5, weighted as this many games.
+        device (torch.device): the device models are loaded to.
+    """
+
+    def __init__(self, checkpoint_dirs=(), bot_difficulties=(), max_loaded=4, weighting='hard', p=2.0,
+                 prior_games=1.0, device=torch.device('cpu')):
+        if weighting not in ('hard', 'variance', 'uniform'):
+            raise Exception("Unknown weighting {}.".format(weighting))
+        self._checkpoint_dirs = list(checkpoint_dirs)
+        self._max_loaded = max_loaded
+        self._weighting = weighting
+        self._p = p
+        self._prior_games = prior_games
+        self._device = device
+        self._opponents = OrderedDict()
+        self._wins = {}
+        self._games = {}
+        self._models = OrderedDict()
+        self._states = {}
+        self.load_count = 0
+        for difficulty in bot_difficulties:
+            self.add(Opponent(BOT + ':' + difficulty, BOT, None, None, difficulty))
+        self.refresh()
+
+    def __len__(self):
+        return len(self._opponents)
+
+    @property
+    def names(self):
+        return list(self._opponents)
+
+    def opponent(self, name):
+        return self._opponents[name]
+
+    def add(self, opponent):
+        if opponent.name not in self._opponents:
+            self._opponents[opponent.name] = opponent
+            self._wins[opponent.name] = 0.0
+            self._games[opponent.name] = 0.0
+
+    def add_snapshot(self, path, name=None):
+        """Adds a saved model file, named after its experiment and iteration by default."""
+        match = _MODEL_FILE.match(osp.basename(path))
+        iteration = int(match.group(1)) if match and match.group(1) else None
+        if name is None:
+            directory = osp.dirname(osp.abspath(path))
+            if osp.basename(directory) == 'pyt_save':
+                directory = osp.dirname(directory)
+            name = '{}/{}'.format(osp.basename(directory), osp.splitext(osp.basename(path))[0])
+        self.add(Opponent(name, SNAPSHOT, path, iteration, None))
+        return name
+
+    def refresh(self):
+        """Indexes snapshots saved to the checkpoint directories since the last refresh, in order of iteration."""
+        for directory in self._checkpoint_dirs:
+            if osp.isdir(osp.join(directory, 'pyt_save')):
+                directory = osp.join(directory, 'pyt_save')
+            if not osp.isdir(directory):
+                continue
+            files = [name for name in os.listdir(directory) if _MODEL_FILE.match(name)]
+            files.sort(key=lambda name: int(_MODEL_FILE.match(name).group(1) or -1))
+            known = {opponent.path for opponent in self._opponents.values()}
+            for name in files:
+                path = osp.join(directory, name)
+                if path not in known:
+                    self.add_snapshot(path)
+
+    def record_result(self, name, outcome):
+        """Records a game against an opponent; ``outcome`` is 1 for a win of the learner, 0.5 for a draw and 0 for a loss."""
+        self._wins[name] += outcome
+        self._games[name] += 1
+
+    def win_rates(self):
+        """Returns the smoothed win rate of the learner against every opponent, in the order of :attr:`names`."""
+        wins = np.array([self._wins[name] for name in self._opponents])
+        games = np.array([self._games[name] for name in self._opponents])
+        return (wins + 0.5 * self._prior_games) / (games + self._prior_games)
+
+    def weights(self):
+        """Returns the normalized sampling weight of every opponent, in the order of :attr:`names`."""
+        win_rates = self.win_rates()
+        if self._weighting == 'hard':
+            weights = (1.0 - win_rates) ** self._p
+        elif self._weighting == 'variance':
+            weights = win_rates * (1.0 - win_rates)
+        else:
+            weights = np.ones_like(win_rates)
+        total = weights.sum()
+        if total <= 0:
+            return np.full(len(weights), 1.0 / len(weights))
+        return weights / total
+
+    def sample(self, size=None, rng=np.random):
+        """Samples opponent names by their weights, one name if ``size`` is None."""
+        if not self._opponents:
+            raise Exception("The opponent pool is empty.")
+        names = self.names
+        indices = rng.choice(len(names), size=size, p=self.weights())
+        if size is None:
+            return names[indices]
+        return [names[i] for i in indices]
+
+    def model(self, name):
+        """Returns the loaded model of a snapshot, loading it and evicting the least recently used model if needed."""
+        if name in self._models:
+            self._models.move_to_end(name)
+            return self._models[name]
+        opponent = self._opponents[name]
+        if opponent.kind != SNAPSHOT:
+            raise Exception("{} is not a policy snapshot.".format(name))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = torch.load(opponent.path, map_location=self._device, weights_only=False)
+        model.eval()
+        self.load_count += 1
+        self._models[name] = model
+        while len(self._models) > self._max_loaded:
+            self._models.popitem(last=False)
+        return model
+
+    def _gather_states(self, model, name, instances, starts):
+        initial = model.initial_state(1)
+        states = []
+        for instance, start in zip(instances, starts):
+            entry = self._states.get(instance)
+            states.append(initial if start or entry is None or entry[0] != name else entry[1])
+        return tuple(torch.cat([state[i] for state in states], dim=1) for i in range(len(initial)))
+
+    def _scatter_states(self, name, instances, state):
+        for i, instance in enumerate(instances):
+            self._states[instance] = (name, tuple(part[:, i:i + 1] for part in state))
+
+    def reset_states(self, instances=None):
+        """Drops the recurrent state of some opponent instances, of all of them by default."""
+        if instances is None:
+            self._states.clear()
+            return
+        for instance in instances:
+            self._states.pop(instance, None)
+
+    def act(self, names, observations, instances=None, starts=None):
+        """Computes the actions of many opponent instances, with one forward per distinct snapshot.
+
+        Args:
+            names (list): the snapshot of every instance.
+            observations: a tensor of the observations of all instances, one row per name.
+            instances (list): an id of every instance, under which the state of recurrent snapshots
+                is kept. Defaults to the row of every instance.
+            starts (list): whether every instance begins an episode, resetting its recurrent state.
+
+        Returns:
+            An array of the action vectors of all instances, in the order of ``names``.
+        """
+        names = np.asarray(names)
+        instances = list(range(len(names))) if instances is None else list(instances)
+        starts = np.zeros(len(names), dtype=bool) if starts is None else np.asarray(starts, dtype=bool)
+        actions = None
+        for name in np.unique(names):
+            rows = np.flatnonzero(names == name)
+            model = self.model(name)
+            group_observations = observations[torch.as_tensor(rows)]
+            with torch.no_grad():
+                if getattr(model, 'recurrent', False):
+                    group_instances = [instances[row] for row in rows]
+                    state = self._gather_states(model, name, group_instances, starts[rows])
+                    group_actions, state = model.act(group_observations, state)
+                    self._scatter_states(name, group_instances, state)
+                else:
+                    group_actions = model.act(group_observations)
+            if actions is None:
+                actions = np.zeros((len(names),) + group_actions.shape[1:], dtype=group_actions.dtype)
+            actions[rows] = group_actions
+        return actions
+
+    def state_dict(self):
+        return dict(opponents=[tuple(opponent) for opponent in self._opponents.values()],
+                    wins=dict(self._wins), games=dict(self._games))
+
+    def load_state_dict(self, state_dict):
+        for opponent in state_dict['opponents']:
+            self.add(Opponent(*opponent))
+        self._wins.update(state_dict['wins'])
+        self._games.update(state_dict['games'])
@@ -2,6 +2,7 @@ from sc2ai.spinup.config import DEFAULT_DATA_DIR, FORCE_DATESTAMP, \
                                DEFAULT_SHORTHAND, WAIT_BEFORE_LAUNCH
 from sc2ai.spinup.utils.logx import colorize
 from sc2ai.spinup.utils.mpi_tools import mpi_fork, msg
+from sc2ai.spinup.utils.scheduler import Job, LocalScheduler
 from sc2ai.spinup.utils.serialization_utils import convert_json
 import base64
 import cloudpickle
@@ -41,17 +42,11 @@ def setup_logger_kwargs(exp_name, seed=None, data_dir=None, datestamp=False):
     return logger_kwargs
 
 
-def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None, datestamp=False, **kwargs):
+def experiment_command(exp_name, thunk, seed=0, num_cpu=1, data_dir=None, datestamp=False, **kwargs):
+    """Returns the command running an experiment in a new process, and the logger kwargs of the experiment."""
     num_cpu = psutil.cpu_count(logical=False) if num_cpu == 'auto' else num_cpu
     kwargs['seed'] = seed
 
-    print(colorize('Running experiment:\n', color='cyan', bold=True))
-    print(exp_name + '\n')
-    print(colorize('with kwargs:\n', color='cyan', bold=True))
-    kwargs_json = convert_json(kwargs)
-    print(json.dumps(kwargs_json, separators=(',', ':\t'), indent=4, sort_keys=True))
-    print('\n')
-
     if 'logger_kwargs' not in kwargs:
         kwargs['logger_kwargs'] = setup_logger_kwargs(exp_name, seed, data_dir, datestamp)
     else:
@@ -71,6 +66,29 @@ def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None, datestamp
 
     entry_point = osp.join(osp.abspath(osp.dirname(__file__)), 'run_entrypoint.py')
     cmd = [sys.executable if sys.executable else 'python', entry_point, encoded_thunk]
+    return cmd, kwargs['logger_kwargs']
+
+
+def scheduled_device(device):
+    """Returns the device of an experiment run by the scheduler, and the number of GPUs it needs.
+
+    The scheduler exposes a single GPU to every job through ``CUDA_VISIBLE_DEVICES``, where it is
+    always ``cuda:0``, so explicit device indices such as ``cuda:1`` are rewritten to it.
+    """
+    if str(device).split(':')[0] != 'cuda':
+        return device, 0
+    return 'cuda:0', 1
+
+
+def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None, datestamp=False, **kwargs):
+    print(colorize('Running experiment:\n', color='cyan', bold=True))
+    print(exp_name + '\n')
+    print(colorize('with kwargs:\n', color='cyan', bold=True))
+    kwargs_json = convert_json(dict(kwargs, seed=seed))
+    print(json.dumps(kwargs_json, separators=(',', ':\t'), indent=4, sort_keys=True))
+    print('\n')
+
+    cmd, logger_kwargs = experiment_command(exp_name, thunk, seed, num_cpu, data_dir, datestamp, **kwargs)
     try:
         subprocess.check_call(cmd, env=os.environ)
     except CalledProcessError:
@@ -87,8 +105,6 @@ def call_experiment(exp_name, thunk, seed=0, num_cpu=1, data_dir=None, datestamp
         print(err_msg)
         raise
 
-    logger_kwargs = kwargs['logger_kwargs']
-
     plot_cmd = 'python -m sc2ai.spinup.run plot ' + logger_kwargs['output_dir']
     plot_cmd = colorize(plot_cmd, 'green')
 
@@ -157,7 +173,7 @@ class ExperimentGrid:
         for k, v, sh in zip(self.keys, self.vals, self.shs):
             color_k = colorize(k.ljust(40), color='cyan', bold=True)
             print('', color_k, '['+sh+']' if sh is not None else '', '\n')
-            for i, val in enumerate(k):
+            for val in v:
                 print('\t' + str(convert_json(val)))
             print()
 
@@ -212,9 +228,9 @@ class ExperimentGrid:
                 variant_val = get_val(variant, k)
 
                 if all_bools(v):
-                    var_name = ('_' + param_name) if variant_val else ''
+                    var_name += ('_' + param_name) if variant_val else ''
                 else:
-                    var_name = '_' + param_name + valid_str(variant_val)
+                    var_name += '_' + param_name + valid_str(variant_val)
 
         return var_name.lstrip('_')
 
@@ -265,7 +281,24 @@ class ExperimentGrid:
         new_variants = [unflatten_var(var) for var in flat_variants]
         return new_variants
 
-    def run(self, thunk, num_cpu=1, data_dir=None, datestamp=False):
+    def run(self, thunk, num_cpu=1, data_dir=None, datestamp=False, parallel=False, cpu_budget=None,
+            gpu_budget=None, sc2_budget=None):
+        """Runs every variant of the grid, one after another or concurrently.
+
+        Args:
+            thunk: the function to run, or the name of the key holding it in every variant.
+            num_cpu (int): the number of MPI processes of a variant, unless a variant sets ``num_cpu``.
+            parallel (bool): runs variants concurrently with a :class:`LocalScheduler` within the budgets.
+                Every variant holds ``num_cpu`` CPUs and StarCraft II instances, and a GPU if its
+                ``device`` is a CUDA device. Output goes to a log file per variant, and variants are
+                recorded in a manifest under ``data_dir``, so running the grid again skips completed ones.
+            cpu_budget (int): the number of CPUs of parallel runs, all cores by default.
+            gpu_budget (int): the number of GPUs of parallel runs, all visible GPUs by default.
+            sc2_budget (int): the number of StarCraft II instances of parallel runs, unlimited by default.
+
+        Returns:
+            With ``parallel``, the manifest entry of every variant, see :meth:`LocalScheduler.run`.
+        """
         self.print()
 
         variants = self.variants()
@@ -293,6 +326,10 @@ class ExperimentGrid:
             for _ in prog_bar:
                 time.sleep(wait/steps)
 
+        if parallel:
+            return self._run_parallel(variants, thunk, num_cpu, data_dir, datestamp, cpu_budget, gpu_budget,
+                                      sc2_budget)
+
         for var in variants:
             exp_name = self.variant_name(var)
 
@@ -304,6 +341,32 @@ class ExperimentGrid:
 
             call_experiment(exp_name, thunk_, num_cpu=num_cpu, data_dir=data_dir, datestamp=datestamp, **var)
 
+    def _run_parallel(self, variants, thunk, num_cpu, data_dir, datestamp, cpu_budget, gpu_budget, sc2_budget):
+        jobs = []
+        for var in variants:
+            exp_name = self.variant_name(var)
+            thunk_ = var.pop(thunk) if isinstance(thunk, str) else thunk
+            var_num_cpu = var.pop('num_cpu', num_cpu)
+            var_num_cpu = psutil.cpu_count(logical=False) if var_num_cpu == 'auto' else var_num_cpu
+            if 'device' in var:
+                var['device'], num_gpu = scheduled_device(var['device'])
+            else:
+                num_gpu = 0
+            cmd, logger_kwargs = experiment_command(exp_name, thunk_, num_cpu=var_num_cpu, data_dir=data_dir,
+                                                    datestamp=datestamp, **var)
+            name = '%s_s%s' % (exp_name, var.get('seed', 0))
+            jobs.append(Job(name, cmd, var_num_cpu, num_gpu, var_num_cpu, logger_kwargs['output_dir']))
+
+        directory = osp.join(data_dir or DEFAULT_DATA_DIR, (self._name or 'grid') + '_scheduler')
+        scheduler = LocalScheduler(directory, cpu_budget, gpu_budget, sc2_budget)
+        results = scheduler.run(jobs)
+        failed = sorted(name for name, entry in results.items() if entry['status'] != 'completed')
+        print(colorize('%d of %d experiments completed.' % (len(results) - len(failed), len(results)),
+                       color='green' if not failed else 'red', bold=True))
+        for name in failed:
+            print(' ', name, results[name]['log'])
+        return results
+
 
 def test_eg():
     eg = ExperimentGrid()
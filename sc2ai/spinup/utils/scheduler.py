@@ -0,0 +1,136 @@
+"""A local scheduler running experiment processes concurrently within a CPU, GPU and StarCraft II budget."""
+import json
+import os
+import os.path as osp
+import subprocess
+import time
+from collections import namedtuple
+from sc2ai.spinup.utils.logx import colorize
+
+Job = namedtuple('Job', ('name', 'cmd', 'num_cpu', 'num_gpu', 'num_sc2', 'output_dir'))
+""" A command to schedule, with the number of CPUs, GPUs and StarCraft II instances it holds while running. """
+
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class LocalScheduler:
+    """Runs jobs as subprocesses, as many at a time as the resource budget allows.
+
+    Pending jobs are started in order whenever the resources they declare are free; a job that does
+    not fit waits while later, smaller jobs may start. The output of every job is streamed to its own
+    log file. A failing job is recorded and the others go on. The status of every finished job is
+    kept in a manifest, and jobs recorded as completed are skipped when the scheduler runs again.
+
+    Args:
+        directory (str): the directory of the manifest and of the ``logs`` of the jobs.
+        cpu_budget (int): the number of CPUs, all cores by default.
+        gpu_budget (int): the number of GPUs, all visible GPUs by default. Every job gets its own
+            ``CUDA_VISIBLE_DEVICES``.
+        sc2_budget (int): the number of StarCraft II instances running at once, unlimited by default.
+        poll_interval (float): seconds between checks of the running jobs.
+    """
+
+    def __init__(self, directory, cpu_budget=None, gpu_budget=None, sc2_budget=None, poll_interval=1.0):
+        if gpu_budget is None:
+            import torch
+            gpu_budget = torch.cuda.device_count()
+        self.directory = directory
+        self.log_dir = osp.join(directory, 'logs')
+        self.manifest_path = osp.join(directory, 'manifest.json')
+        self.cpu_budget = cpu_budget or os.cpu_count()
+        self.gpu_budget = gpu_budget
+        self.sc2_budget = sc2_budget
+        self.poll_interval = poll_interval
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        if not osp.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        with open(self.manifest_path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+    def log_path(self, job):
+        return osp.join(self.log_dir, job.name + '.log')
+
+    def _fits(self, job, used_cpu, free_gpus, used_sc2):
+        return used_cpu + job.num_cpu <= self.cpu_budget and job.num_gpu <= len(free_gpus) and \
+            (self.sc2_budget is None or used_sc2 + job.num_sc2 <= self.sc2_budget)
+
+    def run(self, jobs):
+        """Runs the jobs that are not completed yet, returning when all of them finished.
+
+        Returns:
+            A dict of the manifest entry of every job: its ``status``, ``returncode``, ``seconds``,
+            ``log`` and ``output_dir``.
+        """
+        names = [job.name for job in jobs]
+        if len(set(names)) != len(names):
+            raise Exception("Job names must be unique.")
+        for job in jobs:
+            if job.num_cpu > self.cpu_budget or job.num_gpu > self.gpu_budget or \
+                    (self.sc2_budget is not None and job.num_sc2 > self.sc2_budget):
+                raise Exception("The job {} needs more resources than the budget.".format(job.name))
+
+        pending = []
+        for job in jobs:
+            if self.manifest.get(job.name, {}).get('status') == COMPLETED:
+                print(colorize('Skipping completed experiment %s' % job.name, color='yellow'))
+            else:
+                pending.append(job)
+
+        running = {}
+        free_gpus = list(range(self.gpu_budget))
+        try:
+            while pending or running:
+                used_cpu = sum(job.num_cpu for job, _, _, _, _ in running.values())
+                used_sc2 = sum(job.num_sc2 for job, _, _, _, _ in running.values())
+                for job in list(pending):
+                    if not self._fits(job, used_cpu, free_gpus, used_sc2):
+                        continue
+                    gpus, free_gpus = free_gpus[:job.num_gpu], free_gpus[job.num_gpu:]
+                    running[job.name] = self._start(job, gpus)
+                    pending.remove(job)
+                    used_cpu += job.num_cpu
+                    used_sc2 += job.num_sc2
+                time.sleep(self.poll_interval)
+                for name, (job, process, log_file, gpus, started) in list(running.items()):
+                    if process.poll() is None:
+                        continue
+                    log_file.close()
+                    free_gpus.extend(gpus)
+                    del running[name]
+                    self._finish(job, process.returncode, started)
+        finally:
+            for job, process, log_file, _, _ in running.values():
+                process.terminate()
+                process.wait()
+                log_file.close()
+        return {job.name: self.manifest.get(job.name) for job in jobs}
+
+    def _start(self, job, gpus):
+        env = dict(os.environ)
+        env['CUDA_VISIBLE_DEVICES'] = ','.join(str(gpu) for gpu in gpus)
+        log_file = open(self.log_path(job), 'w')
+        print(colorize('Starting experiment %s' % job.name, color='cyan', bold=True),
+              '(%d cpu, %d gpu), logging to %s' % (job.num_cpu, job.num_gpu, self.log_path(job)))
+        process = subprocess.Popen(job.cmd, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+        return job, process, log_file, gpus, time.time()
+
+    def _finish(self, job, returncode, started):
+        status = COMPLETED if returncode == 0 else FAILED
+        self.manifest[job.name] = dict(status=status, returncode=returncode, seconds=time.time() - started,
+                                       log=self.log_path(job), output_dir=job.output_dir)
+        self._write_manifest()
+        if status == COMPLETED:
+            print(colorize('Completed experiment %s' % job.name, color='green', bold=True))
+        else:
+            print(colorize('Experiment %s failed with exit code %d, see %s' % (job.name, returncode,
+                                                                              self.log_path(job)), color='red',
+                           bold=True))
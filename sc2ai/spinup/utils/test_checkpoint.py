@@ -0,0 +1,38 @@
+import os
+import numpy as np
+import torch
+from .checkpoint import Checkpointer, rng_state, set_rng_state
+
+
+class TestCheckpointer:
+    def test_keeps_last_and_best(self, tmp_path):
+        checkpointer = Checkpointer(str(tmp_path), keep_last=2, keep_best=1)
+        model = torch.nn.Linear(2, 1)
+        for epoch, metric in enumerate([5.0, 1.0, 2.0, 3.0, float('nan')]):
+            with torch.no_grad():
+                model.weight.fill_(epoch)
+            checkpointer.save(epoch, shared=dict(model=model), local=dict(buffer=np.arange(3) + epoch), metric=metric)
+        checkpointer.wait()
+        assert checkpointer.epochs == [0, 3, 4]
+        assert checkpointer.best_epoch == 0
+        assert sorted(os.listdir(str(tmp_path / 'checkpoints'))) == ['epoch000000', 'epoch000003', 'epoch000004',
+                                                                     'manifest.json']
+        state = checkpointer.load()
+        assert state['epoch'] == 4 and list(state['buffer']) == [4, 5, 6]
+        assert (state['model']['weight'] == 4).all()
+        checkpointer.close()
+        assert Checkpointer(str(tmp_path)).epochs == [0, 3, 4]
+
+    def test_snapshot_is_taken_on_save(self, tmp_path):
+        checkpointer = Checkpointer(str(tmp_path))
+        buffer = np.zeros(3)
+        checkpointer.save(0, local=dict(buffer=buffer))
+        buffer[:] = 1
+        assert (checkpointer.load(0)['buffer'] == 0).all()
+        checkpointer.close()
+
+    def test_rng_state_roundtrip(self):
+        state = rng_state()
+        expected = np.random.rand(), torch.rand(1).item()
+        set_rng_state(state)
+        assert (np.random.rand(), torch.rand(1).item()) == expected
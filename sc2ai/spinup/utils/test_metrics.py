@@ -0,0 +1,82 @@
+import os
+import struct
+import numpy as np
+from .metrics import MetricsWriter, TSVSink, ColumnarSink, TensorBoardSink, Progress, read_columnar, crc32c, \
+    _masked_crc32c, _event, STORE
+
+
+def read_records(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    records, offset = [], 0
+    while offset < len(data):
+        length, = struct.unpack_from('<Q', data, offset)
+        assert struct.unpack_from('<I', data, offset + 8)[0] == _masked_crc32c(data[offset:offset + 8])
+        record = data[offset + 12:offset + 12 + length]
+        assert struct.unpack_from('<I', data, offset + 12 + length)[0] == _masked_crc32c(record)
+        records.append(record)
+        offset += 16 + length
+    return records
+
+
+class TestMetricsWriter:
+    def test_sinks(self, tmp_path):
+        writer = MetricsWriter([TSVSink(str(tmp_path / 'progress.txt')), ColumnarSink(str(tmp_path / 'progress.bin')),
+                                TensorBoardSink(str(tmp_path / 'tb'))])
+        writer.write(0, dict(VVals=np.array([1.0, 3.0])), stream=STORE)
+        writer.write(0, dict(Epoch=0, Loss=0.5, Name='a'))
+        writer.write(1, dict(Epoch=1, Loss=0.25, Name='b'))
+        writer.write(1, dict(Other=4.0), stream=STORE)
+        writer.close()
+
+        with open(str(tmp_path / 'progress.txt')) as f:
+            assert f.read() == "Epoch\tLoss\tName\n0\t0.5\ta\n1\t0.25\tb\n"
+        steps, columns = read_columnar(str(tmp_path / 'progress.bin'))
+        assert list(steps) == [0, 1] and list(columns['Loss']) == [0.5, 0.25] and np.isnan(columns['Name']).all()
+        steps, columns = read_columnar(str(tmp_path / 'progress.bin'), STORE)
+        assert list(steps) == [0, 1] and columns['VVals'][0] == 2.0 and np.isnan(columns['VVals'][1])
+        records = read_records(os.path.join(str(tmp_path / 'tb'), os.listdir(str(tmp_path / 'tb'))[0]))
+        assert len(records) == 3 and b'brain.Event:2' in records[0] and b'Loss' in records[2]
+        assert struct.pack('<f', 0.25) in records[2]
+
+    def test_append(self, tmp_path):
+        tsv_path, bin_path, tb_path = str(tmp_path / 'progress.txt'), str(tmp_path / 'progress.bin'), str(tmp_path / 'tb')
+        writer = MetricsWriter([TSVSink(tsv_path), ColumnarSink(bin_path), TensorBoardSink(tb_path)])
+        writer.write(0, dict(Epoch=0, Loss=0.5))
+        writer.close()
+        with open(bin_path, 'ab') as f:
+            f.write(struct.pack('<I', 100) + b'{"stream"')  # interrupted while writing a block
+        writer = MetricsWriter([TSVSink(tsv_path, append=True), ColumnarSink(bin_path, append=True),
+                                TensorBoardSink(tb_path)])
+        writer.write(1, dict(Loss=0.25, Epoch=1))
+        writer.write(2, dict(Loss=0.125, Epoch=2))
+        writer.write(2, dict(VVals=1.0), stream=STORE)
+        # A resumed run logs the rows after its checkpoint again.
+        writer.truncate(2)
+        writer.write(2, dict(Loss=0.0625, Epoch=2))
+        writer.close()
+
+        with open(tsv_path) as f:
+            assert f.read() == "Epoch\tLoss\n0\t0.5\n1\t0.25\n2\t0.0625\n"
+        steps, columns = read_columnar(bin_path)
+        assert list(steps) == [0, 1, 2] and list(columns['Loss']) == [0.5, 0.25, 0.0625]
+        assert len(read_columnar(bin_path, STORE)[0]) == 0
+        # The resumed run writes a new event file with a session start at the truncated step, after
+        # which TensorBoard discards the events it read from step 2 on, in this file or the first one.
+        first, resumed = [read_records(os.path.join(tb_path, name)) for name in sorted(os.listdir(tb_path))]
+        assert len(first) == 2 and b'brain.Event:2' in resumed[0]
+        start = [i for i, record in enumerate(resumed) if record[9:] == _event(0.0, 2, session_status=1)[9:]]
+        assert start == [len(resumed) - 2] and struct.pack('<f', 0.0625) in resumed[-1]
+
+    def test_crc32c(self):
+        assert crc32c(b'123456789') == 0xE3069283
+
+
+class TestProgress:
+    def test_rate_limited(self, capsys):
+        progress = Progress('Collecting', total=10, interval=3600.0)
+        for _ in range(10):
+            progress.update()
+        assert capsys.readouterr().out == ""
+        progress.report()
+        assert capsys.readouterr().out.startswith("Collecting: 10/10 (100%)")
@@ -0,0 +1,63 @@
+import numpy as np
+from . import normalization
+from .normalization import RunningMeanStd, ChannelNormalizer, ReturnNormalizer, sync_normalizers
+
+
+class TestRunningMeanStd:
+    def test_merges_match_full_statistics(self):
+        data = np.random.RandomState(0).randn(300, 3) * 4 + 2
+        stats = RunningMeanStd((3,), epsilon=0)
+        for chunk in np.array_split(data, 3):
+            for x in chunk:
+                stats.update(x)
+            stats.sync()
+        np.testing.assert_allclose(stats.mean, data.mean(axis=0))
+        np.testing.assert_allclose(stats.var, data.var(axis=0))
+
+    def test_channel_normalizer_only_touches_selected_channels(self):
+        obs = np.random.RandomState(1).rand(3, 4, 4).astype(np.float32) * 255
+        original = obs.copy()
+        normalizer = ChannelNormalizer(3, [2])
+        normalizer(obs)
+        normalizer.sync()
+        normalized = normalizer(obs, update=False)
+        np.testing.assert_array_equal(obs, original)
+        np.testing.assert_array_equal(normalized[:2], obs[:2])
+        assert abs(normalized[2].mean()) < 1e-4
+
+    def test_reuses_output_buffer(self):
+        rng = np.random.RandomState(1)
+        normalizer = ChannelNormalizer(2, [1])
+        out = np.zeros((2, 4, 4), dtype=np.float32)
+        for _ in range(3):
+            obs = rng.randint(0, 255, size=(2, 4, 4))
+            normalized = normalizer(obs, out=out)
+            assert normalized is out
+            np.testing.assert_array_equal(normalized[0], obs[0])
+            np.testing.assert_allclose(normalized, normalizer(obs, update=False), rtol=1e-6)
+
+    def test_normalizers_sync_with_one_allreduce(self, monkeypatch):
+        calls = []
+
+        def allreduce(send, receive, op):
+            calls.append(send.dtype)
+            receive[:] = 2 * send  # two ranks with the same samples
+
+        monkeypatch.setattr(normalization, 'num_procs', lambda: 2)
+        monkeypatch.setattr(normalization, 'allreduce', allreduce)
+        rng = np.random.RandomState(2)
+        returns, channels = ReturnNormalizer(epsilon=0), ChannelNormalizer(2, [0, 1])
+        rewards, observations = rng.randn(50), rng.rand(10, 2, 3, 3)
+        for reward in rewards:
+            returns(reward)
+        for obs in observations:
+            channels(obs)
+        sync_normalizers([returns, channels])
+        assert calls == [np.float64]
+        discounted = np.zeros(len(rewards))
+        for i, reward in enumerate(rewards):
+            discounted[i] = (discounted[i - 1] * 0.99 if i else 0.0) + reward
+        np.testing.assert_allclose(returns.stats.mean, discounted.mean(), rtol=1e-3)
+        np.testing.assert_allclose(channels.stats.mean, observations.mean(axis=(0, 2, 3)), rtol=1e-3)
+        np.testing.assert_allclose(channels.stats.var, observations.transpose(1, 0, 2, 3).reshape(2, -1).var(axis=1),
+                                   rtol=1e-3)
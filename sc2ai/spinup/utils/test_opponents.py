@@ -0,0 +1,87 @@
+import os
+import numpy as np
+import torch
+import torch.nn as nn
+from .opponents import OpponentPool, BOT
+
+
+class ConstantPolicy(nn.Module):
+    def __init__(self, value):
+        super().__init__()
+        self.value = nn.Parameter(torch.tensor(float(value)))
+        self.calls = 0
+
+    def act(self, obs):
+        self.calls += 1
+        return (obs[:, :1] * 0 + self.value).numpy().astype(np.int64)
+
+
+class CountingPolicy(nn.Module):
+    """A recurrent policy whose action is the number of steps since its state was reset, plus an offset."""
+    recurrent = True
+
+    def __init__(self, offset):
+        super().__init__()
+        self.offset = offset
+
+    def initial_state(self, batch_size=1):
+        zeros = torch.zeros(1, batch_size, 1)
+        return zeros, zeros.clone()
+
+    def act(self, obs, state):
+        h, c = state
+        h = h + 1
+        return (h[0] + self.offset).numpy().astype(np.int64), (h, c)
+
+
+def save_snapshots(directory, iterations):
+    os.makedirs(os.path.join(directory, 'pyt_save'), exist_ok=True)
+    for itr in iterations:
+        torch.save(ConstantPolicy(itr), os.path.join(directory, 'pyt_save', 'model%d.pt' % itr))
+
+
+class TestOpponentPool:
+    def test_index_and_pfsp_weights(self, tmp_path):
+        save_snapshots(str(tmp_path / 'exp'), [0, 10])
+        pool = OpponentPool([str(tmp_path / 'exp')], bot_difficulties=['easy'], weighting='hard')
+        assert pool.names == ['bot:easy', 'exp/model0', 'exp/model10']
+        assert pool.opponent('bot:easy').kind == BOT
+        for _ in range(9):
+            pool.record_result('exp/model0', 1.0)
+            pool.record_result('exp/model10', 0.0)
+        weights = pool.weights()
+        assert weights[2] > weights[0] > weights[1]
+        assert set(pool.sample(50, np.random.RandomState(0))) <= set(pool.names)
+
+        save_snapshots(str(tmp_path / 'exp'), [20])
+        pool.refresh()
+        assert pool.names[-1] == 'exp/model20' and len(pool) == 4
+
+    def test_lru_and_batched_act(self, tmp_path):
+        save_snapshots(str(tmp_path / 'exp'), [1, 2, 3])
+        pool = OpponentPool([str(tmp_path / 'exp')], max_loaded=2)
+        names = ['exp/model1', 'exp/model2', 'exp/model1', 'exp/model2']
+        actions = pool.act(names, torch.zeros(4, 3))
+        assert list(actions[:, 0]) == [1, 2, 1, 2]
+        assert pool.model('exp/model1').calls == 1 and pool.load_count == 2
+        pool.model('exp/model3')
+        assert pool.load_count == 3
+        pool.model('exp/model1')
+        assert pool.load_count == 3
+        pool.model('exp/model2')
+        assert pool.load_count == 4
+
+    def test_recurrent_state_per_instance(self, tmp_path):
+        os.makedirs(str(tmp_path / 'pyt_save'))
+        for offset in [0, 100]:
+            torch.save(CountingPolicy(offset), str(tmp_path / 'pyt_save' / ('model%d.pt' % offset)))
+        pool = OpponentPool([str(tmp_path)])
+        a, b = pool.names
+        obs = torch.zeros(2, 3)
+        assert list(pool.act([a, a], obs, instances=['x', 'y'])[:, 0]) == [1, 1]
+        # Instances keep their own state, whatever their row.
+        assert list(pool.act([a, a], obs, instances=['y', 'x'], starts=[True, False])[:, 0]) == [1, 2]
+        # Playing another snapshot starts from its initial state.
+        assert list(pool.act([b, a], obs, instances=['x', 'y'])[:, 0]) == [101, 2]
+        pool.reset_states(['y'])
+        assert list(pool.act([b, a], obs, instances=['x', 'y'])[:, 0]) == [102, 1]
@@ -0,0 +1,45 @@
+import json
+import sys
+import pytest
+from .scheduler import Job, LocalScheduler, COMPLETED, FAILED
+from .run_utils import scheduled_device
+
+
+def python_job(name, code, num_cpu=1, num_sc2=0):
+    return Job(name, [sys.executable, '-c', code], num_cpu, 0, num_sc2, None)
+
+
+class TestLocalScheduler:
+    def test_budget_failures_and_manifest(self, tmp_path):
+        # Every job records when it ran, so overlapping jobs can be counted.
+        code = "import time; start = time.time(); time.sleep(0.3); print(start, time.time()){}"
+        jobs = [python_job('a', code.format(''), num_cpu=2), python_job('b', code.format(''), num_cpu=2),
+                python_job('c', code.format('; raise SystemExit(3)'), num_cpu=1)]
+        scheduler = LocalScheduler(str(tmp_path), cpu_budget=3, gpu_budget=0, poll_interval=0.05)
+        results = scheduler.run(jobs)
+        assert [results[name]['status'] for name in 'abc'] == [COMPLETED, COMPLETED, FAILED]
+        assert results['c']['returncode'] == 3
+
+        intervals = {}
+        for job in jobs:
+            with open(scheduler.log_path(job)) as f:
+                intervals[job.name] = [float(value) for value in f.read().split()]
+        # a and b need 4 CPUs together, so they never overlap, while c runs beside one of them.
+        assert intervals['a'][1] <= intervals['b'][0] or intervals['b'][1] <= intervals['a'][0]
+
+        with open(str(tmp_path / 'manifest.json')) as f:
+            assert set(json.load(f)) == {'a', 'b', 'c'}
+        rerun = LocalScheduler(str(tmp_path), cpu_budget=3, gpu_budget=0, poll_interval=0.05)
+        results = rerun.run([python_job('a', "raise SystemExit(1)"), python_job('c', "pass")])
+        assert results['a']['status'] == COMPLETED and results['c']['status'] == COMPLETED
+
+    def test_rejects_jobs_over_budget(self, tmp_path):
+        scheduler = LocalScheduler(str(tmp_path), cpu_budget=2, gpu_budget=0, sc2_budget=1)
+        with pytest.raises(Exception):
+            scheduler.run([python_job('a', "pass", num_cpu=1, num_sc2=2)])
+
+    def test_scheduled_device(self):
+        assert scheduled_device('cpu') == ('cpu', 0)
+        assert scheduled_device('cuda') == ('cuda:0', 1)
+        # Every job only sees its assigned GPU, as device 0.
+        assert scheduled_device('cuda:1') == ('cuda:0', 1)
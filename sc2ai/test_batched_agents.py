@@ -0,0 +1,43 @@
+import numpy as np
+from pysc2.lib import actions
+from sc2ai.envs import make_sc2env
+from .batched_agents import label_components, BatchedMoveToBeacon, BatchedNoOpAgent
+
+
+def make_screens():
+    screens = np.zeros((3, 2, 16, 16), dtype=np.float32)
+    screens[0, 0, 2:4, 2:4] = 1          # marines around (2.5, 2.5)
+    screens[0, 1, 3:6, 12:15] = 1        # far beacon at (13, 4)
+    screens[0, 1, 5:8, 4:7] = 1          # near beacon at (5, 6)
+    screens[1, 0, 10, 10] = 1            # marines without a beacon
+    screens[2, 1, 0:2, 0:2] = 1          # a beacon without marines
+    return screens
+
+
+class TestBatchedAgents:
+    def test_label_components(self):
+        screens, centroids, sizes = label_components(make_screens()[:, 1] > 0)
+        assert list(screens) == [0, 0, 2]
+        assert sorted(sizes) == [4, 9, 9]
+        assert [13.0, 4.0] in centroids.tolist() and [5.0, 6.0] in centroids.tolist()
+
+    def test_move_to_beacon(self):
+        action_set = make_sc2env(map="MoveToBeacon").action_set
+        agent = BatchedMoveToBeacon(action_set)
+        output = agent.step({"feature_screen": make_screens()})
+        assert output.shape == (3, len(action_set.convert_to_gym_action_spaces().nvec))
+        calls = action_set.transform_actions(output, available_actions=np.ones((3, 5), dtype=bool))
+        assert calls[0] == actions.FUNCTIONS.Move_screen("now", [5, 6])
+        assert calls[1].function == actions.FUNCTIONS.no_op.id
+        assert calls[2].function == actions.FUNCTIONS.no_op.id
+
+        available = np.zeros((3, 5), dtype=bool)
+        available[:, [0, 3]] = True
+        output = agent.step({"feature_screen": make_screens()}, available)
+        assert all(call == actions.FUNCTIONS.select_army("select")
+                   for call in action_set.transform_actions(output, available_actions=available))
+
+    def test_no_op(self):
+        action_set = make_sc2env(map="MoveToBeacon").action_set
+        output = BatchedNoOpAgent(action_set).step({"feature_screen": make_screens()})
+        assert (output == 0).all()
@@ -0,0 +1,38 @@
+import json
+from sc2ai.profiler import Profiler
+
+
+class TestProfiler:
+    def test_disabled_records_nothing(self):
+        profiler = Profiler()
+        with profiler.timer('env.step'):
+            pass
+        profiler.count('episodes')
+        assert profiler.stats() == {}
+
+    def test_epoch_stats(self):
+        profiler = Profiler(enabled=True)
+        for _ in range(3):
+            with profiler.timer('env.step'):
+                pass
+        profiler.count('episodes', 2)
+        assert profiler.stats()['env.step'][0] == 3
+        stats = profiler.epoch_stats(['env.step', 'ppo.forward', 'episodes'])
+        assert set(stats) == {'env.step', 'ppo.forward', 'episodes'}
+        assert stats['ppo.forward'] == 0 and stats['episodes'] == 2 and stats['env.step'] >= 0
+        assert profiler.stats() == {}
+
+    def test_trace_export(self, tmp_path):
+        profiler = Profiler(trace=True)
+
+        @profiler.timed('ppo.update')
+        def update():
+            with profiler.timer('ppo.forward'):
+                pass
+        update()
+        assert profiler.export_trace(str(tmp_path / 'trace.json')) == 2
+        with open(str(tmp_path / 'trace.json')) as f:
+            events = json.load(f)['traceEvents']
+        assert [event['name'] for event in events] == ['ppo.forward', 'ppo.update']
+        assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+        assert profiler.export_trace(str(tmp_path / 'empty.json')) == 0